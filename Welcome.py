@@ -1,20 +1,22 @@
 import streamlit as st
-from sb_functions import sign_in, sign_up, load_user_data
+from sb_functions import sign_in, sign_up
+from utils.session_data import reset_docs
 
 st.set_page_config(page_title="Study Planner", layout="wide")
 st.title("Study Planner")
 
-# Initialize session state
-for key in ["user", "uid", "courses", "settings", "schedule", "completions"]:
+# Initialize session state (user documents are loaded by each page on demand)
+for key in ["user", "uid"]:
     if key not in st.session_state:
-        st.session_state[key] = None if key in ["user", "uid"] else {}
+        st.session_state[key] = None
 
 # Already logged in
 if st.session_state["uid"]:
     st.success(f"Logged in")
     if st.button("Log out"):
-        for key in ["user", "uid", "courses", "settings", "schedule", "completions"]:
-            st.session_state[key] = None if key in ["user", "uid"] else {}
+        st.session_state["user"] = None
+        st.session_state["uid"] = None
+        reset_docs()
         st.rerun()
     st.info("Use the sidebar to navigate")
     st.stop()
@@ -37,12 +39,8 @@ with tab1:
                 st.session_state["user"] = res.user
                 st.session_state["uid"] = uid
                 
-                # Load user data
-                data = load_user_data(uid)
-                st.session_state["courses"] = data.get("courses", {})
-                st.session_state["settings"] = data.get("settings", {})
-                st.session_state["schedule"] = data.get("schedule", {})
-                st.session_state["completions"] = data.get("completions", {})
+                # User data is fetched by each page the first time it's needed
+                reset_docs()
                 
                 st.success("Logged in!")
                 st.rerun()
@@ -66,10 +64,7 @@ with tab2:
                 
                 st.session_state["user"] = res.user
                 st.session_state["uid"] = uid
-                st.session_state["courses"] = {}
-                st.session_state["settings"] = {}
-                st.session_state["schedule"] = {}
-                st.session_state["completions"] = {}
+                reset_docs()
                 
                 st.success("Account created!")
                 st.rerun()
@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.syllabus_schema import repair_stats, reset_repair_stats
+
+
+# Headless batch pipeline: syllabus PDFs -> parsed courses, schedules and .ics
+#
+#   python batch.py syllabi/ settings.json --out build/ [--combined]
+#
+# settings.json has the same shape as a user's settings document
+# (semester_start, semester_end, daily_hours, work_ahead_days, base_hours,
+# type_synonyms, capacity_exceptions). .txt files in the directory are treated as already
+# extracted text, which is handy for regression runs.
+#
+# Each file streams through the stages on its own as soon as the previous
+# stage finishes:
+#
+#   extract    PDF text extraction, in a process pool (CPU bound)
+#   parse      LLM parse (or the shared catalog with --catalog), in a thread pool
+#   normalize  assessment rows with normalize_type applied
+#   optimize   ScheduleOptimizer.generate_raw_schedule
+#   ics        schedule_to_ics
+#   write      <file>.course.json, <file>.schedule.json and <file>.ics, named
+#              after the whole input file name (a.pdf.ics), so a.pdf and
+#              a.txt don't overwrite each other
+#
+# A failing file is reported and skipped; the rest keep going. Per-stage
+# timings are printed and written to report.json next to the outputs.
+#
+# The same pipeline is available as a library call, run_batch().
+
+STAGES = ("extract", "parse", "normalize", "optimize", "ics", "write")
+
+
+class StageError(Exception):
+
+    # a failure inside build_stage, tagged with the stage it happened in
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.stage = stage
+
+
+def load_settings(path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        settings = json.load(f)
+    missing = [k for k in ("semester_start", "semester_end", "daily_hours") if not settings.get(k)]
+    if missing:
+        raise ValueError(f"{path} is missing {', '.join(missing)}")
+    return settings
+
+
+def find_inputs(directory) -> List[Path]:
+    directory = Path(directory)
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in (".pdf", ".txt"))
+
+
+# Stage functions (module level so the process pool can pickle them)
+
+def extract_stage(path: str):
+    started = time.perf_counter()
+    if path.lower().endswith(".txt"):
+        text = Path(path).read_text(encoding="utf-8")
+    else:
+        from scraper import SyllabusScraper
+        text = SyllabusScraper.extract_text_from_pdf(path)
+    return text, {"extract": time.perf_counter() - started}
+
+
+def parse_stage(scraper, text: str, settings: Dict[str, Any], use_catalog: bool):
+    started = time.perf_counter()
+    if use_catalog:
+        from utils.course_catalog import resolve_syllabus
+        course = resolve_syllabus(scraper, text, settings["semester_start"], settings["semester_end"])
+    else:
+        course = scraper.parse_syllabus(text, settings["semester_start"], settings["semester_end"])
+    return course, {"parse": time.perf_counter() - started}
+
+
+def build_stage(name: str, course: Dict[str, Any], settings: Dict[str, Any], out_dir: Optional[Path]):
+    from utils.assessment_store import AssessmentStore
+    from utils.ics_exporter import schedule_to_ics
+
+    timings = {}
+    course_code = course.get("course_info", {}).get("course_code") or name
+    courses = {course_code: course}
+    stage = "normalize"
+
+    try:
+        started = time.perf_counter()
+        rows = AssessmentStore.from_courses(
+            courses, settings.get("base_hours", {}), settings.get("type_synonyms", {})
+        ).rows()
+        timings["normalize"] = time.perf_counter() - started
+
+        stage = "optimize"
+        started = time.perf_counter()
+        schedule = make_optimizer(settings).generate_raw_schedule(rows)
+        timings["optimize"] = time.perf_counter() - started
+
+        stage = "ics"
+        started = time.perf_counter()
+        ics = schedule_to_ics(schedule, courses, calendar_name=f"{course_code} Study Schedule")
+        timings["ics"] = time.perf_counter() - started
+
+        if out_dir is not None:
+            stage = "write"
+            started = time.perf_counter()
+            write_outputs(out_dir, name, course, schedule, ics)
+            timings["write"] = time.perf_counter() - started
+    except Exception as e:
+        raise StageError(stage, e) from e
+
+    result = {
+        "file": name,
+        "course_code": course_code,
+        "course": course,
+        "assessments": rows,
+        "schedule": schedule,
+        "unscheduled_hours": sum(a.get("unscheduled_hours", 0) for a in schedule.get("allocations", [])),
+    }
+    return result, timings
+
+
+def make_optimizer(settings: Dict[str, Any]):
+    from schedule import ScheduleOptimizer
+
+    return ScheduleOptimizer(
+        settings["semester_start"],
+        settings["semester_end"],
+        settings.get("daily_hours", {}),
+        settings.get("work_ahead_days", {}),
+        settings.get("capacity_exceptions"),
+    )
+
+
+def write_outputs(out_dir: Path, name: str, course, schedule, ics: str) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f"{name}.course.json").write_text(json.dumps(course, indent=2), encoding="utf-8")
+    (out_dir / f"{name}.schedule.json").write_text(json.dumps(schedule, indent=2), encoding="utf-8")
+    (out_dir / f"{name}.ics").write_text(ics, encoding="utf-8")
+
+
+# Pipeline
+
+def run_batch(
+    paths: List[Path],
+    settings: Dict[str, Any],
+    out_dir: Optional[Path] = None,
+    api_key: Optional[str] = None,
+    scraper=None,
+    extract_workers: Optional[int] = None,
+    parse_workers: int = 8,
+    build_workers: int = 2,
+    use_catalog: bool = False,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    if scraper is None:
+        from scraper import SyllabusScraper
+        scraper = SyllabusScraper(api_key or os.environ.get("OPENAI_API_KEY"))
+
+    # repair stats are process-wide; the report covers this batch only
+    reset_repair_stats()
+    out_dir = Path(out_dir) if out_dir is not None else None
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    results, failures = [], []
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(extract_workers) as extract_pool, \
+            ThreadPoolExecutor(parse_workers, thread_name_prefix="batch-parse") as parse_pool, \
+            ThreadPoolExecutor(build_workers, thread_name_prefix="batch-build") as build_pool:
+
+        pending = {extract_pool.submit(extract_stage, str(p)): ("extract", p) for p in paths}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, path = pending.pop(future)
+                try:
+                    value, stage_timings = future.result()
+                except StageError as e:
+                    failures.append({"file": path.name, "stage": e.stage, "error": str(e)})
+                    continue
+                except Exception as e:
+                    failures.append({"file": path.name, "stage": stage, "error": f"{type(e).__name__}: {e}"})
+                    continue
+
+                for name, seconds in stage_timings.items():
+                    timings[name].append(seconds)
+
+                if stage == "extract":
+                    next_future = parse_pool.submit(parse_stage, scraper, value, settings, use_catalog)
+                    pending[next_future] = ("parse", path)
+                elif stage == "parse":
+                    next_future = build_pool.submit(build_stage, path.name, value, settings, out_dir)
+                    # normalize through write; failures name their own stage
+                    pending[next_future] = ("normalize", path)
+                else:
+                    results.append(value)
+                    if on_result is not None:
+                        on_result(value)
+
+    report = {
+        "files": len(paths),
+        "llm_repairs": repair_stats(),
+        "succeeded": len(results),
+        "failures": failures,
+        "wall_seconds": time.perf_counter() - started,
+        "stages": {stage: stage_summary(values) for stage, values in timings.items() if values},
+    }
+    return {"results": results, "report": report}
+
+
+def combined_schedule(results: List[Dict[str, Any]], settings: Dict[str, Any]):
+    # one plan across every course in the batch, as a student taking all of them
+    from utils.ics_exporter import schedule_to_ics
+
+    courses = {r["course_code"]: r["course"] for r in results}
+    rows = [a for r in results for a in r["assessments"]]
+    schedule = make_optimizer(settings).generate_raw_schedule(rows)
+    return schedule, courses, schedule_to_ics(schedule, courses)
+
+
+def stage_summary(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total_s": sum(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+        "max_ms": values[-1] * 1000,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'stage':<10} {'n':>5} {'total s':>9} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<10} {s['count']:5d} {s['total_s']:9.2f} {s['mean_ms']:9.1f} {s['p95_ms']:9.1f} {s['max_ms']:9.1f}")
+
+    wall = report["wall_seconds"]
+    print(f"\n{report['succeeded']}/{report['files']} files in {wall:.2f} s "
+          f"({report['succeeded'] / wall if wall else 0:.2f} files/s)")
+    repairs = report["llm_repairs"]
+    if repairs["responses"]:
+        print(f"LLM output: {repairs['valid_rate']:.0%} valid, {repairs['repaired_rate']:.0%} repaired, "
+              f"{repairs['unrecoverable_rate']:.0%} unrecoverable, {repairs['recalls']} re-calls")
+    for f in report["failures"]:
+        print(f"  failed {f['file']} at {f['stage']}: {f['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn a directory of syllabus PDFs into schedules and .ics files")
+    parser.add_argument("input_dir", help="directory of .pdf (or pre-extracted .txt) syllabi")
+    parser.add_argument("settings", help="settings JSON (semester dates, daily hours, ...)")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--api-key", default=None, help="OpenAI API key (default: $OPENAI_API_KEY)")
+    parser.add_argument("--extract-workers", type=int, default=None)
+    parser.add_argument("--parse-workers", type=int, default=8)
+    parser.add_argument("--build-workers", type=int, default=2)
+    parser.add_argument("--catalog", action="store_true", help="resolve parses through the shared course catalog")
+    parser.add_argument("--combined", action="store_true", help="also build one schedule across all courses")
+    args = parser.parse_args()
+
+    settings = load_settings(args.settings)
+    paths = find_inputs(args.input_dir)
+    if not paths:
+        sys.exit(f"No .pdf or .txt files in {args.input_dir}")
+
+    out_dir = Path(args.out)
+
+    def progress(result):
+        print(f"  {result['file']}: {result['course_code']}, "
+              f"{len(result['assessments'])} assessments, {result['unscheduled_hours']:g} h unscheduled")
+
+    batch = run_batch(
+        paths,
+        settings,
+        out_dir=out_dir,
+        api_key=args.api_key,
+        extract_workers=args.extract_workers,
+        parse_workers=args.parse_workers,
+        build_workers=args.build_workers,
+        use_catalog=args.catalog,
+        on_result=progress,
+    )
+    report = batch["report"]
+
+    if args.combined and batch["results"]:
+        schedule, _, ics = combined_schedule(batch["results"], settings)
+        (out_dir / "combined.schedule.json").write_text(json.dumps(schedule, indent=2), encoding="utf-8")
+        (out_dir / "combined.ics").write_text(ics, encoding="utf-8")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print_report(report)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Benchmark for utils/ics_exporter.py on a 2,000-event schedule
+#
+#   python benchmarks/bench_ics.py
+
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.calendar_index import schedule_hash
+from utils.ics_exporter import iter_ics, schedule_to_ics, cached_ics_bytes
+
+
+def make_schedule(study_events=1800, due_events=200):
+    start = date(2025, 9, 1)
+    days = []
+    for i in range(study_events // 3):
+        day = start + timedelta(days=i)
+        days.append({
+            "date": day.strftime("%Y-%m-%d"),
+            "weekday": day.strftime("%A").lower(),
+            "available_hours": 4.0,
+            "scheduled_hours": 3.0,
+            "tasks": [
+                {
+                    "assessment_id": (i * 3 + k) % due_events,
+                    "course_code": f"CP{300 + k}",
+                    "type": "assignment",
+                    "title": f"Assignment {i % 10}",
+                    "due_date": (day + timedelta(days=7)).strftime("%Y-%m-%d"),
+                    "hours": 1.0,
+                }
+                for k in range(3)
+            ],
+        })
+
+    courses = {}
+    for j in range(due_events):
+        code = f"CP{300 + j % 5}"
+        courses.setdefault(code, {"course_info": {"course_name": code}, "assessments": {"breakdown": []}})
+        courses[code]["assessments"]["breakdown"].append({
+            "type": f"Quiz {j}",
+            "weight": 1,
+            "due_date": (start + timedelta(days=j)).strftime("%Y-%m-%dT23:59:00"),
+            "notes": None,
+        })
+    return {"days": days, "allocations": []}, courses
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<32} {best * 1000:8.2f} ms")
+    return result
+
+
+def main():
+    schedule, courses = make_schedule()
+    text = schedule_to_ics(schedule, courses)
+    print(f"events: {text.count('BEGIN:VEVENT')}, size: {len(text) / 1024:.0f} KiB")
+
+    timed("schedule_to_ics (full string)", lambda: schedule_to_ics(schedule, courses))
+    timed("iter_ics first chunk", lambda: next(iter(iter_ics(schedule, courses))))
+    key = timed("schedule_hash", lambda: schedule_hash(schedule, courses))
+    cached_ics_bytes(key, schedule, courses)
+    timed("cached_ics_bytes (memo hit)", lambda: cached_ics_bytes(key, schedule, courses))
+
+
+if __name__ == "__main__":
+    main()
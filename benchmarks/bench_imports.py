@@ -0,0 +1,105 @@
+# Import-time profile per page, and a guard against heavy eager imports
+#
+#   python benchmarks/bench_imports.py [--budget-ms 150]
+#
+# Runs each page's top-level imports in a fresh interpreter with
+# `python -X importtime`, reports the time spent on the app's own imports
+# (on top of streamlit), and fails if a page pulls in a heavy dependency it
+# is not allowed to load at start-up, or exceeds the budget.
+
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = ["Welcome.py"] + sorted(str(p.relative_to(ROOT)) for p in (ROOT / "pages").glob("*.py"))
+
+HEAVY = {"pandas", "numpy", "openai", "supabase", "PyPDF2", "pyarrow"}
+
+# heavy modules a page genuinely needs before it can draw anything
+# (pandas may pull in pyarrow), and the larger budget that comes with them
+ALLOWED = {
+    "pages/2_Optimize.py": {"pandas", "numpy", "pyarrow"},
+    "pages/4_Workload.py": {"pandas", "numpy", "pyarrow"},
+}
+PANDAS_BUDGET_MS = 1000.0
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - t0
+print(repr((elapsed, sorted(m for m in {heavy!r} if m in sys.modules))))
+"""
+
+
+def top_level_imports(path):
+    tree = ast.parse((ROOT / path).read_text(encoding="utf-8"))
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node))
+    return "\n".join(lines)
+
+
+def probe(imports):
+    code = PROBE.format(imports=imports or "pass", heavy=HEAVY)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    elapsed, loaded = eval(result.stdout.strip().splitlines()[-1])
+
+    # slowest self-time modules from the importtime report
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if parts[0].isdigit():
+            rows.append((int(parts[0]), parts[2].strip()))
+    rows.sort(reverse=True)
+    return elapsed * 1000, loaded, rows[:3]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="max import time per page on top of streamlit")
+    args = parser.parse_args()
+
+    base_ms, _, _ = probe("import streamlit")
+    print(f"{'streamlit baseline':<24} {base_ms:8.1f} ms")
+
+    failures = []
+    for page in PAGES:
+        try:
+            total_ms, loaded, slowest = probe(top_level_imports(page))
+        except RuntimeError as e:
+            print(f"{page:<24} skipped ({e})")
+            continue
+
+        own_ms = max(total_ms - base_ms, 0.0)
+        unexpected = set(loaded) - ALLOWED.get(page, set())
+        hot = ", ".join(f"{name} {us / 1000:.1f}ms" for us, name in slowest)
+        print(f"{page:<24} {own_ms:8.1f} ms   heavy: {', '.join(loaded) or '-':<16} slowest: {hot}")
+
+        if unexpected:
+            failures.append(f"{page} eagerly imports {', '.join(sorted(unexpected))}")
+        budget = PANDAS_BUDGET_MS if page in ALLOWED else args.budget_ms
+        if own_ms > budget:
+            failures.append(f"{page} import time {own_ms:.0f} ms exceeds {budget:.0f} ms")
+
+    if failures:
+        print("\nFAIL\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Speed and agreement of utils.normalize against the original if-chain
+#
+#   python benchmarks/bench_normalize.py
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.normalize import TypeClassifier, normalize_type, normalize_types
+
+
+# type strings as they come back from parse_syllabus on real outlines
+CORPUS = [
+    "Assignment 1", "Assignment 2", "Assignments", "Programming Assignment 3",
+    "Written Assignment", "Group Assignment", "Lab Assignment 4",
+    "Quiz 1", "Quiz 2", "Quizzes", "Online Quiz", "In-class Quiz", "Weekly Quiz 5",
+    "Reading Quiz 3", "Lab Quiz 2", "Pop Quiz",
+    "Midterm", "Midterm Exam", "Mid-term Test", "Mid Term", "Midterm 2",
+    "Final Exam", "Final", "Final Project", "Final Report", "Final Presentation",
+    "Take-home Exam", "Exam", "Exams", "Term Test", "Test 1",
+    "Project", "Group Project", "Project Proposal", "Project Milestone 2",
+    "Term Project", "Capstone Project", "Project Presentation",
+    "Presentation", "Group Presentation", "Oral Presentation", "Seminar Presentation",
+    "Lab 1", "Lab 2", "Labs", "Lab Report 3", "Prelab 4", "Pre-lab Exercise",
+    "Lab Exercises", "Reading Lab",
+    "Report", "Technical Report", "Research Report",
+    "Case Study", "Case Study 2", "Case Analysis",
+    "Discussion Post", "Discussion Board", "Online Discussion 3",
+    "Reading Response", "Readings", "Reading Reflection 2",
+    "Homework", "Homework 3", "HW 2", "HW3", "Weekly Homework",
+    "Essay", "Research Essay", "Argumentative Essay 1",
+    "Participation", "Class Participation", "Attendance", "Tutorial Participation",
+    "Tutorial 4", "Peer Review", "Reflection Journal", "Portfolio",
+    "Collaboration Exercise", "Showcase", "Representation Exercise", "Thread Summary",
+    "Problem Set 2", "Worksheet", "Syllabus Quiz", "Exercise 5",
+]
+
+
+def legacy_normalize_type(t):
+    t = (t or "").strip().lower()
+    if "assignment" in t:
+        return "assignment"
+    if "quiz" in t:
+        return "quiz"
+    if "mid" in t and "term" in t:
+        return "midterm"
+    if "final" in t:
+        return "final"
+    if "exam" in t:
+        return "exam"
+    if "project" in t:
+        return "project"
+    if "present" in t:
+        return "presentation"
+    if "lab" in t:
+        return "lab"
+    if "report" in t:
+        return "report"
+    if "case" in t:
+        return "case_study"
+    if "discussion" in t:
+        return "discussion"
+    if "read" in t:
+        return "reading"
+    if "homework" in t or "hw" in t:
+        return "homework"
+    if "essay" in t:
+        return "essay"
+    return t
+
+
+def timed(label, fn, n):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<36} {elapsed * 1e9 / n:8.0f} ns/item")
+
+
+def main():
+    stream = CORPUS * 2000
+    n = len(stream)
+
+    timed("legacy if-chain", lambda: [legacy_normalize_type(t) for t in stream], n)
+    cold = TypeClassifier()
+    timed("compiled regex (cold, no memo)", lambda: [cold._classify(t) for t in stream], n)
+    # every string distinct, so the memo never hits (first load of new courses)
+    fresh = [f"{t} {i}" for i, t in enumerate(stream)]
+    timed("legacy if-chain (distinct)", lambda: [legacy_normalize_type(t) for t in fresh], n)
+    miss = TypeClassifier()
+    timed("normalize_type (distinct, memo miss)", lambda: [miss.classify(t) for t in fresh], n)
+    timed("normalize_type (memoized)", lambda: [normalize_type(t) for t in stream], n)
+    timed("normalize_types (list)", lambda: normalize_types(stream), n)
+
+    try:
+        import pandas as pd
+        series = pd.Series(stream)
+        timed("normalize_types (pandas Series)", lambda: normalize_types(series), n)
+    except ImportError:
+        pass
+
+    disagreements = [
+        (t, legacy_normalize_type(t), normalize_type(t))
+        for t in CORPUS
+        if legacy_normalize_type(t) != normalize_type(t)
+    ]
+    agreement = 1 - len(disagreements) / len(CORPUS)
+    print(f"\nagreement with legacy: {agreement:.1%} ({len(CORPUS)} strings)")
+    for t, old, new in disagreements:
+        print(f"  {t!r:<28} {old:<14} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
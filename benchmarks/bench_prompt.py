@@ -0,0 +1,170 @@
+# Prompt layout and model routing benchmark against a fake LLM backend
+#
+#   python benchmarks/bench_prompt.py [--requests 300] [--terms 4]
+#
+# Replays the same stream of syllabi (short, medium and very long outlines,
+# students spread over a few semesters) through three configurations:
+#
+#   legacy   semester dates interpolated at the top of one big user prompt,
+#            gpt-4o-mini for everything (the old parse_syllabus)
+#   static   fixed SYSTEM_PROMPT prefix, variable data last, gpt-4o-mini
+#   routed   static prefix plus route_model() by document size
+#   chunked  routed, and outlines over CHUNKED_ABOVE tokens are parsed in
+#            parts in parallel (parse_syllabus); a request's latency is its
+#            slowest part, its tokens and cost the sum over parts
+#
+# Each configuration gets a fresh FakeLLM from benchmarks/stubs.py, which
+# applies provider-style prefix caching (>= 1024 shared tokens, 128-token
+# steps) and a simple prefill/decode latency model. Latency is simulated, not
+# slept. Cost uses the per-million-token list prices in PRICES.
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stubs import FakeLLM, LocalStore, install
+
+# USD per 1M tokens: (input, cached input, output)
+PRICES = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+}
+
+# seconds per 1k tokens relative to gpt-4o-mini
+MODEL_SPEED = {"gpt-4.1-nano": 0.6, "gpt-4o-mini": 1.0, "gpt-4.1-mini": 1.3}
+
+SIZES = {"short": 2, "medium": 12, "long": 80, "pack": 160}   # pages
+CHARS_PER_PAGE = 3000
+
+
+def legacy_messages(text, semester_start, semester_end):
+    from scraper import SYSTEM_PROMPT
+
+    intro, rules = SYSTEM_PROMPT.split("\n", 1)
+    rules = rules.split("\n", 1)[1]   # drop the "dates are in the user message" line
+    prompt = (
+        f"{intro}\n\nSEMESTER DATES:\n- Semester starts: {semester_start}\n- Semester ends: {semester_end}\n"
+        f"{rules}\n\n---------------------------------------\nSYLLABUS TEXT:\n{text}\n"
+    )
+    return [
+        {"role": "system", "content": "Extract structured syllabus data and output STRICT JSON only."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def make_requests(count, terms, seed=0):
+    rng = random.Random(seed)
+    semesters = [(f"{2024 + t // 3}-{(1, 5, 9)[t % 3]:02d}-04", f"{2024 + t // 3}-{(4, 8, 12)[t % 3]:02d}-20")
+                 for t in range(terms)]
+    filler = "Lecture topics, readings and policies for the week. " * (CHARS_PER_PAGE // 52)
+
+    requests = []
+    for i in range(count):
+        size = rng.choices(list(SIZES), weights=[60, 30, 8, 2])[0]
+        code = f"CP{100 + rng.randrange(60)}"
+        pages = (f"Week {p + 1}\n{filler}\f" for p in range(SIZES[size]))
+        text = f"COURSE_CODE: {code}\nSection {i}\n" + "".join(pages)
+        start, end = rng.choice(semesters)
+        requests.append((size, text, start, end))
+    return requests
+
+
+def _cost(call):
+    prices = PRICES[call["model"]]
+    return ((call["prompt_tokens"] - call["cached_tokens"]) * prices[0]
+            + call["cached_tokens"] * prices[1] + call["completion_tokens"] * prices[2]) / 1e6
+
+
+def run_config(name, requests, llm_args):
+    import scraper
+
+    llm = FakeLLM(**llm_args)
+    install(LocalStore(), llm)
+    parser = scraper.SyllabusScraper("local")
+
+    records = []
+    for size, text, start, end in requests:
+        first = len(llm.calls)
+        if name == "legacy":
+            parser._complete(legacy_messages(text, start, end), "gpt-4o-mini", None)
+        elif name == "static":
+            parser._complete(scraper.build_messages(text, start, end), "gpt-4o-mini", None)
+        elif name == "routed":
+            parser._complete(scraper.build_messages(text, start, end), *scraper.route_model(text))
+        else:
+            parser.parse_syllabus(text, start, end)
+
+        calls = llm.calls[first:]
+        records.append({
+            "size": size,
+            "calls": len(calls),
+            "models": {c["model"] for c in calls},
+            "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+            "cached_tokens": sum(c["cached_tokens"] for c in calls),
+            "latency": max(c["latency"] for c in calls),
+            "cost": sum(_cost(c) for c in calls),
+        })
+    return records
+
+
+def summarize(calls):
+    def pct(values, p):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+    prompt = sum(c["prompt_tokens"] for c in calls)
+    cached = sum(c["cached_tokens"] for c in calls)
+    cost = sum(c["cost"] for c in calls)
+    latencies = [c["latency"] for c in calls]
+    return {
+        "n": len(calls),
+        "calls": sum(c["calls"] for c in calls) / len(calls),
+        "prompt_tokens": prompt / len(calls),
+        "cached": cached / prompt if prompt else 0.0,
+        "mean_s": sum(latencies) / len(latencies),
+        "p95_s": pct(latencies, 0.95),
+        "cost": cost,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt layouts and model routing on a fake backend")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--terms", type=int, default=4, help="distinct semesters in the request stream")
+    parser.add_argument("--base-latency", type=float, default=0.4, help="fixed seconds per call")
+    parser.add_argument("--prefill-per-1k", type=float, default=0.03, help="seconds per 1k uncached prompt tokens")
+    parser.add_argument("--decode-per-1k", type=float, default=2.0, help="seconds per 1k output tokens")
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests, args.terms)
+    llm_args = {
+        "latency": args.base_latency,
+        "prefill_per_1k": args.prefill_per_1k,
+        "decode_per_1k": args.decode_per_1k,
+        "model_speed": MODEL_SPEED,
+        "sleep": False,
+    }
+
+    print(f"{args.requests} requests over {args.terms} semesters "
+          f"({', '.join(f'{s}={p}p' for s, p in SIZES.items())})\n")
+    print(f"{'config':<8} {'size':<7} {'n':>4} {'prompt tok':>11} {'cached':>7} {'mean s':>7} {'p95 s':>7} {'cost $':>8} {'calls':>6}  models")
+
+    for name in ("legacy", "static", "routed", "chunked"):
+        calls = run_config(name, requests, llm_args)
+        for size in list(SIZES) + ["all"]:
+            subset = calls if size == "all" else [c for c in calls if c["size"] == size]
+            if not subset:
+                continue
+            s = summarize(subset)
+            models = ", ".join(sorted(set().union(*(c["models"] for c in subset))))
+            print(f"{name:<8} {size:<7} {s['n']:4d} {s['prompt_tokens']:11.0f} {s['cached']:7.1%} "
+                  f"{s['mean_s']:7.2f} {s['p95_s']:7.2f} {s['cost']:8.4f} {s['calls']:6.1f}  {models}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
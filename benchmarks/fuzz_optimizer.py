@@ -0,0 +1,329 @@
+# Seeded fuzz harness for ScheduleOptimizer invariants
+#
+#   python benchmarks/fuzz_optimizer.py [--cases 2000] [--seed 0]
+#   python benchmarks/fuzz_optimizer.py --engine mypkg.fast:FastOptimizer
+#
+# Generates random semesters (one day to several years), weekly hours with
+# empty days, capacity exceptions (zero-capacity weeks, recurring rules) and
+# assessments with odd hours and malformed, missing or out-of-semester due
+# dates, then checks every plan against properties computed independently of
+# the optimizer:
+#
+#   capacity     no day holds more hours than its capacity (weekly hours with
+#                exceptions applied, last exception wins)
+#   window       every task lies in its assessment's work window
+#                [due - work_ahead_days, due], clipped to the semester
+#   conservation scheduled + unscheduled = required (on the half-hour grid),
+#                and scheduled equals the task hours placed for it
+#   granularity  task, scheduled and unscheduled hours are multiples of 0.5
+#   status       "ok" exactly when nothing is left unscheduled; malformed or
+#                missing due dates and zero hours schedule nothing
+#   determinism  the same input gives the same plan
+#
+# --engine loads another class with ScheduleOptimizer's constructor and
+# generate_raw_schedule; its plans must satisfy the same properties and, by
+# default, match the reference greedy engine exactly (--invariants-only
+# accepts any valid plan). A failing case is shrunk by dropping assessments
+# and exceptions while it still fails, and written as JSON to --save-dir so
+# it can be replayed with --replay.
+
+import argparse
+import copy
+import importlib
+import json
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schedule import DAY_NAMES, ScheduleOptimizer
+
+TYPES = ["assignment", "quiz", "lab", "midterm", "final", "project", "essay", "Reading", "", None]
+MALFORMED_DATES = ["2025-13-40", "TBA", "next week", "2025/10/01", "2025-10-01T25:00:00", "10-01-2025", " "]
+EPS = 1e-6
+
+
+# Case generation
+
+def _iso(d):
+    return d.strftime("%Y-%m-%d")
+
+
+def make_case(rng):
+    start = date(2024, 1, 1) + timedelta(days=rng.randrange(4 * 365))
+    length = rng.choice([0, 1, 6, 30, 90, 120, 120, 240, 400, 1100])
+    end = start + timedelta(days=length)
+
+    daily_hours = {}
+    for name in DAY_NAMES:
+        daily_hours[name] = rng.choice([0, 0, 0.5, 1, 1.5, 2, 3, 4, 6, 8, 2.25])
+    if rng.random() < 0.05:
+        daily_hours = {name: 0 for name in DAY_NAMES}
+
+    work_ahead = {t.lower(): rng.choice([0, 1, 3, 7, 14, 30, 90]) for t in TYPES if t and rng.random() < 0.7}
+
+    exceptions = []
+    for _ in range(rng.choice([0, 0, 1, 3, 10, 40])):
+        first = start + timedelta(days=rng.randrange(-20, max(length, 1) + 20))
+        kind = rng.random()
+        if kind < 0.4:
+            # a zero-capacity week (reading week, exams, travel)
+            first -= timedelta(days=first.weekday())
+            exceptions.append({"start": _iso(first), "end": _iso(first + timedelta(days=6)), "hours": 0})
+        elif kind < 0.7:
+            exceptions.append({"start": _iso(first), "end": _iso(first + timedelta(days=rng.randrange(5))),
+                               "hours": rng.choice([0, 0.5, 1, 3, 10])})
+        else:
+            entry = {"weekday": rng.choice(DAY_NAMES), "hours": rng.choice([0, 1, 2.5]),
+                     "every": rng.choice([1, 1, 2, 3])}
+            if rng.random() < 0.7:
+                entry["start"] = _iso(first)
+            if rng.random() < 0.5:
+                entry["end"] = _iso(first + timedelta(days=rng.randrange(7, 120)))
+            exceptions.append(entry)
+
+    assessments = []
+    for i in range(rng.choice([0, 1, 5, 20, 40, 80])):
+        due = start + timedelta(days=rng.randrange(-30, max(length, 1) + 30))
+        roll = rng.random()
+        if roll < 0.55:
+            due_date = _iso(due)
+        elif roll < 0.8:
+            due_date = f"{_iso(due)}T{rng.randrange(24):02d}:{rng.choice([0, 30, 59]):02d}:00"
+        elif roll < 0.9:
+            due_date = rng.choice(MALFORMED_DATES)
+        else:
+            due_date = rng.choice([None, ""])
+
+        hours = rng.choice([0, 1, 2, 3, 4, 6, 10, 25, 60, 0.5, 0.25, 2.3, 7.75, -2, None, float("nan")])
+        assessments.append({
+            "id": f"a{i}",
+            "course_code": f"CP{rng.randrange(100, 110)}",
+            "type": rng.choice(TYPES),
+            "title": f"Item {i}",
+            "due_date": due_date,
+            "hours_required": hours,
+        })
+
+    return {
+        "semester_start": _iso(start),
+        "semester_end": _iso(end),
+        "daily_hours": daily_hours,
+        "work_ahead_days": work_ahead,
+        "capacity_exceptions": exceptions,
+        "assessments": assessments,
+    }
+
+
+# Independent reference values
+
+def _parse_due(value):
+    if not isinstance(value, str):
+        return None
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def expected_capacity(case, day):
+    hours = float(case["daily_hours"].get(DAY_NAMES[day.weekday()], 0.0))
+    for e in case["capacity_exceptions"]:
+        first = date.fromisoformat(e["start"]) if e.get("start") else None
+        last = date.fromisoformat(e["end"]) if e.get("end") else None
+        if "weekday" not in e:
+            if first <= day <= (last or first):
+                hours = float(e["hours"])
+            continue
+        if DAY_NAMES[day.weekday()] != e["weekday"] or (first and day < first) or (last and day > last):
+            continue
+        anchor = first or date.fromisoformat(case["semester_start"])
+        first_hit = anchor + timedelta(days=(DAY_NAMES.index(e["weekday"]) - anchor.weekday()) % 7)
+        if (day - first_hit).days % (7 * e.get("every", 1)) == 0:
+            hours = float(e["hours"])
+    return hours
+
+
+def expected_window(case, assessment):
+    due = _parse_due(assessment.get("due_date"))
+    if due is None:
+        return None
+    start = date.fromisoformat(case["semester_start"])
+    end = date.fromisoformat(case["semester_end"])
+    ahead = case["work_ahead_days"].get((assessment.get("type") or "unknown").lower(), 7)
+    return max(due - timedelta(days=ahead), start), min(due, end)
+
+
+def _on_grid(x):
+    return abs(x * 2 - round(x * 2)) < EPS
+
+
+def _required(a):
+    # hours rounded up to the half-hour grid; missing, NaN or negative count as none
+    hours = a.get("hours_required")
+    if hours is None or not math.isfinite(hours):
+        return 0.0
+    return max(math.ceil(hours * 2 - 1e-9) / 2, 0.0)
+
+
+# Properties
+
+def check(case, plan):
+    problems = []
+    by_id = {a["id"]: a for a in case["assessments"]}
+    placed = {}
+
+    for day in plan.get("days", []):
+        d = date.fromisoformat(day["date"])
+        total = sum(t["hours"] for t in day["tasks"])
+        cap = expected_capacity(case, d)
+        if total > cap + EPS:
+            problems.append(f"capacity: {day['date']} has {total} h of {cap} h")
+        for t in day["tasks"]:
+            aid = t["assessment_id"]
+            placed[aid] = placed.get(aid, 0.0) + t["hours"]
+            if t["hours"] <= 0 or not _on_grid(t["hours"]):
+                problems.append(f"granularity: {aid} gets {t['hours']} h on {day['date']}")
+            window = expected_window(case, by_id[aid]) if aid in by_id else None
+            if window is None:
+                problems.append(f"window: {aid} scheduled on {day['date']} without a usable due date")
+            elif not window[0] <= d <= window[1]:
+                problems.append(f"window: {aid} on {day['date']} outside {window[0]}..{window[1]}")
+
+    allocations = {a["assessment_id"]: a for a in plan.get("allocations", [])}
+    if sorted(allocations) != sorted(by_id):
+        problems.append(f"allocations: {len(allocations)} summaries for {len(by_id)} assessments")
+
+    for aid, a in by_id.items():
+        s = allocations.get(aid)
+        if s is None:
+            continue
+        required = _required(a)
+        scheduled, unscheduled = s["scheduled_hours"], s["unscheduled_hours"]
+        if not (_on_grid(scheduled) and _on_grid(unscheduled)):
+            problems.append(f"granularity: {aid} summary {scheduled} + {unscheduled}")
+        if abs(scheduled - placed.get(aid, 0.0)) > EPS:
+            problems.append(f"conservation: {aid} reports {scheduled} h scheduled, {placed.get(aid, 0.0)} h placed")
+        if required > 0 and abs(scheduled + unscheduled - required) > EPS:
+            problems.append(f"conservation: {aid} {scheduled} + {unscheduled} != {required}")
+        if (unscheduled <= EPS) != (s["status"] == "ok") and required > 0 and expected_window(case, a):
+            problems.append(f"status: {aid} is {s['status']} with {unscheduled} h unscheduled")
+        if (required <= 0 or expected_window(case, a) is None) and scheduled:
+            problems.append(f"status: {aid} scheduled {scheduled} h with no hours or no usable due date")
+    return problems
+
+
+# Running engines
+
+def run_engine(engine, case):
+    optimizer = engine(
+        case["semester_start"], case["semester_end"], case["daily_hours"],
+        case["work_ahead_days"], case["capacity_exceptions"],
+    )
+    return optimizer.generate_raw_schedule(copy.deepcopy(case["assessments"]))
+
+
+def failures(case, engine, exact):
+    try:
+        plan = run_engine(ScheduleOptimizer, case)
+    except Exception as e:
+        return [f"crash: reference raised {type(e).__name__}: {e}"]
+
+    problems = check(case, plan)
+    if json.dumps(plan, sort_keys=True) != json.dumps(run_engine(ScheduleOptimizer, case), sort_keys=True):
+        problems.append("determinism: two runs of the reference differ")
+
+    if engine is not ScheduleOptimizer:
+        try:
+            other = run_engine(engine, case)
+        except Exception as e:
+            return problems + [f"crash: engine raised {type(e).__name__}: {e}"]
+        problems += [f"engine {p}" for p in check(case, other)]
+        if exact and json.dumps(plan, sort_keys=True) != json.dumps(other, sort_keys=True):
+            problems.append("engine: plan differs from the reference")
+    return problems
+
+
+def shrink(case, engine, exact):
+    # drop assessments, then exceptions, one at a time while the case still fails
+    for key in ("assessments", "capacity_exceptions"):
+        i = 0
+        while i < len(case[key]):
+            smaller = dict(case, **{key: case[key][:i] + case[key][i + 1:]})
+            if failures(smaller, engine, exact):
+                case = smaller
+            else:
+                i += 1
+    return case
+
+
+def load_engine(spec):
+    if not spec:
+        return ScheduleOptimizer
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz ScheduleOptimizer invariants")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", default=None, help="alternate engine as module:Class")
+    parser.add_argument("--invariants-only", action="store_true",
+                        help="accept any valid plan from --engine instead of requiring the reference's")
+    parser.add_argument("--max-failures", type=int, default=5)
+    parser.add_argument("--save-dir", default="fuzz_failures")
+    parser.add_argument("--replay", default=None, help="re-run one saved case (JSON file)")
+    args = parser.parse_args()
+
+    engine = load_engine(args.engine)
+    exact = not args.invariants_only
+
+    if args.replay:
+        case = json.loads(Path(args.replay).read_text(encoding="utf-8"))
+        problems = failures(case, engine, exact)
+        print("\n".join(problems) or "ok")
+        sys.exit(1 if problems else 0)
+
+    started = time.perf_counter()
+    found = []
+    stats = {"assessments": 0, "days": 0, "malformed": 0}
+    for n in range(args.cases):
+        rng = random.Random(f"{args.seed}-{n}")
+        case = make_case(rng)
+        stats["assessments"] += len(case["assessments"])
+        stats["days"] += (date.fromisoformat(case["semester_end"]) - date.fromisoformat(case["semester_start"])).days + 1
+        stats["malformed"] += sum(1 for a in case["assessments"] if _parse_due(a["due_date"]) is None)
+
+        problems = failures(case, engine, exact)
+        if not problems:
+            continue
+
+        case = shrink(case, engine, exact)
+        problems = failures(case, engine, exact)
+        save_dir = Path(args.save_dir)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        path = save_dir / f"case-{args.seed}-{n}.json"
+        path.write_text(json.dumps(case, indent=2), encoding="utf-8")
+        found.append((n, path, problems))
+        print(f"case {n}: {len(problems)} problems, shrunk to {len(case['assessments'])} assessments -> {path}")
+        for p in problems[:5]:
+            print(f"    {p}")
+        if len(found) >= args.max_failures:
+            break
+
+    wall = time.perf_counter() - started
+    print(f"\n{n + 1} cases (seed {args.seed}), {stats['assessments']} assessments "
+          f"({stats['malformed']} without a usable due date), {stats['days']} semester days "
+          f"in {wall:.1f} s: {len(found)} failing")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
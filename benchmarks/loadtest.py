@@ -0,0 +1,287 @@
+# Multi-session load test for the Streamlit pages
+#
+#   python benchmarks/loadtest.py --sessions 20 --concurrency 8 --llm-latency 1.5
+#
+# Each simulated student walks the app the way a new user does:
+#
+#   Upload    save semester dates, then parse --courses syllabi
+#   Settings  set daily hours and save
+#   Optimize  generate a plan and wait for the background job
+#   Calendar  tick off one of today's tasks (if any), page to next week
+#   Workload  open the heatmap
+#
+# Pages are driven with streamlit.testing AppTest, one AppTest per page with
+# the session state carried over, and all sessions share this process the way
+# they share a Streamlit server. Supabase and OpenAI are replaced by the local
+# stand-ins in benchmarks/stubs.py. AppTest cannot upload files, so the parse
+# step calls resolve_syllabus and save_courses directly, exactly as the Upload
+# page does after text extraction. Sessions draw their courses from --catalog
+# distinct syllabi, so repeated uploads are served by the shared catalog.
+#
+# AppTest swaps process-wide state (secrets, script cache) while a script
+# runs, so script runs are serialized behind one lock; LLM calls, background
+# schedule jobs and think time still overlap. That matches a single server
+# process, where reruns share one GIL, and the measured rerun latency
+# includes the time spent queued behind other sessions.
+#
+# Reported: p50/p95/p99 rerun latency (overall and per page), syllabus parse
+# latency, throughput, and resident memory per session while all sessions
+# are held open.
+
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from benchmarks.stubs import LocalStore, FakeLLM, install
+
+# session keys that survive a page switch in a real session
+CARRY = (
+    "user", "uid", "courses", "settings", "schedule", "completions",
+    "_loaded_docs", "assessment_store", "schedule_job", "previous_plan", "schedule_courses",
+    "calendar_index", "calendar_render_cache", "calendar_week_index", "completions_version",
+)
+
+PAGES = {
+    "upload": "pages/0_Upload.py",
+    "settings": "pages/1_Setting.py",
+    "optimize": "pages/2_Optimize.py",
+    "calendar": "pages/3_Calendar.py",
+    "workload": "pages/4_Workload.py",
+}
+
+_SCRIPT_LOCK = threading.Lock()
+
+SECRETS = {"SUPABASE_URL": "http://localhost", "SUPABASE_ANON_KEY": "local", "OPENAI_API_KEY": "local"}
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Session:
+
+    def __init__(self, index, args, timings):
+        self.index = index
+        self.args = args
+        self.timings = timings
+        self.uid = f"student-{index}"
+        self.state = {"uid": self.uid, "user": {"id": self.uid}}
+        self.at = None
+        self.errors = []
+
+    # page driving
+
+    def open(self, page):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(ROOT / PAGES[page]), default_timeout=self.args.timeout)
+        for k, v in SECRETS.items():
+            self.at.secrets[k] = v
+        for k, v in self.state.items():
+            self.at.session_state[k] = v
+        self._run(page, self.at.run)
+        return self.at
+
+    def act(self, page, element):
+        # element is a widget already updated with click()/set_value()/check()
+        self._run(page, element.run)
+
+    def _run(self, page, fn):
+        started = time.perf_counter()
+        with _SCRIPT_LOCK:
+            fn()
+            for k in CARRY:
+                if k in self.at.session_state:
+                    self.state[k] = self.at.session_state[k]
+        self.timings.add(page, time.perf_counter() - started)
+        for e in self.at.exception:
+            # switch_page has nowhere to go under AppTest; the job was adopted
+            if not str(e.value).startswith("Could not find page"):
+                self.errors.append(f"{page}: {e.value}")
+
+    def button(self, label):
+        return next(b for b in self.at.button if b.label == label)
+
+    def think(self):
+        if self.args.think:
+            time.sleep(self.args.think)
+
+    # flow
+
+    def run(self):
+        today = date.today()
+        start = (today - timedelta(days=30)).isoformat()
+        end = (today + timedelta(days=70)).isoformat()
+
+        at = self.open("upload")
+        at.text_input[0].set_value(start)
+        at.text_input[1].set_value(end)
+        self.act("upload", self.button("Save Semester Dates").click())
+        self.think()
+        self.parse_syllabi(start, end)
+        self.think()
+
+        at = self.open("settings")
+        for day_input in at.number_input[:7]:
+            day_input.set_value(3.0)
+        self.act("settings", self.button("Save Settings").click())
+        self.think()
+
+        at = self.open("optimize")
+        self.act("optimize", self.button("Generate Study Plan").click())
+        job = self.state.get("schedule_job")
+        deadline = time.perf_counter() + self.args.timeout
+        while job is not None and job.running and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        # the status fragment adopts the finished job on the next rerun
+        self.act("optimize", at)
+        self.think()
+
+        at = self.open("calendar")
+        if at.checkbox:
+            self.act("calendar", at.checkbox[0].check())
+        self.act("calendar", self.button("Next Week").click())
+        self.think()
+
+        self.open("workload")
+        return self
+
+    def parse_syllabi(self, start, end):
+        from scraper import SyllabusScraper
+        from sb_functions import save_courses
+        from utils.course_catalog import resolve_syllabus
+
+        scraper = SyllabusScraper(SECRETS["OPENAI_API_KEY"])
+        courses = dict(self.state.get("courses") or {})
+        for c in range(self.args.courses):
+            code = f"CP{100 + (self.index * self.args.courses + c) % self.args.catalog}"
+            started = time.perf_counter()
+            text = f"COURSE_CODE: {code}\n{'Syllabus text. ' * 400}"
+            data = resolve_syllabus(scraper, text, start, end)
+            self.timings.add("parse", time.perf_counter() - started)
+            courses[data["course_info"]["course_code"]] = data
+        self.state["courses"] = courses
+        save_courses(self.uid, courses)
+
+
+class Timings:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def reruns(self):
+        return [s for name, values in self.samples.items() if name != "parse" for s in values]
+
+
+def run_session(index, args, timings):
+    try:
+        return Session(index, args, timings).run()
+    except Exception as e:
+        session = Session(index, args, timings)
+        session.errors.append(f"session aborted: {type(e).__name__}: {e}")
+        return session
+
+
+def report(args, timings, sessions, wall, rss_before, rss_after, store, llm):
+    def row(name, values):
+        ms = [v * 1000 for v in values]
+        return (
+            f"{name:<10} {len(ms):6d} {percentile(ms, 50):9.1f} {percentile(ms, 95):9.1f} "
+            f"{percentile(ms, 99):9.1f} {max(ms, default=0):9.1f}"
+        )
+
+    print(f"\n{args.sessions} sessions, concurrency {args.concurrency}, "
+          f"LLM latency {args.llm_latency:g}s ± {args.llm_jitter:g}s, DB latency {args.db_latency * 1000:g}ms")
+    print(f"\n{'':<10} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(row("reruns", timings.reruns()))
+    for name in PAGES:
+        if name in timings.samples:
+            print(row(name, timings.samples[name]))
+    if "parse" in timings.samples:
+        print(row("parse", timings.samples["parse"]))
+
+    reruns = len(timings.reruns())
+    completed = sum(1 for s in sessions if not s.errors)
+    print(f"\nwall time        {wall:8.2f} s")
+    print(f"throughput       {reruns / wall:8.1f} reruns/s, {completed / wall * 60:.1f} sessions/min")
+    print(f"memory           {(rss_after - rss_before) / max(len(sessions), 1) / 1024:8.0f} KiB RSS per open session "
+          f"({rss_before / 2 ** 20:.0f} -> {rss_after / 2 ** 20:.0f} MiB)")
+    user_bytes = store.size_bytes() - store.size_bytes("course_catalog")
+    print(f"storage          {store.reads} reads, {store.writes} writes, "
+          f"{user_bytes / max(len(sessions), 1) / 1024:.1f} KiB stored per user, "
+          f"{store.size_bytes('course_catalog') / 1024:.1f} KiB shared catalog")
+    print(f"LLM calls        {len(llm.calls)}")
+
+    errors = [e for s in sessions for e in s.errors]
+    if errors:
+        print(f"\n{len(errors)} errors:")
+        for e in errors[:10]:
+            print(f"  {e}")
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the app pages across N simulated sessions")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--courses", type=int, default=4, help="syllabi parsed per session")
+    parser.add_argument("--catalog", type=int, default=40, help="distinct course codes to draw from")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per fake OpenAI call")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds per fake Supabase call")
+    parser.add_argument("--think", type=float, default=0.0, help="pause between user actions, seconds")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    store = LocalStore(latency=args.db_latency)
+    llm = FakeLLM(latency=args.llm_latency, jitter=args.llm_jitter)
+    install(store, llm)
+
+    # warm imports and caches so the first sessions aren't measured cold
+    Session(-1, argparse.Namespace(**{**vars(args), "courses": 1, "think": 0}), Timings()).run()
+    llm.calls.clear()
+
+    gc.collect()
+    rss_before = rss_bytes()
+    timings = Timings()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        sessions = list(pool.map(lambda i: run_session(i, args, timings), range(args.sessions)))
+    wall = time.perf_counter() - started
+    gc.collect()
+    rss_after = rss_bytes()
+
+    sys.exit(report(args, timings, sessions, wall, rss_before, rss_after, store, llm))
+
+
+if __name__ == "__main__":
+    main()
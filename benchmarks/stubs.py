@@ -0,0 +1,278 @@
+# Local stand-ins for Supabase and OpenAI, used by the benchmark harnesses
+#
+#   from benchmarks.stubs import LocalStore, FakeLLM, install
+#   store, llm = LocalStore(), FakeLLM(latency=1.5)
+#   install(store, llm)
+#
+# install() registers fake `supabase` and `openai` modules in sys.modules, so
+# supabase_client.get_client() and SyllabusScraper pick them up unchanged.
+# Only the calls the app makes are implemented.
+
+import json
+import random
+import sys
+import threading
+import time
+import types
+from datetime import date, timedelta
+
+
+class _Result:
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self._columns = None
+        self._filters = []
+        self._upsert = None
+        self._delete = False
+
+    def select(self, columns="*"):
+        self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def upsert(self, row):
+        self._upsert = row
+        return self
+
+    def delete(self):
+        self._delete = True
+        return self
+
+    def execute(self):
+        self.store._wait()
+        if self._upsert is not None:
+            return _Result([self.store._put(self.table, self._upsert)])
+        if self._delete:
+            return _Result(self.store._delete(self.table, self._filters))
+
+        rows = self.store._rows(self.table)
+        rows = [r for r in rows if all(r.get(c) == v for c, v in self._filters)]
+        if self._columns and self._columns != ["*"]:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        return _Result(rows)
+
+
+class _Auth:
+
+    def __init__(self, store):
+        self.store = store
+
+    def sign_up(self, credentials):
+        return self.sign_in_with_password(credentials)
+
+    def sign_in_with_password(self, credentials):
+        self.store._wait()
+        user = types.SimpleNamespace(id=f"user-{credentials['email']}", email=credentials["email"])
+        return types.SimpleNamespace(user=user, session=types.SimpleNamespace(access_token="local"))
+
+    def sign_out(self):
+        return None
+
+
+class LocalStore:
+
+    # in-memory tables shared by every simulated session, keyed by user_id
+    # unless PRIMARY_KEYS says otherwise; rows are stored as JSON text so
+    # reads return fresh copies and the size of what would cross the wire
+    # is known
+
+    PRIMARY_KEYS = {"course_catalog": "content_hash", "schedule_versions": "version_id"}
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.auth = _Auth(self)
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _rows(self, table):
+        with self._lock:
+            self.reads += 1
+            return [json.loads(r) for r in self._tables.get(table, {}).values()]
+
+    def _put(self, table, row):
+        text = json.dumps(row, default=str)
+        with self._lock:
+            self.writes += 1
+            self.bytes_written += len(text)
+            self._tables.setdefault(table, {})[row[self.PRIMARY_KEYS.get(table, "user_id")]] = text
+        return row
+
+    def _delete(self, table, filters):
+        with self._lock:
+            self.writes += 1
+            rows = self._tables.get(table, {})
+            gone = [k for k, r in rows.items() if all(json.loads(r).get(c) == v for c, v in filters)]
+            return [json.loads(rows.pop(k)) for k in gone]
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def size_bytes(self, table=None):
+        with self._lock:
+            tables = [self._tables.get(table, {})] if table else self._tables.values()
+            return sum(len(r) for t in tables for r in t.values())
+
+
+def fake_syllabus(course_code, semester_start, semester_end, assessments=8, seed=0):
+    # a plausible parse_syllabus result with due dates spread over the term
+    rng = random.Random(f"{course_code}-{seed}")
+    start = date.fromisoformat(semester_start)
+    end = date.fromisoformat(semester_end)
+    span_days = max((end - start).days, 1)
+    kinds = ["Assignment", "Quiz", "Lab", "Midterm", "Project", "Final Exam"]
+
+    breakdown = []
+    for i in range(assessments):
+        kind = kinds[i % len(kinds)]
+        due = start + timedelta(days=int(span_days * (i + 1) / (assessments + 1)) + rng.randint(-3, 3))
+        breakdown.append({
+            "type": kind,
+            "title": f"{kind} {i // len(kinds) + 1}",
+            "weight": round(100 / assessments, 1),
+            "due_date": f"{min(max(due, start), end).isoformat()}T23:59:00",
+            "notes": None,
+        })
+
+    return {
+        "course_info": {"course_code": course_code, "course_name": f"Course {course_code}"},
+        "assessments": {"total_weight": 100, "breakdown": breakdown},
+    }
+
+
+class FakeLLM:
+
+    # OpenAI-compatible chat.completions backend; the reply is a fake syllabus
+    # for the course code found in the prompt.
+    #
+    # Latency is latency (± jitter) plus prefill time for the uncached prompt
+    # tokens and decode time for the reply, scaled per model. Prompt caching
+    # follows the provider's rules: a prefix shared with an earlier request is
+    # cached once it is at least 1024 tokens, in 128-token steps. Tokens are
+    # estimated at 4 characters each. With sleep=False the latency is only
+    # recorded, which keeps benchmarks fast.
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        assessments: int = 8,
+        seed: int = 0,
+        prefill_per_1k: float = 0.0,
+        decode_per_1k: float = 0.0,
+        model_speed: dict = None,
+        sleep: bool = True,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.assessments = assessments
+        self.prefill_per_1k = prefill_per_1k
+        self.decode_per_1k = decode_per_1k
+        self.model_speed = model_speed or {}
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prompts = []
+        self.calls = []
+
+    def _cached_tokens(self, prompt):
+        with self._lock:
+            shared = max((_common_prefix(prompt, p) for p in self._prompts), default=0)
+            self._prompts.append(prompt)
+            del self._prompts[:-256]
+        tokens = shared // 4
+        return 0 if tokens < 1024 else tokens - (tokens - 1024) % 128
+
+    def create(self, model=None, messages=None, max_tokens=None, **kwargs):
+        prompt = "\n".join(m.get("content", "") for m in messages or [])
+
+        course_code = _between(prompt, "COURSE_CODE:", "\n") or "CP100"
+        semester_start = _between(prompt, "Semester starts:", "\n") or date.today().isoformat()
+        semester_end = _between(prompt, "Semester ends:", "\n") or (date.today() + timedelta(days=90)).isoformat()
+        content = json.dumps(fake_syllabus(course_code, semester_start, semester_end, self.assessments))
+
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = self._cached_tokens(prompt)
+        completion_tokens = len(content) // 4
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter)
+        latency = max(self.latency + jitter, 0.0) + self.model_speed.get(model, 1.0) * (
+            self.prefill_per_1k * (prompt_tokens - cached_tokens) / 1000
+            + self.decode_per_1k * completion_tokens / 1000
+        )
+        if self.sleep:
+            time.sleep(latency)
+
+        with self._lock:
+            self.calls.append({
+                "model": model,
+                "prompt_chars": len(prompt),
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cached_tokens,
+                "completion_tokens": completion_tokens,
+                "max_tokens": max_tokens,
+                "latency": latency,
+            })
+
+        message = types.SimpleNamespace(content=content, role="assistant")
+        usage = types.SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_tokens_details=types.SimpleNamespace(cached_tokens=cached_tokens),
+        )
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage, model=model)
+
+    def client(self, api_key=None, **kwargs):
+        completions = types.SimpleNamespace(create=self.create)
+        return types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+
+
+def _common_prefix(a, b):
+    # length of the shared prefix, by bisection on slice comparisons
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _between(text, start, end):
+    i = text.find(start)
+    if i < 0:
+        return None
+    i += len(start)
+    j = text.find(end, i)
+    return text[i:j if j >= 0 else None].strip() or None
+
+
+def install(store: LocalStore, llm: FakeLLM) -> None:
+    supabase = types.ModuleType("supabase")
+    supabase.create_client = lambda url, key: store
+    openai = types.ModuleType("openai")
+    openai.OpenAI = llm.client
+    sys.modules["supabase"] = supabase
+    sys.modules["openai"] = openai
+
+    # drop a client cached before the stubs were installed
+    import supabase_client
+    supabase_client.get_client.cache_clear()
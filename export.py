@@ -0,0 +1,284 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.calendar_render import is_completed, task_id
+from utils.course_catalog import term_for
+
+
+# Columnar analytics export of schedules and completions
+#
+#   python export.py out/ [--format parquet|arrow|csv] [--batch-rows 50000]
+#
+# Every user's schedule, completions and settings are flattened into three
+# tables, each partitioned by term (from the semester start) in hive layout:
+#
+#   tasks/term=2025-fall/part-0.parquet        one row per scheduled task
+#       user_id, date, weekday, course_code, assessment_id, type, title,
+#       due_date, hours, available_hours, completed
+#   completions/term=.../part-0.parquet        one row per ticked task id
+#       user_id, date, task_id, scheduled
+#   allocations/term=.../part-0.parquet        one row per assessment
+#       user_id, assessment_id, scheduled_hours, unscheduled_hours, status
+#
+# Users are loaded a chunk at a time and rows are buffered per partition up
+# to --batch-rows, then written as one record batch (row group), so memory
+# stays bounded however many users there are. Parquet and Arrow need
+# pyarrow; without it (or with --format csv) the same tables are written as
+# CSV. The Supabase credentials in .streamlit/secrets.toml must be able to
+# read the user tables.
+
+FORMATS = ("parquet", "arrow", "csv")
+
+# column name -> arrow type name, in file order
+TABLES = {
+    "tasks": {
+        "user_id": "string", "date": "date32", "weekday": "string", "course_code": "string",
+        "assessment_id": "string", "type": "string", "title": "string", "due_date": "string",
+        "hours": "float64", "available_hours": "float64", "completed": "bool_",
+    },
+    "completions": {
+        "user_id": "string", "date": "date32", "task_id": "string", "scheduled": "bool_",
+    },
+    "allocations": {
+        "user_id": "string", "assessment_id": "string", "scheduled_hours": "float64",
+        "unscheduled_hours": "float64", "status": "string",
+    },
+}
+
+SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Flattening
+
+def flatten_user(
+    uid: str,
+    schedule: Dict[str, Any],
+    completions: Dict[str, Any],
+    settings: Dict[str, Any],
+) -> Iterator[Tuple[str, str, Tuple[Any, ...]]]:
+    # (table, term, row) for one user; rows follow the column order in TABLES
+    term = term_for(settings.get("semester_start")) or "unknown"
+    completions = completions or {}
+
+    scheduled_ids: Dict[str, set] = {}
+    for day in (schedule or {}).get("days", []):
+        day_str = day["date"]
+        done_ids = completions.get(day_str, ())
+        ids = scheduled_ids.setdefault(day_str, set())
+        for t in day.get("tasks", []):
+            ids.add(task_id(t))
+            assessment_id = t.get("assessment_id")
+            yield "tasks", term, (
+                uid, _date(day_str), day.get("weekday"), t.get("course_code"),
+                None if assessment_id is None else str(assessment_id),
+                t.get("type"), t.get("title"), t.get("due_date"),
+                _float(t.get("hours")), _float(day.get("available_hours")),
+                is_completed(t, done_ids),
+            )
+
+    for day_str, done_ids in completions.items():
+        ids = scheduled_ids.get(day_str, ())
+        for tid in done_ids or ():
+            yield "completions", term, (uid, _date(day_str), str(tid), tid in ids)
+
+    for a in (schedule or {}).get("allocations", []):
+        assessment_id = a.get("assessment_id")
+        yield "allocations", term, (
+            uid, None if assessment_id is None else str(assessment_id),
+            _float(a.get("scheduled_hours")), _float(a.get("unscheduled_hours")), a.get("status"),
+        )
+
+
+def load_user(uid: str) -> Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    from sb_functions import load_user_doc
+    return (
+        uid,
+        load_user_doc(uid, "schedule"),
+        load_user_doc(uid, "completions"),
+        load_user_doc(uid, "settings"),
+    )
+
+
+# Writers (one open file per table and term)
+
+class _CsvPartition:
+
+    def __init__(self, path: Path, columns: Dict[str, str]):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(list(columns))
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowPartition:
+
+    def __init__(self, path: Path, columns: Dict[str, str], fmt: str):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns.items()])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(str(path), self.schema)
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        # transpose the buffered rows into columns for one record batch
+        columns = [list(c) for c in zip(*rows)]
+        batch = self._pa.RecordBatch.from_arrays(
+            [self._pa.array(c, type=f.type) for c, f in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class PartitionedWriter:
+
+    # buffers rows per (table, term) and flushes full buffers as one batch
+
+    def __init__(self, out_dir: Path, fmt: str = "parquet", batch_rows: int = 50_000):
+        self.out_dir = Path(out_dir)
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self._buffers: Dict[Tuple[str, str], List[Tuple[Any, ...]]] = {}
+        self._files: Dict[Tuple[str, str], Any] = {}
+        self.rows: Dict[str, int] = {table: 0 for table in TABLES}
+
+    def add(self, table: str, term: str, row: Tuple[Any, ...]) -> None:
+        buffer = self._buffers.setdefault((table, term), [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_rows:
+            self._flush(table, term)
+
+    def _flush(self, table: str, term: str) -> None:
+        rows = self._buffers.pop((table, term), None)
+        if not rows:
+            return
+        key = (table, term)
+        if key not in self._files:
+            directory = self.out_dir / table / f"term={term}"
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-0{SUFFIXES[self.fmt]}"
+            self._files[key] = (
+                _CsvPartition(path, TABLES[table]) if self.fmt == "csv"
+                else _ArrowPartition(path, TABLES[table], self.fmt)
+            )
+        self._files[key].write(rows)
+        self.rows[table] += len(rows)
+
+    def close(self) -> List[Path]:
+        for table, term in list(self._buffers):
+            self._flush(table, term)
+        for f in self._files.values():
+            f.close()
+        return sorted(
+            self.out_dir / table / f"term={term}" / f"part-0{SUFFIXES[self.fmt]}"
+            for table, term in self._files
+        )
+
+
+# Export
+
+def run_export(
+    uids: Iterable[str],
+    out_dir,
+    fmt: str = "parquet",
+    batch_rows: int = 50_000,
+    workers: int = 8,
+    chunk_size: int = 64,
+    loader=load_user,
+) -> Dict[str, Any]:
+    if fmt != "csv" and not _have_pyarrow():
+        print("pyarrow is not installed, writing CSV instead", file=sys.stderr)
+        fmt = "csv"
+
+    writer = PartitionedWriter(out_dir, fmt, batch_rows)
+    users, failures = 0, []
+    started = time.perf_counter()
+
+    def load(uid):
+        try:
+            return loader(uid)
+        except Exception as e:
+            return uid, e
+
+    uids = list(uids)
+    with ThreadPoolExecutor(workers, thread_name_prefix="export") as pool:
+        # one chunk of users in memory at a time
+        for i in range(0, len(uids), chunk_size):
+            for loaded in pool.map(load, uids[i:i + chunk_size]):
+                if isinstance(loaded[1], Exception):
+                    failures.append({"uid": loaded[0], "error": f"{type(loaded[1]).__name__}: {loaded[1]}"})
+                    continue
+                for table, term, row in flatten_user(*loaded):
+                    writer.add(table, term, row)
+                users += 1
+
+    files = writer.close()
+    return {
+        "format": fmt,
+        "users": users,
+        "rows": writer.rows,
+        "files": [str(p) for p in files],
+        "failures": failures,
+        "wall_seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export schedules and completions as partitioned columnar files")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="rows buffered per partition before a write")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    from sb_functions import list_user_ids
+
+    report = run_export(list_user_ids("schedule"), Path(args.out_dir), args.format, args.batch_rows, args.workers)
+    print(json.dumps({k: v for k, v in report.items() if k not in ("files", "failures")}, indent=2))
+    for f in report["failures"]:
+        print(f"  failed {f['uid']}: {f['error']}")
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
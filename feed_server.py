@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from utils.calendar_index import schedule_hash
+from utils.ics_exporter import cached_ics_bytes, filter_schedule
+
+
+# Local subscribable calendar feed
+#
+#   python feed_server.py --port 8765
+#
+# Calendar clients subscribe to
+#
+#   http://<host>:8765/feed/<uid>.ics?token=<feed_token(uid)>[&days=30][&course=CP317]
+#
+# Responses carry ETag/Last-Modified and a poll that matches either gets a 304
+# with no body. User documents are re-read at most every DATA_TTL seconds and
+# the .ics body is memoized per ETag, so polling clients never trigger a
+# regeneration while nothing has changed. The Supabase credentials in
+# .streamlit/secrets.toml must be able to read the user tables.
+
+DATA_TTL = 60
+FIRST_SEEN_SIZE = 10_000   # ETags remembered for Last-Modified
+
+FEED_PATH = re.compile(r"^/feed/(?P<uid>[A-Za-z0-9-]+)\.ics$")
+
+
+def _feed_secret():
+    secret = os.environ.get("FEED_SECRET")
+    if secret:
+        return secret
+    import streamlit as st
+    return st.secrets["FEED_SECRET"]
+
+
+def feed_token(uid):
+    return hmac.new(_feed_secret().encode(), uid.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+class FeedStore:
+
+    # per-user document cache (with the hash of the documents, so a poll
+    # inside the TTL doesn't rehash them) plus the first time each ETag was
+    # served
+
+    def __init__(self, loader, ttl=DATA_TTL, first_seen_size=FIRST_SEEN_SIZE):
+        self.loader = loader
+        self.ttl = ttl
+        self._data = {}
+        self._first_seen = OrderedDict()
+        self._first_seen_size = first_seen_size
+        self._lock = threading.Lock()
+
+    def user_data(self, uid):
+        # (schedule, courses, hash of both)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._data.get(uid)
+            if cached and now - cached[0] < self.ttl:
+                return cached[1:]
+
+        data = self.loader(uid)
+        schedule = data.get("schedule") or {}
+        courses = data.get("courses") or {}
+        data_hash = schedule_hash(schedule, courses)
+        with self._lock:
+            self._data[uid] = (now, schedule, courses, data_hash)
+        return schedule, courses, data_hash
+
+    def last_modified(self, etag):
+        # an ETag that fell out of the LRU just gets a newer Last-Modified
+        with self._lock:
+            seen = self._first_seen.get(etag)
+            if seen is not None:
+                self._first_seen.move_to_end(etag)
+                return seen
+            seen = self._first_seen[etag] = int(time.time())
+            while len(self._first_seen) > self._first_seen_size:
+                self._first_seen.popitem(last=False)
+            return seen
+
+
+def build_feed(store, uid, days=None, course=None, today=None):
+    schedule, courses, data_hash = store.user_data(uid)
+
+    today = today or date.today()
+    start = today if days is not None else None
+    end = today + timedelta(days=days) if days is not None else None
+
+    # the ETag covers the data and the resolved filter window, so a rolling
+    # "next N days" feed changes at most once a day
+    etag = hashlib.sha1(f"{data_hash}|{start}|{end}|{course}".encode()).hexdigest()
+
+    def body():
+        filtered_schedule, filtered_courses = filter_schedule(
+            schedule, courses, start=start, end=end, course=course
+        )
+        return cached_ics_bytes(etag, filtered_schedule, filtered_courses)
+
+    return f'"{etag}"', store.last_modified(etag), body
+
+
+def make_handler(store):
+
+    class FeedHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            match = FEED_PATH.match(url.path)
+            if not match:
+                self.send_error(404)
+                return
+
+            uid = match.group("uid")
+            query = parse_qs(url.query)
+
+            token = query.get("token", [""])[0]
+            if not hmac.compare_digest(token, feed_token(uid)):
+                self.send_error(403)
+                return
+
+            try:
+                days = int(query["days"][0]) if "days" in query else None
+            except ValueError:
+                days = -1
+            if days is not None and days < 0:
+                self.send_error(400, "days must be a non-negative integer")
+                return
+            course = query.get("course", [None])[0]
+
+            etag, last_modified, body = build_feed(store, uid, days=days, course=course)
+
+            if self._not_modified(etag, last_modified):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(last_modified, usegmt=True))
+                self.end_headers()
+                return
+
+            data = body()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", formatdate(last_modified, usegmt=True))
+            self.send_header("Cache-Control", "private, max-age=300")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_modified(self, etag, last_modified):
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return parsedate_to_datetime(if_modified_since).timestamp() >= last_modified
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+    return FeedHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve per-user .ics feeds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    from sb_functions import load_user_data
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FeedStore(load_user_data)))
+    print(f"Serving calendar feeds on http://{args.host}:{args.port}/feed/<uid>.ics")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
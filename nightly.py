@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+
+# Nightly roll-forward over every user
+#
+#   python nightly.py [--date 2025-10-14] [--workers 16] [--dry-run]
+#
+# For each user with a stored schedule: load schedule, completions and
+# settings, run utils.rollforward.roll_forward for the given day (today by
+# default) and save the schedule only if hours moved. Users whose schedule was
+# already rolled through yesterday cost one schedule read; users with nothing
+# missed cost three reads and no write. Work is I/O bound, so users run in a thread pool.
+# The Supabase credentials in .streamlit/secrets.toml must be able to read
+# and write the user tables.
+
+
+def roll_user(uid: str, today: date, dry_run: bool = False) -> Dict[str, Any]:
+    from sb_functions import load_user_doc, save_schedule
+    from utils.rollforward import ROLLED_THROUGH, roll_forward
+
+    started = time.perf_counter()
+    schedule = load_user_doc(uid, "schedule")
+    result = {"uid": uid, "changed": False, "missed": 0.0, "placed": 0.0, "unplaced": 0.0}
+
+    # the cheap check first, so up-to-date users don't load anything else
+    yesterday = (today - timedelta(days=1)).isoformat()
+    if schedule.get("days") and (schedule.get(ROLLED_THROUGH) or "") < yesterday:
+        completions = load_user_doc(uid, "completions")
+        settings = load_user_doc(uid, "settings")
+        rolled, report = roll_forward(schedule, completions, settings, today)
+        if rolled is not schedule:
+            result.update(report, changed=True)
+            if not dry_run:
+                save_schedule(uid, rolled)
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_nightly(
+    uids: Iterable[str],
+    today: Optional[date] = None,
+    workers: int = 16,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    today = today or date.today()
+    results, failures = [], []
+    started = time.perf_counter()
+
+    def run(uid):
+        try:
+            return roll_user(uid, today, dry_run)
+        except Exception as e:
+            return {"uid": uid, "error": f"{type(e).__name__}: {e}"}
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="nightly") as pool:
+        for result in pool.map(run, uids):
+            (failures if "error" in result else results).append(result)
+
+    changed = [r for r in results if r["changed"]]
+    return {
+        "date": today.isoformat(),
+        "users": len(results) + len(failures),
+        "changed": len(changed),
+        "missed_hours": sum(r["missed"] for r in changed),
+        "placed_hours": sum(r["placed"] for r in changed),
+        "unplaced_hours": sum(r["unplaced"] for r in changed),
+        "failures": failures,
+        "wall_seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll unfinished study hours forward for every user")
+    parser.add_argument("--date", default=None, help="day to roll forward to (default: today)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--dry-run", action="store_true", help="compute but don't save schedules")
+    args = parser.parse_args()
+
+    from sb_functions import list_user_ids
+
+    today = date.fromisoformat(args.date) if args.date else date.today()
+    report = run_nightly(list_user_ids("schedule"), today, args.workers, args.dry_run)
+
+    print(json.dumps({k: v for k, v in report.items() if k != "failures"}, indent=2))
+    for f in report["failures"]:
+        print(f"  failed {f['uid']}: {f['error']}")
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,19 @@ from pathlib import Path
 from scraper import SyllabusScraper
 from sb_functions import save_courses
 from sb_functions import save_settings
+from utils.course_catalog import resolve_syllabus
+from utils.syllabus_schema import SyllabusParseError
+from utils.session_data import ensure_docs
+from utils.tracing import begin_page, end_page
 
 # set page layout and title
 st.set_page_config(layout="wide")
+begin_page("upload")
 st.title("Upload Syllabus PDFs")
 
+# load only the documents this page needs
+ensure_docs("settings", "courses")
+
 # load API key from secrets if available
 API_KEY = (
     st.secrets.get("OPENAI_API_KEY")
@@ -76,13 +84,16 @@ if uploads and st.button("Parse All Syllabi", use_container_width=True):
         with tmp_path.open("wb") as f:
             f.write(up.getbuffer())
 
-        # run the scraper on the PDF
+        # extract the text, then reuse the shared catalog's parse if another
+        # student already uploaded this syllabus (the LLM only runs on a miss)
         with st.spinner(f"Parsing {up.name}..."):
-            data = scraper.scrape_syllabus(
-                pdf_path=str(tmp_path),
-                semester_start=semester_start,
-                semester_end=semester_end
-            )
+            text = scraper.extract_text_from_pdf(str(tmp_path))
+            try:
+                data = resolve_syllabus(scraper, text, semester_start, semester_end)
+            except SyllabusParseError as e:
+                st.error(f"{up.name}: {e}")
+                progress.progress(i / len(uploads))
+                continue
 
         # use detected course code or fallback to filename
         course_code = data.get("course_info", {}).get("course_code", up.name)
@@ -99,3 +110,5 @@ if uploads and st.button("Parse All Syllabi", use_container_width=True):
         save_courses(st.session_state["uid"], parsed_courses)
 
     st.success("All syllabi parsed and saved!")
+
+end_page()
@@ -1,9 +1,16 @@
 import streamlit as st
-from utils.normalize import normalize_type
+from utils.normalize import normalize_types
+from utils.capacity import validate_exception
 from sb_functions import save_settings
+from utils.session_data import ensure_docs
+from utils.tracing import begin_page, end_page
 
+begin_page("settings")
 st.title("Study Settings & Preferences")
 
+# load only the documents this page needs
+ensure_docs("courses", "settings")
+
 # stop here if user hasn't uploaded/parsed syllabi yet
 if "courses" not in st.session_state or not st.session_state["courses"]:
     st.warning("No parsed syllabi found. Go to Upload page first.")
@@ -11,15 +18,16 @@ if "courses" not in st.session_state or not st.session_state["courses"]:
 
 courses = st.session_state["courses"]
 
-# collect all unique assessment types found across uploaded syllabi
-found_types = set()
-for course_data in courses.values():
-    assessments = course_data.get("assessments", {}).get("breakdown", [])
-    for a in assessments:
-        raw = a.get("type", "")
-        found_types.add(normalize_type(raw))
+# user-defined phrases that map to an assessment type, e.g. "problem set" -> homework
+stored_synonyms = st.session_state.get("settings", {}).get("type_synonyms", {})
 
-found_types = sorted(found_types)
+# collect all unique assessment types found across uploaded syllabi
+raw_types = [
+    a.get("type", "")
+    for course_data in courses.values()
+    for a in course_data.get("assessments", {}).get("breakdown", [])
+]
+found_types = sorted(set(normalize_types(raw_types, stored_synonyms)))
 
 st.subheader("Semester Dates")
 
@@ -61,6 +69,50 @@ for i, day in enumerate(days):
 
 st.divider()
 
+with st.expander("Capacity Exceptions (holidays, reading week, busy days)", expanded=False):
+
+    st.caption(
+        "Override the hours above on specific dates. Leave weekday empty for a date range "
+        "(end defaults to start), or set a weekday for a recurring rule, optionally every N weeks "
+        "between start and end. Later rows win where rows overlap."
+    )
+
+    stored_exceptions = st.session_state.get("settings", {}).get("capacity_exceptions", [])
+    exception_columns = ["label", "start", "end", "weekday", "every", "hours"]
+
+    exception_rows = st.data_editor(
+        [{c: e.get(c) for c in exception_columns} for e in stored_exceptions]
+        or [{"label": "", "start": "", "end": "", "weekday": "", "every": 1, "hours": 0.0}],
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "start": st.column_config.TextColumn("start (YYYY-MM-DD)"),
+            "end": st.column_config.TextColumn("end (YYYY-MM-DD)"),
+            "weekday": st.column_config.SelectboxColumn("weekday", options=[""] + days),
+            "every": st.column_config.NumberColumn("every N weeks", min_value=1, step=1),
+            "hours": st.column_config.NumberColumn("hours", min_value=0.0, max_value=24.0, step=0.5),
+        },
+        key="capacity_exception_editor"
+    )
+
+    # keep only filled-in fields; invalid rows are reported and not saved
+    capacity_exceptions = []
+    for n, row in enumerate(exception_rows, start=1):
+        entry = {
+            k: (v.strip() if isinstance(v, str) else v)
+            for k, v in row.items()
+            if v not in (None, "") and not (isinstance(v, str) and not v.strip())
+        }
+        if not (entry.get("start") or entry.get("weekday")):
+            continue
+        problem = validate_exception(entry)
+        if problem:
+            st.warning(f"Row {n} ({entry.get('label') or 'unnamed'}) is ignored: {problem}")
+            continue
+        capacity_exceptions.append(entry)
+
+st.divider()
+
 with st.expander("Work-Ahead Defaults (Days Before Due Date)", expanded=False):
 
     # fallback defaults if user hasn't changed anything yet
@@ -117,22 +169,45 @@ with st.expander("Default Base Hours per Assessment Type", expanded=False):
             int(stored_base.get(t, default_base_hours.get(t, 3)))
         )
 
+st.divider()
+
+with st.expander("Assessment Type Synonyms", expanded=False):
+
+    st.caption("Map wording from your syllabi to an assessment type, e.g. \"problem set\" → homework. Save and reload to apply.")
+
+    synonym_rows = st.data_editor(
+        [{"phrase": k, "type": v} for k, v in stored_synonyms.items()] or [{"phrase": "", "type": ""}],
+        num_rows="dynamic",
+        use_container_width=True,
+        key="synonym_editor"
+    )
+
+    type_synonyms = {
+        row["phrase"].strip().lower(): row["type"].strip().lower()
+        for row in synonym_rows
+        if (row.get("phrase") or "").strip() and (row.get("type") or "").strip()
+    }
+
 # save everything the user edited on this page
 if st.button("Save Settings"):
     st.session_state["settings"] = {
         "semester_start": semester_start,
         "semester_end": semester_end,
         "daily_hours": daily_hours,
+        "capacity_exceptions": capacity_exceptions,
         "work_ahead_days": work_ahead_days,
-        "base_hours": base_hours
+        "base_hours": base_hours,
+        "type_synonyms": type_synonyms
     }
 
     # push settings to database for logged-in users
     if "uid" in st.session_state:
         save_settings(st.session_state["uid"], st.session_state["settings"])
 
-    # clear cached edited assessments so recalculation uses new defaults
-    if "edited_assessments" in st.session_state:
-        del st.session_state["edited_assessments"]
+    # clear the cached assessment store so recalculation uses new defaults
+    if "assessment_store" in st.session_state:
+        del st.session_state["assessment_store"]
 
     st.success("Settings saved! Assessments will refresh with new defaults.")
+
+end_page()
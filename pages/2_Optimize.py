@@ -1,28 +1,44 @@
+import copy
+import logging
+
 import streamlit as st
 import pandas as pd
-from schedule import ScheduleOptimizer
-from utils.normalize import normalize_type
+from utils.assessment_store import AssessmentStore
+from utils.course_catalog import CATALOG_ERROR
+from utils.jobs import submit_schedule_job, adopt_schedule_job, CANCELLED, FAILED
 from sb_functions import save_schedule, remove_course, save_courses
+from utils.session_data import ensure_docs
+from utils.tracing import begin_page, end_page
+from utils.ics_exporter import next_sequences
+from utils.schedule_history import (
+    VERSION_KEY, checkout, compare_schedules, label_version, list_versions, prune_later, record_version
+)
 
 st.set_page_config(layout="wide")
+begin_page("optimize")
 st.title("Optimize Study Plan")
 
+# load only the documents this page needs
+ensure_docs("courses", "settings", "schedule")
+
 # stop if user hasn't uploaded any syllabi yet
 if "courses" not in st.session_state or not st.session_state["courses"]:
     st.error("No courses found. Upload syllabi first.")
     st.stop()
 
-# stop if user hasn't configured any study settings yet
-if "settings" not in st.session_state:
-    st.error("Settings not found. Configure them first.")
-    st.stop()
-
 courses = st.session_state["courses"]
 settings = st.session_state["settings"]
 
+# a course whose shared catalog entry is missing is kept as stored, not shown
+for course_code, course_data in courses.items():
+    if CATALOG_ERROR in course_data:
+        st.error(f"{course_code} could not be loaded ({course_data[CATALOG_ERROR]}). Upload its syllabus again to restore it.")
+
 daily_hours = settings.get("daily_hours", {})
 work_ahead_days = settings.get("work_ahead_days", {})
+capacity_exceptions = settings.get("capacity_exceptions", [])
 base_hours = settings.get("base_hours", {})
+type_synonyms = settings.get("type_synonyms", {})
 semester_start = settings.get("semester_start")
 semester_end = settings.get("semester_end")
 
@@ -31,32 +47,24 @@ if not semester_start or not semester_end:
     st.error("Semester dates not found. Go to Upload or Settings page and set them first.")
     st.stop()
 
-# build editable assessment list only the first time the page loads
-if "edited_assessments" not in st.session_state:
-    all_assessments = []
-
-    # convert parsed JSON structure into a flat table for user editing
-    for course_json in courses.values():
-        course_code = course_json.get("course_info", {}).get("course_code", "")
-        breakdown = course_json.get("assessments", {}).get("breakdown", [])
-
-        for a in breakdown:
-            raw_type = a.get("type", "")
-            atype = normalize_type(raw_type)
-
-            entry = {
-                "course_code": course_code,
-                "type": atype,
-                "title": a.get("title") or raw_type.title(),
-                "due_date": a.get("due_date"),
-                "hours_required": a.get("hours_required", base_hours.get(atype, 0))
-            }
-            all_assessments.append(entry)
-    
-    st.session_state["edited_assessments"] = all_assessments
-else:
-    # reuse cached edits so user changes persist across reruns
-    all_assessments = st.session_state["edited_assessments"]
+# build the assessment store only the first time the page loads
+if "assessment_store" not in st.session_state:
+    st.session_state["assessment_store"] = AssessmentStore.from_courses(
+        courses, base_hours, type_synonyms
+    )
+
+    # persist newly assigned ids so schedules and completions can refer to them
+    new_store = st.session_state["assessment_store"]
+    if (new_store.assigned_ids or new_store.assigned_categories) and "uid" in st.session_state:
+        save_courses(st.session_state["uid"], courses)
+
+# courses the current plan was built with; a plan loaded from the database
+# is taken to match the courses as they were loaded alongside it
+if "schedule_courses" not in st.session_state:
+    st.session_state["schedule_courses"] = copy.deepcopy(courses)
+
+# reuse the store so user changes persist across reruns
+store = st.session_state["assessment_store"]
 
 st.subheader("Filter by Course")
 
@@ -65,11 +73,14 @@ course_list = ["All Courses"] + list(courses.keys())
 selected_course = st.selectbox("Select a course to view:", course_list)
 
 if selected_course != "All Courses":
-    filtered_assessments = [a for a in all_assessments if a["course_code"] == selected_course]
+    filtered_assessments = store.course_rows(selected_course)
 else:
-    filtered_assessments = all_assessments
+    filtered_assessments = store.rows()
 
-df = pd.DataFrame(filtered_assessments)
+df = pd.DataFrame(
+    filtered_assessments,
+    columns=["id", "course_code", "type", "title", "due_date", "hours_required"]
+)
 
 st.subheader("Edit Assessments")
 st.write("You can edit hours, add new rows, or delete rows. Changes persist automatically.")
@@ -81,6 +92,7 @@ edited_df = st.data_editor(
     use_container_width=True,
     num_rows="dynamic",
     column_config={
+        "id": None,
         "course_code": st.column_config.SelectboxColumn(
             "Course",
             options=list(courses.keys()),
@@ -104,19 +116,14 @@ edited_df = st.data_editor(
     key="assessment_editor"
 )
 
-# convert back to list of dicts for saving
-updated_assessments = edited_df.to_dict(orient="records")
-
-# when filtering by a single course, merge updates with untouched courses
+# merge edits back into the store; a single-course view only touches that course
+edited_rows = edited_df.to_dict(orient="records")
 if selected_course != "All Courses":
-    other_assessments = [
-        a for a in st.session_state["edited_assessments"]
-        if a["course_code"] != selected_course
-    ]
-    updated_assessments = other_assessments + updated_assessments
+    store.replace_rows([selected_course], edited_rows)
+else:
+    store.replace_rows(store.course_codes(), edited_rows)
 
-# update session so edits persist across reruns
-st.session_state["edited_assessments"] = updated_assessments
+updated_assessments = store.rows()
 
 col1, col2 = st.columns(2)
 
@@ -124,28 +131,13 @@ with col1:
     # write user edits back to database
     if st.button("Save Changes to Database", use_container_width=True):
 
-        # regroup assessments by course before saving
-        course_assessments = {}
-        
-        for assessment in updated_assessments:
-            course_code = assessment["course_code"]
-            if course_code not in course_assessments:
-                course_assessments[course_code] = []
-            
-            course_assessments[course_code].append({
-                "type": assessment["type"],
-                "title": assessment["title"],
-                "due_date": assessment["due_date"],
-                "hours_required": assessment["hours_required"]
-            })
-        
-        # write updated breakdown back into session courses
-        for course_code, assessments_list in course_assessments.items():
+        # write updated breakdown back into session courses, matched by id
+        for course_code, assessments_list in store.to_breakdowns(st.session_state["courses"]).items():
             if course_code in st.session_state["courses"]:
                 if "assessments" not in st.session_state["courses"][course_code]:
                     st.session_state["courses"][course_code]["assessments"] = {}
                 st.session_state["courses"][course_code]["assessments"]["breakdown"] = assessments_list
-        
+
         # push changes to Supabase
         if "uid" in st.session_state:
             save_courses(st.session_state["uid"], st.session_state["courses"])
@@ -159,30 +151,142 @@ with col2:
             if "uid" in st.session_state:
                 remove_course(st.session_state["uid"], selected_course)
             del st.session_state["courses"][selected_course]
-            if "edited_assessments" in st.session_state:
-                del st.session_state["edited_assessments"]
+            store.remove_course(selected_course)
             st.success(f"{selected_course} removed!")
             st.rerun()
 
 st.divider()
 
-# generate study plan using edited data + settings
+# generate study plan in the background using edited data + settings
 if st.button("Generate Study Plan", type="primary", use_container_width=True):
 
-    optimizer = ScheduleOptimizer(
-        semester_start=semester_start,
-        semester_end=semester_end,
-        daily_hours=daily_hours,
-        work_ahead_days=work_ahead_days
+    uid = st.session_state.get("uid")
+    parent_version = (st.session_state.get("schedule") or {}).get(VERSION_KEY)
+
+    def persist(schedule):
+        # keep the plan in the history (as a delta against the one it
+        # replaces), then save it as the current schedule; the history is
+        # best effort and never stops the plan from being saved
+        if uid:
+            schedule[VERSION_KEY] = parent_version
+            try:
+                record_version(uid, schedule, prune=False)
+            except Exception:
+                schedule[VERSION_KEY] = parent_version
+                logging.getLogger(__name__).warning("recording schedule history for %s failed", uid, exc_info=True)
+            save_schedule(uid, schedule)
+            prune_later(uid)
+
+    st.session_state["schedule_job"] = submit_schedule_job(
+        optimizer_args={
+            "semester_start": semester_start,
+            "semester_end": semester_end,
+            "daily_hours": daily_hours,
+            "work_ahead_days": work_ahead_days,
+            "capacity_exceptions": capacity_exceptions,
+        },
+        assessments=updated_assessments,
+        courses=courses,
+        previous=st.session_state.get("schedule"),
+        previous_courses=st.session_state["schedule_courses"],
+        persist=persist,
+    )
+
+
+@st.fragment(run_every=0.5)
+def job_progress(job):
+    # only drawn while a job runs; once it finishes the whole page reruns,
+    # which handles the result and stops the polling
+    if not job.running:
+        st.rerun()
+    st.progress(job.progress, text=f"Scheduling assessments... {job.done}/{job.total}")
+    if st.button("Cancel"):
+        job.cancel()
+
+
+def generation_status():
+    job = st.session_state.get("schedule_job")
+    if job is None or job.adopted:
+        return
+
+    if job.running:
+        job_progress(job)
+        return
+
+    if job.status == CANCELLED:
+        st.warning("Schedule generation cancelled.")
+        del st.session_state["schedule_job"]
+    elif job.status == FAILED:
+        st.error(f"Schedule generation failed: {job.error}")
+        del st.session_state["schedule_job"]
+    else:
+        adopt_schedule_job(st.session_state)
+        st.success("Schedule generated! Redirecting...")
+        st.switch_page("pages/3_Calendar.py")
+
+
+generation_status()
+
+
+def plan_history(uid):
+    versions = list_versions(uid)
+    if not versions:
+        st.caption("Plans you generate are kept here so you can compare or restore them.")
+        return
+
+    current = st.session_state.get("schedule") or {}
+    st.dataframe(
+        [{
+            "version": v["version"],
+            "created": (v.get("created_at") or "")[:16].replace("T", " "),
+            "label": v.get("label") or "",
+            "current": "✓" if v["version"] == current.get(VERSION_KEY) else "",
+        } for v in reversed(versions)],
+        hide_index=True,
+        use_container_width=True,
     )
 
-    # create raw schedule from weighted hours and due dates
-    schedule = optimizer.generate_raw_schedule(updated_assessments)
-    st.session_state["schedule"] = schedule
+    numbers = [v["version"] for v in reversed(versions)]
+    col1, col2 = st.columns(2)
+    with col1:
+        older = st.selectbox("Compare version", numbers, index=min(1, len(numbers) - 1), key="history_older")
+    with col2:
+        newer = st.selectbox("with version", numbers, index=0, key="history_newer")
+
+    if older != newer:
+        diff = compare_schedules(checkout(uid, older, versions), checkout(uid, newer, versions))
+        st.write(
+            f"{diff['hours_before']:g} h → {diff['hours_after']:g} h scheduled; "
+            f"{diff['days_changed']} days changed, {diff['days_added']} added, {diff['days_removed']} removed"
+        )
+        if diff["assessments"]:
+            st.dataframe(diff["assessments"], hide_index=True, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(f"Restore version {newer}", use_container_width=True):
+            restored = checkout(uid, newer, versions)
+            # calendar subscribers see the switch as an update
+            old_courses = st.session_state.get("schedule_courses") or courses
+            restored["ics_sequences"] = next_sequences(current, old_courses, restored, courses)
+            if current.get("days"):
+                st.session_state["previous_plan"] = (current, copy.deepcopy(old_courses))
+            st.session_state["schedule"] = restored
+            st.session_state["schedule_courses"] = copy.deepcopy(courses)
+            save_schedule(uid, restored)
+            st.success(f"Version {newer} is now your current plan.")
+    with col2:
+        labels = {v["version"]: v.get("label") or "" for v in versions}
+        label = st.text_input("Label (labeled versions are never pruned)", labels[newer], key=f"history_label_{newer}")
+        if st.button(f"Save label for version {newer}", use_container_width=True):
+            label_version(uid, newer, label.strip())
+            st.rerun()
+
 
-    # save full schedule to database
-    if "uid" in st.session_state:
-        save_schedule(st.session_state["uid"], schedule)
+# every generated plan is kept as a delta against the one before it
+if "uid" in st.session_state:
+    st.divider()
+    if st.toggle("Show plan history", key="show_plan_history"):
+        plan_history(st.session_state["uid"])
 
-    st.success("Schedule generated! Redirecting...")
-    st.switch_page("pages/3_Calendar.py")
+end_page()
@@ -1,32 +1,35 @@
 import streamlit as st
-import pandas as pd
-import json
-from datetime import datetime, timedelta
-from sb_functions import save_completions
-from utils.ics_exporter import schedule_to_ics
-
-
-def format_hours(hours: float) -> str:
-    if hours == 0:
-        return "0 min"
-    whole_hours = int(hours)
-    minutes = int((hours - whole_hours) * 60)
-    parts = []
-    if whole_hours == 1:
-        parts.append("1 hour")
-    elif whole_hours > 1:
-        parts.append(f"{whole_hours} hours")
-    if minutes == 30:
-        parts.append("30 min")
-    elif minutes > 0:
-        parts.append(f"{minutes} min")
-    return " and ".join(parts) if parts else "0 min"
+import uuid
+from datetime import datetime
+from sb_functions import save_completions, save_schedule
+from utils.ics_exporter import cached_ics_bytes, ics_diff
+from feed_server import feed_token
+from utils.jobs import adopt_schedule_job
+from utils.rollforward import roll_forward
+from utils.session_data import doc_stamp, ensure_docs, same_stamp
+from utils.tracing import begin_page, end_page
+from utils.calendar_index import (
+    build_week_index, get_week, schedule_hash, week_position, week_start
+)
+from utils.calendar_render import (
+    CALENDAR_CSS, RenderCache, format_hours, is_completed, legacy_task_id, render_week,
+    task_id
+)
 
 
 st.set_page_config(page_title="Weekly Calendar", layout="wide")
+begin_page("calendar")
 st.title("Weekly Study Calendar")
 
-if "schedule" not in st.session_state:
+# load only the documents this page needs
+ensure_docs("schedule", "courses", "completions", "settings")
+
+# pick up a plan that finished generating in the background
+job = adopt_schedule_job(st.session_state)
+if job is not None and job.running:
+    st.info(f"A new study plan is being generated ({job.progress:.0%}). It will appear here when it's done.")
+
+if not st.session_state.get("schedule"):
     st.error("No schedule found. Generate a schedule on the Optimize page first.")
     st.stop()
 
@@ -37,325 +40,190 @@ if not days:
     st.error("Schedule is empty. Please re-run optimization.")
     st.stop()
 
-df = pd.DataFrame(days)
-df["date"] = pd.to_datetime(df["date"])
+courses = st.session_state.get("courses", {})
+
+# move hours that weren't ticked off on past days into the rest of the plan;
+# after the first load of the day this is a single date comparison
+rolled, rollover = roll_forward(
+    schedule, st.session_state.get("completions"), st.session_state.get("settings") or {}
+)
+if rolled is not schedule:
+    schedule = st.session_state["schedule"] = rolled
+    if "uid" in st.session_state:
+        save_schedule(st.session_state["uid"], schedule)
+    if rollover["placed"]:
+        st.info(f"Moved {format_hours(rollover['placed'])} of unfinished study time into the coming days.")
+    if rollover["unplaced"]:
+        st.warning(f"{format_hours(rollover['unplaced'])} of unfinished study time no longer fits before the due dates.")
+
+# week index is rebuilt only when the schedule or courses are replaced or saved
+index_key = doc_stamp("schedule", "courses")
+cached_index = st.session_state.get("calendar_index")
+if not cached_index or not same_stamp(cached_index[0], index_key):
+    # the token names this build for the rendered-week cache
+    cached_index = (index_key, build_week_index(schedule, courses), uuid.uuid4().hex)
+    st.session_state["calendar_index"] = cached_index
+week_index_data = cached_index[1]
 
 if "completions" not in st.session_state:
     st.session_state["completions"] = {}
 
-# Custom CSS
-st.markdown(
-    """
-<style>
-.calendar-container .card-container {
-    display: flex;
-    justify-content: space-between;
-    align-items: flex-start;
-    gap: 25px;
-    padding: 10px;
-    width: 100%;
-}
-
-.calendar-container .day-card {
-    background-color: #F4F9FF;
-    border: 2px solid #1A3A5F;
-    border-radius: 14px;
-    padding: 18px;
-    width: 230px;
-    min-height: 260px;
-    text-align: center;
-    box-shadow: 0px 4px 10px rgba(0,0,0,0.12);
-}
-
-.calendar-container .day-card.today {
-    border: 3px solid #27AE60;
-    box-shadow: 0px 4px 15px rgba(39, 174, 96, 0.3);
-}
-
-.calendar-container .day-title {
-    font-weight: 700;
-    color: #1A3A5F;
-    font-size: 20px;
-    margin-bottom: 8px;
-    white-space: nowrap;
-}
-
-.calendar-container .date-text {
-    font-size: 15px;
-    color: #41566B;
-    margin-bottom: 12px;
-}
-
-.calendar-container .task-text {
-    color: #25323B;
-    font-size: 15px;
-    line-height: 1.35;
-    margin-bottom: 6px;
-    text-align: left;
-    position: relative;
-    cursor: pointer;
-}
-
-.calendar-container .task-text:hover .tooltip {
-    visibility: visible;
-    opacity: 1;
-}
-
-.calendar-container .due-marker {
-    color: #E74C3C;
-    font-size: 15px;
-    font-weight: 700;
-    line-height: 1.35;
-    margin-bottom: 6px;
-    text-align: left;
-    position: relative;
-    cursor: pointer;
-}
-
-.calendar-container .due-marker:hover .tooltip {
-    visibility: visible;
-    opacity: 1;
-}
-
-.calendar-container .tooltip {
-    visibility: hidden;
-    opacity: 0;
-    background-color: #2C3E50;
-    color: white;
-    text-align: center;
-    padding: 8px 12px;
-    border-radius: 6px;
-    position: absolute;
-    z-index: 1;
-    bottom: 125%;
-    left: 50%;
-    transform: translateX(-50%);
-    white-space: nowrap;
-    transition: opacity 0.3s;
-    font-size: 13px;
-}
-
-.calendar-container .tooltip::after {
-    content: "";
-    position: absolute;
-    top: 100%;
-    left: 50%;
-    margin-left: -5px;
-    border-width: 5px;
-    border-style: solid;
-    border-color: #2C3E50 transparent transparent transparent;
-}
-</style>
-""",
-    unsafe_allow_html=True
-)
+# Card styles come from a module constant and sit outside the fragments, so
+# fragment reruns never resend them
+st.markdown(CALENDAR_CSS, unsafe_allow_html=True)
+
+if "calendar_render_cache" not in st.session_state:
+    st.session_state["calendar_render_cache"] = RenderCache()
+if "completions_version" not in st.session_state:
+    st.session_state["completions_version"] = 0
 
 if "calendar_week_index" not in st.session_state:
     st.session_state["calendar_week_index"] = 0
 
-start_date = df["date"].min()
-end_date = df["date"].max()
 
-all_weeks = []
-cursor = start_date
-while cursor <= end_date:
-    all_weeks.append(cursor)
-    cursor += timedelta(days=7)
+# The week and today's tasks form one fragment (ticking a task also updates
+# its card in the week), and the export is another: interacting with either
+# reruns only that fragment instead of the whole page.
 
-week_index = max(0, min(st.session_state["calendar_week_index"], len(all_weeks) - 1))
-st.session_state["calendar_week_index"] = week_index
+def shift_week(step):
+    st.session_state["calendar_week_index"] += step
 
-current_week_start = all_weeks[week_index]
-current_week_end = current_week_start + timedelta(days=6)
 
-st.header(f"Week of {current_week_start.strftime('%B %d, %Y')}")
+def jump_to_today(index_data):
+    today_position = week_position(index_data, datetime.now().date())
+    if today_position is not None:
+        st.session_state["calendar_week_index"] = today_position
 
-col1, col2, col3, col4 = st.columns([1, 1, 1, 6])
 
-with col1:
-    if st.button("Previous Week") and week_index > 0:
-        st.session_state["calendar_week_index"] -= 1
-        st.rerun()
+def week_view(index_data):
+    weeks = index_data["weeks"]
+    week_index = max(0, min(st.session_state["calendar_week_index"], len(weeks) - 1))
+    st.session_state["calendar_week_index"] = week_index
 
-with col2:
-    if st.button("Jump to Today"):
-        today = pd.Timestamp(datetime.now().date())
-        
-        for i, week_start in enumerate(all_weeks):
-            week_end = week_start + timedelta(days=6)
-            
-            if week_start <= today <= week_end:
-                st.session_state["calendar_week_index"] = i
-                st.rerun()
-                break
+    current_week_start = weeks[week_index]
 
-with col3:
-    if st.button("Next Week") and week_index < len(all_weeks) - 1:
-        st.session_state["calendar_week_index"] += 1
-        st.rerun()
+    st.header(f"Week of {current_week_start.strftime('%B %d, %Y')}")
 
-with col4:
-    pass  # Empty column to push buttons to the left
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 6])
 
-week_df = df[(df["date"] >= current_week_start) & (df["date"] <= current_week_end)]
+    with col1:
+        st.button("Previous Week", on_click=shift_week, args=(-1,), disabled=week_index == 0)
 
-st.subheader("Weekly Overview")
+    with col2:
+        st.button("Jump to Today", on_click=jump_to_today, args=(index_data,))
 
-week_dates = list(pd.date_range(current_week_start, current_week_end))
+    with col3:
+        st.button("Next Week", on_click=shift_week, args=(1,), disabled=week_index >= len(weeks) - 1)
 
-courses = st.session_state.get("courses", {})
-due_dates_map = {}
-
-for course_code, course_data in courses.items():
-    assessments = course_data.get("assessments", {}).get("breakdown", [])
-    for assessment in assessments:
-        due_date_str = assessment.get("due_date")
-        if not due_date_str:
-            continue
-        if "T" in due_date_str:
-            due_date = datetime.strptime(due_date_str, "%Y-%m-%dT%H:%M:%S").date()
-        else:
-            due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-        if due_date not in due_dates_map:
-            due_dates_map[due_date] = []
-        due_dates_map[due_date].append({
-            "course_code": course_code,
-            "type": assessment.get("type", "Assessment"),
-            "title": assessment.get("title", assessment.get("type", "Assessment")),
-            "due_date_str": due_date_str
-        })
-
-cards_html = '<div class="calendar-container"><div class="card-container">'
-
-for day_date in week_dates:
-    day_rows = week_df[week_df["date"] == day_date]
-
-    is_today = day_date.date() == datetime.now().date()
-    today_class = "today" if is_today else ""
-
-    cards_html += f"""
-    <div class="day-card {today_class}">
-        <div class="day-title">{day_date.strftime('%A')}</div>
-        <div class="date-text">{day_date.strftime('%b %d')}</div>
-    """
-
-    has_tasks = False
-    if not day_rows.empty:
-        for _, row in day_rows.iterrows():
-            for task in row["tasks"]:
-                has_tasks = True
-                formatted_time = format_hours(task["hours"])
-                due_date = task.get("due_date", "")
-
-                if due_date:
-                    try:
-                        if "T" in due_date:
-                            due = datetime.strptime(due_date, "%Y-%m-%dT%H:%M:%S")
-                            days_until = (due.date() - day_date.date()).days
-                            tooltip_text = (
-                                f"Due: {due.strftime('%B %d, %Y at %I:%M %p')} ({days_until} days)"
-                            )
-                        else:
-                            due = datetime.strptime(due_date, "%Y-%m-%d")
-                            days_until = (due.date() - day_date.date()).days
-                            tooltip_text = (
-                                f"Due: {due.strftime('%B %d, %Y')} ({days_until} days)"
-                            )
-                    except:
-                        tooltip_text = f"Due: {due_date}"
-                else:
-                    tooltip_text = "No due date"
-
-                cards_html += (
-                    f"<div class='task-text'>"
-                    f"• <b>{task['course_code']}</b><br>"
-                    f"{task['title']} ({formatted_time})"
-                    f"<span class='tooltip'>{tooltip_text}</span>"
-                    f"</div>"
-                )
-
-    day_date_only = day_date.date()
-    if day_date_only in due_dates_map:
-        for due_item in due_dates_map[day_date_only]:
-            has_tasks = True
-            course_code = due_item["course_code"]
-            assessment_title = due_item.get("title", due_item["type"])
-            due_date_str = due_item["due_date_str"]
-
-            if "T" in due_date_str:
-                due_dt = datetime.strptime(due_date_str, "%Y-%m-%dT%H:%M:%S")
-                tooltip_text = f"Due at {due_dt.strftime('%I:%M %p')}"
-            else:
-                tooltip_text = "Due today"
-
-            cards_html += (
-                f"<div class='due-marker'>"
-                f"📌 <b>{course_code}</b><br>"
-                f"{assessment_title} DUE"
-                f"<span class='tooltip'>{tooltip_text}</span>"
-                f"</div>"
-            )
-
-    if not has_tasks:
-        cards_html += "<div class='task-text'>No tasks.</div>"
-
-    cards_html += "</div>"
-
-cards_html += "</div></div>"
-
-st.markdown(cards_html, unsafe_allow_html=True)
+    with col4:
+        pass  # Empty column to push buttons to the left
 
-st.divider()
-st.subheader("Today's Tasks")
+    st.subheader("Weekly Overview")
 
-today = datetime.now().date()
-today_str = today.strftime("%Y-%m-%d")
-today_schedule = [day for day in days if day["date"] == today_str]
+    today = datetime.now().date()
+    cache = st.session_state["calendar_render_cache"]
+    cache_key = (
+        st.session_state["calendar_index"][2],
+        current_week_start,
+        st.session_state["completions_version"],
+        today,
+    )
 
-if today_schedule and today_schedule[0].get("tasks"):
-    completed_today = st.session_state["completions"].get(today_str, [])
+    cards_html = cache.get(cache_key)
+    if cards_html is None:
+        cards_html = cache.put(cache_key, render_week(
+            get_week(index_data, current_week_start),
+            current_week_start,
+            today,
+            st.session_state["completions"],
+        ))
 
-    for task in today_schedule[0]["tasks"]:
-        task_id = f"{task['course_code']}-{task['title']}"
+    st.markdown(cards_html, unsafe_allow_html=True)
 
-        is_completed = task_id in completed_today
 
-        completed = st.checkbox(
-            f"**{task['course_code']}** - {task['title']} ({format_hours(task['hours'])})",
-            value=is_completed,
-            key=f"task_{task_id}"
-        )
+def toggle_task(day_str, tid, legacy_id):
+    completions = st.session_state["completions"]
+    done = completions.setdefault(day_str, [])
 
-        if completed and not is_completed:
-            if today_str not in st.session_state["completions"]:
-                st.session_state["completions"][today_str] = []
-            st.session_state["completions"][today_str].append(task_id)
+    if st.session_state[f"task_{tid}"]:
+        if tid not in done:
+            done.append(tid)
+    else:
+        for completed_id in (tid, legacy_id):
+            if completed_id in done:
+                done.remove(completed_id)
 
-            if "uid" in st.session_state:
-                save_completions(st.session_state["uid"], st.session_state["completions"])
+    st.session_state["completions_version"] += 1
 
-            st.success("Task completed!")
-            st.rerun()
+    if "uid" in st.session_state:
+        save_completions(st.session_state["uid"], completions)
 
-        elif not completed and is_completed:
-            st.session_state["completions"][today_str].remove(task_id)
 
-            if "uid" in st.session_state:
-                save_completions(st.session_state["uid"], st.session_state["completions"])
+def todays_tasks(index_data):
+    st.subheader("Today's Tasks")
 
-            st.rerun()
-else:
-    st.info("No tasks scheduled for today!")
+    today = datetime.now().date()
+    today_str = today.strftime("%Y-%m-%d")
+    today_tasks = get_week(index_data, week_start(today))["tasks"].get(today_str, [])
 
-st.divider()
-st.subheader("Export Calendar")
+    if not today_tasks:
+        st.info("No tasks scheduled for today!")
+        return
 
-courses = st.session_state.get("courses", {})
-ics_text = schedule_to_ics(schedule, courses)
+    completed_today = st.session_state["completions"].get(today_str, [])
 
-st.download_button(
-    label="Download as .ics file",
-    data=ics_text,
-    file_name="study_schedule.ics",
-    mime="text/calendar",
-)
+    for task in today_tasks:
+        tid = task_id(task)
+
+        st.checkbox(
+            f"**{task['course_code']}** - {task['title']} ({format_hours(task['hours'])})",
+            value=is_completed(task, completed_today),
+            key=f"task_{tid}",
+            on_change=toggle_task,
+            args=(today_str, tid, legacy_task_id(task)),
+        )
+
+
+@st.fragment
+def plan_view(index_data):
+    week_view(index_data)
+    st.divider()
+    todays_tasks(index_data)
+
+
+@st.fragment
+def export_section(schedule, courses):
+    st.subheader("Export Calendar")
+
+    # the file (and its content hash) is only built when the button is
+    # clicked, and memoized by hash
+    st.download_button(
+        label="Download as .ics file",
+        data=lambda: cached_ics_bytes(schedule_hash(schedule, courses), schedule, courses),
+        file_name="study_schedule.ics",
+        mime="text/calendar",
+    )
+
+    # incremental update: only events added, changed or cancelled by the last regeneration
+    previous_plan = st.session_state.get("previous_plan")
+    if previous_plan:
+        old_schedule, old_courses = previous_plan
+        st.download_button(
+            label="Download changes since previous plan",
+            data=lambda: ics_diff(old_schedule, old_courses, schedule, courses),
+            file_name="study_schedule_update.ics",
+            mime="text/calendar",
+        )
+
+    # subscription link for the local feed server (feed_server.py), if deployed
+    if "FEED_BASE_URL" in st.secrets and st.session_state.get("uid"):
+        uid = st.session_state["uid"]
+        st.caption("Subscribe from your calendar app instead of re-downloading:")
+        st.code(f"{st.secrets['FEED_BASE_URL']}/feed/{uid}.ics?token={feed_token(uid)}")
+
+plan_view(week_index_data)
+
+st.divider()
+export_section(schedule, courses)
+
+end_page()
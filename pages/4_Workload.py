@@ -0,0 +1,89 @@
+import streamlit as st
+from utils.workload import task_frame, daily_load, hours_by, heatmap_grid, heatmap_styles
+from utils.session_data import doc_stamp, ensure_docs, same_stamp
+from utils.tracing import begin_page, end_page
+
+st.set_page_config(page_title="Semester Workload", layout="wide")
+begin_page("workload")
+st.title("Semester Workload")
+
+# load only the documents this page needs
+ensure_docs("schedule", "settings")
+
+schedule = st.session_state.get("schedule") or {}
+if not schedule.get("days"):
+    st.error("No schedule found. Generate a schedule on the Optimize page first.")
+    st.stop()
+
+settings = st.session_state.get("settings") or {}
+daily_hours = settings.get("daily_hours", {})
+
+# the flattened frame is rebuilt only when the schedule is replaced or saved
+frame_key = doc_stamp("schedule")
+cached_frame = st.session_state.get("workload_frame")
+if not cached_frame or not same_stamp(cached_frame[0], frame_key):
+    cached_frame = (frame_key, task_frame(schedule))
+    st.session_state["workload_frame"] = cached_frame
+frame = cached_frame[1]
+
+if frame.empty:
+    st.info("No study hours are scheduled yet.")
+    st.stop()
+
+daily = daily_load(
+    frame,
+    daily_hours,
+    start=settings.get("semester_start"),
+    end=settings.get("semester_end"),
+    exceptions=settings.get("capacity_exceptions"),
+)
+
+col1, col2 = st.columns(2)
+with col1:
+    months = sorted(daily.index.to_period("M").unique())
+    scope = st.selectbox(
+        "Period",
+        ["Whole semester"] + [m.strftime("%B %Y") for m in months],
+    )
+with col2:
+    threshold = st.number_input(
+        "Highlight days above (hours)",
+        0.0, 24.0,
+        float(max(daily_hours.values(), default=4.0) or 4.0),
+        step=0.5
+    )
+
+if scope != "Whole semester":
+    period = months[[m.strftime("%B %Y") for m in months].index(scope)]
+    daily = daily[daily.index.to_period("M") == period]
+    frame = frame[frame["date"].dt.to_period("M") == period]
+
+# a day is overloaded when it is over the threshold or over its capacity
+daily["overload"] = (daily["hours"] > threshold) | (daily["hours"] > daily["capacity"])
+
+m1, m2, m3 = st.columns(3)
+m1.metric("Scheduled hours", f"{daily['hours'].sum():g}")
+m2.metric("Busiest day", f"{daily['hours'].max():g} h")
+m3.metric("Overloaded days", int(daily["overload"].sum()))
+
+st.subheader("Daily Load")
+
+grid = heatmap_grid(daily)
+overload = heatmap_grid(daily, "overload").fillna(False)
+grid.index = grid.index.strftime("Week of %b %d")
+overload.index = grid.index
+
+st.dataframe(
+    grid.style.apply(lambda g: heatmap_styles(g, overload), axis=None).format("{:g}", na_rep=""),
+    use_container_width=True,
+)
+
+freq = "W-MON" if scope == "Whole semester" else "D"
+
+st.subheader("Hours per Course")
+st.bar_chart(hours_by(frame, "course_code", freq=freq))
+
+st.subheader("Hours per Type")
+st.bar_chart(hours_by(frame, "type", freq=freq))
+
+end_page()
@@ -0,0 +1,110 @@
+import json
+import streamlit as st
+from utils import tracing
+from utils.syllabus_schema import repair_stats
+
+st.set_page_config(page_title="Diagnostics", layout="wide")
+
+
+def debug_enabled():
+    # developer page: spans are process-wide, so only shown with DEBUG = true
+    # in secrets or to a uid listed in ADMIN_UIDS
+    try:
+        if st.secrets.get("DEBUG"):
+            return True
+        return st.session_state.get("uid") in (st.secrets.get("ADMIN_UIDS") or [])
+    except FileNotFoundError:
+        return False
+
+
+if not debug_enabled():
+    st.info("Diagnostics are disabled. Set DEBUG = true or add your uid to ADMIN_UIDS in secrets.")
+    st.stop()
+
+st.title("Diagnostics")
+
+if not tracing.ENABLED:
+    st.warning("Tracing is turned off (set APP_TRACING=1 to record spans).")
+
+spans = tracing.recent_spans()
+st.caption(f"{len(spans)} spans in the buffer (process-wide, newest last)")
+
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button(
+        "Download Chrome trace (.json)",
+        data=lambda: json.dumps(tracing.chrome_trace(), default=str),
+        file_name="trace.json",
+        mime="application/json",
+    )
+with col2:
+    if st.button("Clear spans"):
+        tracing.clear()
+        st.rerun()
+
+if not spans:
+    st.stop()
+
+st.subheader("Page Reruns")
+page_spans = [s for s in spans if s["name"].startswith("page:")]
+if page_spans:
+    st.dataframe(tracing.summarize(page_spans), hide_index=True, use_container_width=True)
+else:
+    st.caption("No page reruns recorded yet.")
+
+st.subheader("Operations")
+st.dataframe(
+    tracing.summarize([s for s in spans if not s["name"].startswith("page:")]),
+    hide_index=True,
+    use_container_width=True,
+)
+
+st.subheader("Payload Sizes")
+sized = [s for s in spans if s["attrs"].get("bytes") is not None]
+if sized:
+    groups = {}
+    for s in sized:
+        groups.setdefault((s["name"], s["attrs"].get("table", "")), []).append(s["attrs"]["bytes"])
+    st.dataframe(
+        [
+            {"name": name, "table": table, "count": len(b), "mean": sum(b) / len(b), "max": max(b)}
+            for (name, table), b in groups.items()
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+else:
+    st.caption("No payload sizes recorded yet.")
+
+st.subheader("LLM Output Repairs")
+repairs = repair_stats()
+if repairs["responses"]:
+    r1, r2, r3, r4 = st.columns(4)
+    r1.metric("Valid as returned", f"{repairs['valid_rate']:.0%}")
+    r2.metric("Repaired locally", f"{repairs['repaired_rate']:.0%}")
+    r3.metric("Unrecoverable", f"{repairs['unrecoverable_rate']:.0%}")
+    r4.metric("Re-calls", repairs["recalls"])
+    st.dataframe(
+        [{"repair": kind, "count": count} for kind, count in repairs["fixes"].items()],
+        hide_index=True,
+        use_container_width=True,
+    )
+else:
+    st.caption("No syllabi parsed in this process yet.")
+
+st.subheader("Recent Spans")
+limit = st.slider("Show last", 10, 500, 100, step=10)
+st.dataframe(
+    [
+        {
+            "name": s["name"],
+            "ms": s["dur_us"] / 1000,
+            "thread": s["thread"],
+            "parent": s["parent"],
+            "attrs": json.dumps(s["attrs"], default=str),
+        }
+        for s in reversed(spans[-limit:])
+    ],
+    hide_index=True,
+    use_container_width=True,
+)
@@ -1,92 +1,196 @@
-from supabase_client import supabase
+import threading
+from collections import OrderedDict
+from supabase_client import get_client
+from utils.course_catalog import encode_courses, decode_courses
+from utils.schedule_codec import encode_schedule, decode_schedule
+from utils.tracing import span, payload_size
 
 # Authenication
 
 def sign_up(email, password):
-    return supabase.auth.sign_up({"email": email, "password": password})
+    return get_client().auth.sign_up({"email": email, "password": password})
 
 def sign_in(email, password):
-    return supabase.auth.sign_in_with_password({"email": email, "password": password})
-
-# Load User Data (Extract the _json field from each table's first row and return a dict)
+    return get_client().auth.sign_in_with_password({"email": email, "password": password})
+
+# Load User Data (Extract the _json field from a table's first row)
+
+USER_DOCS = {
+    "courses": ("user_courses", "courses_json"),
+    "settings": ("user_settings", "settings_json"),
+    "schedule": ("user_schedule", "schedule_json"),
+    "completions": ("user_task_completion", "completion_json"),
+}
+
+def load_user_doc(uid, name):
+    table, column = USER_DOCS[name]
+    with span("sb.load", table=table) as attrs:
+        res = get_client().table(table) \
+            .select(column) \
+            .eq("user_id", uid) \
+            .execute()
+        if not res.data:
+            return {}
+
+        doc = res.data[0].get(column) or {}
+        attrs["bytes"] = payload_size(doc)
+        if name == "schedule":
+            doc = decode_schedule(doc)
+        elif name == "courses":
+            doc = decode_courses(doc, _catalog_base)
+        return doc
 
 def load_user_data(uid):
-    out = {
-        "courses": {},
-        "settings": {},
-        "schedule": {},
-        "completions": {}
-    }
-
-    # Courses
-    res = supabase.table("user_courses") \
-        .select("courses_json") \
-        .eq("user_id", uid) \
-        .execute()
-    if res.data:
-        out["courses"] = res.data[0].get("courses_json") or {}
-
-    # Settings
-    res = supabase.table("user_settings") \
-        .select("settings_json") \
-        .eq("user_id", uid) \
-        .execute()
-    if res.data:
-        out["settings"] = res.data[0].get("settings_json") or {}
+    return {name: load_user_doc(uid, name) for name in USER_DOCS}
 
-    # Schedule
-    res = supabase.table("user_schedule") \
-        .select("schedule_json") \
-        .eq("user_id", uid) \
-        .execute()
-    if res.data:
-        out["schedule"] = res.data[0].get("schedule_json") or {}
-
-    # Completions
-    res = supabase.table("user_task_completion") \
-        .select("completion_json") \
-        .eq("user_id", uid) \
-        .execute()
-    if res.data:
-        out["completions"] = res.data[0].get("completion_json") or {}
-
-    return out
+# every user with a stored document, for bulk jobs (nightly.py)
+def list_user_ids(name="schedule"):
+    table, _ = USER_DOCS[name]
+    res = get_client().table(table).select("user_id").execute()
+    return [row["user_id"] for row in res.data or []]
 
 # Save Functions
+
+# listener(uid, name, doc) runs after each user document save, with the doc
+# as the pages use it (None when only the stored form is known); the session
+# cache in utils/session_data.py registers one to stay current
+_SAVE_LISTENERS = []
+
+def on_save(listener):
+    _SAVE_LISTENERS.append(listener)
+
+def _saved(uid, name, doc):
+    for listener in _SAVE_LISTENERS:
+        listener(uid, name, doc)
+
+def _upsert(table, column, uid, doc):
+    with span("sb.save", table=table, bytes=payload_size(doc)):
+        get_client().table(table).upsert(
+            {
+                "user_id": uid,
+                column: doc,
+            }
+        ).execute()
+
+# Courses that came from the shared catalog are stored as a reference plus
+# the user's overrides (see utils/course_catalog.py)
 def save_courses(uid, courses):
-    supabase.table("user_courses").upsert(
-        {
-            "user_id": uid,
-            "courses_json": courses,
-        }
-    ).execute()
+    _upsert("user_courses", "courses_json", uid, encode_courses(courses, _catalog_base))
+    _saved(uid, "courses", courses)
 
 def save_settings(uid, settings):
-    supabase.table("user_settings").upsert(
-        {
-            "user_id": uid,
-            "settings_json": settings,
-        }
-    ).execute()
+    _upsert("user_settings", "settings_json", uid, settings)
+    _saved(uid, "settings", settings)
 
-def save_schedule(uid, schedule):
-    supabase.table("user_schedule").upsert(
-        {
-            "user_id": uid,
-            "schedule_json": schedule,
-        }
-    ).execute()
+# Schedules are stored in the compact format (see utils/schedule_codec.py),
+# old expanded documents are still read transparently by load_user_data
+def save_schedule(uid, schedule, compress=False):
+    _upsert("user_schedule", "schedule_json", uid, encode_schedule(schedule, compress=compress))
+    _saved(uid, "schedule", schedule)
 
 def save_completions(uid, completions):
-    supabase.table("user_task_completion").upsert(
-        {
-            "user_id": uid,
-            "completion_json": completions,
-        }
-    ).execute()
+    _upsert("user_task_completion", "completion_json", uid, completions)
+    _saved(uid, "completions", completions)
+
+# Shared Course Catalog (course_catalog: content_hash, course_code, term,
+# semester_start, semester_end, course_json)
+
+# entries never change once written, so hits are cached for the process
+# (misses aren't, the entry may be written by another user later)
+_CATALOG_CACHE = OrderedDict()
+_CATALOG_CACHE_SIZE = 1024
+_CATALOG_LOCK = threading.Lock()
+
+def get_catalog_course(content_hash):
+    with _CATALOG_LOCK:
+        course = _CATALOG_CACHE.get(content_hash)
+        if course is not None:
+            _CATALOG_CACHE.move_to_end(content_hash)
+            return course
+
+    with span("sb.load", table="course_catalog"):
+        res = get_client().table("course_catalog") \
+            .select("course_json") \
+            .eq("content_hash", content_hash) \
+            .execute()
+    if not res.data:
+        return None
+
+    course = res.data[0].get("course_json")
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE[content_hash] = course
+        while len(_CATALOG_CACHE) > _CATALOG_CACHE_SIZE:
+            _CATALOG_CACHE.popitem(last=False)
+    return course
+
+def _catalog_base(ref):
+    return get_catalog_course(ref.get("hash"))
+
+def find_catalog_courses(course_code, term, semester_start, semester_end):
+    res = get_client().table("course_catalog") \
+        .select("content_hash, course_json") \
+        .eq("course_code", course_code) \
+        .eq("term", term) \
+        .eq("semester_start", semester_start) \
+        .eq("semester_end", semester_end) \
+        .execute()
+
+    # several copies of one syllabus (different PDFs) count as one course
+    distinct = {}
+    for row in res.data or []:
+        distinct.setdefault(repr(row.get("course_json")), (row["content_hash"], row.get("course_json")))
+    return list(distinct.values())
+
+def save_catalog_course(content_hash, course_code, term, course, semester_start, semester_end):
+    with span("sb.save", table="course_catalog", bytes=payload_size(course)):
+        get_client().table("course_catalog").upsert(
+            {
+                "content_hash": content_hash,
+                "course_code": course_code,
+                "term": term,
+                "semester_start": semester_start,
+                "semester_end": semester_end,
+                "course_json": course,
+            }
+        ).execute()
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE[content_hash] = course
+
+# Schedule history (schedule_versions: version_id, user_id, version, parent,
+# created_at, label, snapshot, data), see utils/schedule_history.py
+
+_VERSION_META = "version, parent, created_at, label, snapshot"
+
+def load_schedule_versions(uid):
+    res = get_client().table("schedule_versions") \
+        .select(_VERSION_META) \
+        .eq("user_id", uid) \
+        .execute()
+    return res.data or []
+
+def load_schedule_version(uid, version):
+    with span("sb.load", table="schedule_versions") as attrs:
+        res = get_client().table("schedule_versions") \
+            .select("*") \
+            .eq("version_id", f"{uid}:{version}") \
+            .execute()
+        if not res.data:
+            raise KeyError(f"No schedule version {version}")
+        attrs["bytes"] = payload_size(res.data[0].get("data"))
+        return res.data[0]
+
+def save_schedule_version(uid, row):
+    with span("sb.save", table="schedule_versions", bytes=payload_size(row.get("data"))):
+        get_client().table("schedule_versions").upsert(dict(row, user_id=uid)).execute()
+
+def delete_schedule_version(uid, version):
+    get_client().table("schedule_versions") \
+        .delete() \
+        .eq("version_id", f"{uid}:{version}") \
+        .execute()
 
 def remove_course(uid, course_code):
-    res = supabase.table("user_courses") \
+    res = get_client().table("user_courses") \
         .select("courses_json") \
         .eq("user_id", uid) \
         .execute()
@@ -95,11 +199,12 @@ def remove_course(uid, course_code):
         return {}
     courses = res.data[0].get("courses_json") or {}
     courses.pop(course_code, None)
-    supabase.table("user_courses").upsert(
+    get_client().table("user_courses").upsert(
         {
             "user_id": uid,
             "courses_json": courses,
         }
     ).execute()
+    _saved(uid, "courses", None)
 
     return courses
\ No newline at end of file
@@ -1,11 +1,19 @@
+import math
 from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
+
+from utils.capacity import CapacityCalendar
+from utils.tracing import span
 
 
 DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
 
 
+class GenerationCancelled(Exception):
+    pass
+
+
 @dataclass
 class DaySlot:
 
@@ -28,23 +36,33 @@ class ScheduleOptimizer:
         semester_end: str,
         daily_hours: Dict[str, float],
         work_ahead_days: Dict[str, int],
+        capacity_exceptions: Optional[List[Dict[str, Any]]] = None,
+        capacity_anchor: Optional[str] = None,
     ):
         self.semester_start = datetime.strptime(semester_start, "%Y-%m-%d").date()
         self.semester_end = datetime.strptime(semester_end, "%Y-%m-%d").date()
         self.daily_hours = {k.lower(): float(v) for k, v in daily_hours.items()}
         self.work_ahead_days = {k.lower(): int(v) for k, v in work_ahead_days.items()}
+        # recurring exceptions without a start count their weeks from here;
+        # a plan over part of the semester passes the real semester start
+        anchor = datetime.strptime(capacity_anchor, "%Y-%m-%d").date() if capacity_anchor else None
+        self.calendar = CapacityCalendar(
+            self.daily_hours, capacity_exceptions, self.semester_start, self.semester_end, anchor
+        )
 
         self.days = self._build_day_slots()
 
     # Calendar construction
 
     def _build_day_slots(self) -> List[DaySlot]:
+        # weekly hours with holidays, reading weeks etc. from capacity_exceptions
         days: List[DaySlot] = []
+        if self.semester_end < self.semester_start:
+            return days
+        capacities = self.calendar.capacities(self.semester_start, self.semester_end)
         current = self.semester_start
-        while current <= self.semester_end:
-            weekday_index = current.weekday()  # Monday=0
-            weekday_name = DAY_NAMES[weekday_index]
-            capacity = self.daily_hours.get(weekday_name, 0.0)
+        for capacity in capacities:
+            weekday_name = DAY_NAMES[current.weekday()]  # Monday=0
             days.append(DaySlot(date=current, weekday=weekday_name, capacity=capacity))
             current += timedelta(days=1)
         return days
@@ -52,9 +70,21 @@ class ScheduleOptimizer:
     def _find_days_in_window(self, start: date, end: date) -> List[DaySlot]:
         return [d for d in self.days if start <= d.date <= end and d.capacity > 0.0]
 
+    def preload(self, days: List[Dict[str, Any]]) -> None:
+        # tasks from a saved schedule count against each day's capacity
+        slots = {d.date: d for d in self.days}
+        for day in days:
+            slot = slots.get(datetime.strptime(day["date"], "%Y-%m-%d").date())
+            if slot is not None:
+                slot.tasks.extend(day.get("tasks", []))
+
     def _round_to_half_hour(self, hours: float) -> float:
         return round(hours * 2) / 2
 
+    def _ceil_to_half_hour(self, hours: float) -> float:
+        # the tolerance keeps float noise (1.0000001) from adding a block
+        return math.ceil(hours * 2 - 1e-9) / 2
+
     # Scheduling core
  
     def _compute_work_window(self, due_date_str: str, atype: str) -> tuple[date, date]:
@@ -77,11 +107,20 @@ class ScheduleOptimizer:
     def _allocate_assessment(
         self,
         assessment: Dict[str, Any],
-        assessment_id: int,
+        assessment_id: Any,
+        window_start: Optional[date] = None,
     ) -> Dict[str, Any]:
         atype = (assessment.get("type") or "unknown").lower()
         due_date = assessment.get("due_date")
-        hours_required = float(assessment.get("hours_required", 0.0))
+        try:
+            hours_required = float(assessment.get("hours_required") or 0.0)
+        except (TypeError, ValueError):
+            hours_required = 0.0
+        if not math.isfinite(hours_required):
+            hours_required = 0.0
+        # plans are made of half-hour blocks, so the requirement is too;
+        # rounded up, so a small requirement is never dropped
+        hours_required = self._ceil_to_half_hour(hours_required)
 
         if not due_date or hours_required <= 0:
             return {
@@ -91,7 +130,18 @@ class ScheduleOptimizer:
                 "status": "skipped_missing_date_or_zero_hours",
             }
 
-        start, end = self._compute_work_window(due_date, atype)
+        try:
+            start, end = self._compute_work_window(due_date, atype)
+        except (TypeError, ValueError):
+            return {
+                "assessment_id": assessment_id,
+                "scheduled_hours": 0.0,
+                "unscheduled_hours": hours_required,
+                "status": "skipped_invalid_due_date",
+            }
+        if window_start is not None:
+            # roll-forward: whatever is left of the window, ignoring work-ahead
+            start = max(window_start, self.semester_start)
         window_days = self._find_days_in_window(start, end)
 
         if not window_days:
@@ -150,13 +200,32 @@ class ScheduleOptimizer:
             "status": "ok" if remaining <= 1e-3 else "incomplete_capacity",
         }
 
-    def generate_raw_schedule(self, assessments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_raw_schedule(
+        self,
+        assessments: List[Dict[str, Any]],
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Any = None,
+    ) -> Dict[str, Any]:
+        # progress(done, total) is called after each assessment; cancel is
+        # anything with is_set() (e.g. threading.Event) and stops generation
+        with span("optimizer.generate", assessments=len(assessments), days=len(self.days)):
+            return self._generate(assessments, progress, cancel)
+
+    def _generate(self, assessments, progress, cancel) -> Dict[str, Any]:
         allocation_summaries = []
+        total = len(assessments)
 
         for idx, a in enumerate(assessments):
-            summary = self._allocate_assessment(a, assessment_id=idx)
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled()
+
+            # stable ids from the assessment store, list position for older callers
+            summary = self._allocate_assessment(a, assessment_id=a.get("id") or idx)
             allocation_summaries.append(summary)
 
+            if progress is not None:
+                progress(idx + 1, total)
+
         # Build per-day schedule structure
         day_entries = []
         for d in self.days:
@@ -1,163 +1,407 @@
-import PyPDF2
-import openai
-import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.syllabus_schema import merge_syllabi, repair_syllabus, record_recall, SyllabusParseError
+from utils.tracing import span
+
+
+# The instructions are a fixed system message and everything that varies
+# (semester dates, syllabus text) goes in the user message after it, so every
+# request shares the same prefix and can hit the provider's prompt cache.
+# Providers only cache prefixes of 1024+ tokens; the worked example keeps the
+# prefix above that (benchmarks/bench_prompt.py reports the cached share).
+SYSTEM_PROMPT = """\
+You are a syllabus parser. Extract information from the syllabus and return STRICT JSON.
+The semester dates and the syllabus text are given in the user message.
+
+GENERAL EXTRACTION RULES:
+---------------------------------------
+
+1. DATE & TIME FORMATTING
+   - Convert all dates to ISO format.
+   - If due TIME is given (e.g., “11:59 PM”), include it:
+       YYYY-MM-DDTHH:MM:SS
+   - Use 24-hour time.
+   - If no time is given → use date only (YYYY-MM-DD).
+   - Examples:
+       “Due Nov 25 at 11:59 PM” → “2025-11-25T23:59:00”
+       “Due Nov 25” → “2025-11-25”
+   - If the syllabus refers to “Week X”:
+       week_start = semester_start + (X - 1) * 7 days
+       week_end   = week_start + 6 days
+       Use week_start unless a specific day is clearly stated.
+   - If a date cannot be determined → due_date = null.
+
+2. WEIGHT PARSING
+   - Convert all weights to numeric values:
+       “20%” → 20
+       “twenty percent” → 20
+
+3. CATEGORY WEIGHT DISTRIBUTION (ENHANCED)
+   When a syllabus gives a category weight (e.g., “Participation 15%”):
+   - SEARCH THE ENTIRE SYLLABUS for occurrences of events belonging to that
+     category, including:
+       * quizzes
+       * assignments
+       * labs
+       * exercises
+       * activities
+       * reports
+       * tutorials
+   - If multiple matching events exist (even if not numbered):
+       Create a separate item for EACH event.
+       Divide the category weight evenly among them.
+   - Use any explicitly stated dates found anywhere in the syllabus
+     (grading section, schedule section, weekly breakdown, etc.).
+
+   EXAMPLE:
+   If the syllabus lists “Class Participation 15%”
+   and elsewhere states that participation is based on 4 quizzes,
+   and the course schedule lists quiz dates:
+      - Sept 16
+      - Sept 30
+      - Oct 21
+      - Nov 25
+   Then:
+      - Output 4 quiz items (Quiz 1, Quiz 2, Quiz 3, Quiz 4)
+      - Each with weight = 15 / 4 = 3.75
+      - Use the actual quiz dates as due_date
+      - notes may be “Counts toward class participation” or null
+
+4. PLURAL-ASSESSMENT RULE (IMPORTANT)
+   If the syllabus refers to an assessment using a **plural noun**
+   (e.g., “quizzes”, “labs”, “assignments”, “activities”):
+     - ASSUME multiple items exist.
+     - Search the entire syllabus for ALL occurrences of that assessment type.
+     - If dates appear anywhere, use them.
+     - Create one assessment entry per occurrence:
+         Quiz 1, Quiz 2, Quiz 3, ...
+     - If a single category weight applies, divide it evenly across all items.
+
+5. REQUIRED ASSESSMENT IDENTIFICATION
+   Identify ALL assessments, explicit or implied:
+     - assignments
+     - quizzes
+     - labs
+     - projects
+     - midterms
+     - finals
+     - presentations
+     - participation components
+     - scheduled in-class quizzes or tests
+   Each individual item must be listed separately (Quiz 1, Quiz 2, etc.).
+
+6. GENERATING ASSESSMENT ITEMS (ENHANCED)
+   For each assessment you identify:
+      * type → string
+      * weight → number
+      * due_date → ISO date or null
+      * notes → string or null
+
+   Additional rules:
+   - Auto-number items if multiple events belong to the same category.
+   - If the date for an event appears in the weekly/topic schedule, use that date.
+   - If no explicit name exists, infer a reasonable name based on the type.
+
+7. OUTPUT FORMAT — MUST BE STRICT JSON
+{
+    "course_info": {
+        "course_name": "string",
+        "course_code": "string",
+        "semester": "string",
+        "year": "string",
+        "instructor": {
+            "name": "string",
+            "email": "string"
+        }
+    },
+    "assessments": {
+        "breakdown": [
+            {
+                "type": "string",
+                "weight": number,
+                "due_date": "YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS or null",
+                "notes": "string or null"
+            }
+        ],
+        "total_weight": number
+    }
+}
+
+8. WORKED EXAMPLE
+   Semester starts 2025-09-04. Syllabus excerpt:
+       "CP104 Introduction to Programming, Fall 2025. Instructor: Dr. A. Smith
+        (asmith@example.edu). Assignment 1 (15%) due Sept 26 at 11:59 PM.
+        Quizzes 10%: four in-class quizzes in Weeks 3, 5, 8 and 11.
+        Midterm 25% on October 21. Final Exam 50%, date TBA."
+   Output:
+   {
+       "course_info": {
+           "course_name": "Introduction to Programming",
+           "course_code": "CP104",
+           "semester": "Fall",
+           "year": "2025",
+           "instructor": {"name": "Dr. A. Smith", "email": "asmith@example.edu"}
+       },
+       "assessments": {
+           "breakdown": [
+               {"type": "Assignment 1", "weight": 15, "due_date": "2025-09-26T23:59:00", "notes": null},
+               {"type": "Quiz 1", "weight": 2.5, "due_date": "2025-09-18", "notes": "In-class quiz"},
+               {"type": "Quiz 2", "weight": 2.5, "due_date": "2025-10-02", "notes": "In-class quiz"},
+               {"type": "Quiz 3", "weight": 2.5, "due_date": "2025-10-23", "notes": "In-class quiz"},
+               {"type": "Quiz 4", "weight": 2.5, "due_date": "2025-11-13", "notes": "In-class quiz"},
+               {"type": "Midterm", "weight": 25, "due_date": "2025-10-21", "notes": null},
+               {"type": "Final Exam", "weight": 50, "due_date": null, "notes": "Date TBA"}
+           ],
+           "total_weight": 100
+       }
+   }
+
+Return STRICT JSON. No commentary. No extra fields.
+"""
+
+# (max estimated prompt tokens, model, max output tokens), first match wins.
+# Short outlines go to the cheapest model (the local repair pass and a re-call
+# on unrecoverable output cover it), course packs beyond gpt-4o-mini's 128k
+# context go to a long-context model with room for more items.
+MODEL_ROUTES = (
+    (8_000, "gpt-4.1-nano", 2_000),
+    (100_000, "gpt-4o-mini", 6_000),
+    (None, "gpt-4.1-mini", 12_000),
+)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for routing
+    return len(text or "") // 4
+
+
+_SYSTEM_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+
+def route_model(text, routes=MODEL_ROUTES):
+    tokens = estimate_tokens(text) + _SYSTEM_TOKENS
+    for limit, model, max_tokens in routes:
+        if limit is None or tokens <= limit:
+            return model, max_tokens
+    return routes[-1][1], routes[-1][2]
+
+
+def escalate_route(model, max_tokens, routes=MODEL_ROUTES):
+    # the route for a retry: the next larger model, or twice the output
+    # budget once the largest one is in use
+    models = [m for _, m, _ in routes]
+    if model in models and models.index(model) + 1 < len(routes):
+        _, model, bigger = routes[models.index(model) + 1]
+        return model, max(bigger, max_tokens)
+    return model, max_tokens * 2
+
+
+# Long outlines and course packs are parsed in parts: the text is split on
+# section boundaries into parts small enough for the cheapest route, all parts
+# are sent at once and the results are merged locally (merge_syllabi), so
+# latency is that of the slowest part rather than growing with the document.
+# Each part after the first also gets the start of the document (course code,
+# term) for context. A part with nothing usable fails the whole parse rather
+# than leaving its assessments out.
+CHUNKED_ABOVE = 20_000   # estimated text tokens
+CHUNK_TOKENS = 6_000
+CHUNK_PARTS = 16         # parts aimed for at most
+HEAD_CHARS = 1_500
+
+# LLM calls in flight per process, over all documents (batch.py parses several
+# at once); parts run on one shared pool of the same size
+MAX_CONCURRENT_CALLS = 16
+_CALL_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_CALLS)
+_PART_POOL = ThreadPoolExecutor(MAX_CONCURRENT_CALLS, thread_name_prefix="parse-part")
+
+# headings: "Week 5", "Module 3: ...", "4.2 Assessment", "GRADING POLICY";
+# form feeds are page breaks
+SECTION_BREAK = re.compile(
+    r"^(?=[ \t]*(?:(?i:week|module|unit|chapter|part|section|lecture|topic)\s+\d+\b"
+    r"|\d+(?:\.\d+)*[.)]?[ \t]+[A-Z]"
+    r"|[A-Z][A-Z0-9 &/,:()'-]{3,80}$))|\f",
+    re.M,
+)
+
+
+def _pieces(text, max_chars):
+    # a section that is too long on its own, cut at paragraphs, then lines
+    for sep in ("\n\n", "\n"):
+        parts = text.split(sep)
+        if len(parts) > 1:
+            out, current = [], ""
+            for part in parts:
+                if current and len(current) + len(sep) + len(part) > max_chars:
+                    out.append(current)
+                    current = part
+                else:
+                    current = f"{current}{sep}{part}" if current else part
+            out.append(current)
+            return [p for piece in out for p in (_pieces(piece, max_chars) if len(piece) > max_chars else [piece])]
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def split_sections(text, max_tokens=CHUNK_TOKENS):
+    # consecutive sections packed into parts of at most max_tokens
+    text = text or ""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return [text]
+
+    starts = sorted({0, *(m.start() for m in SECTION_BREAK.finditer(text))})
+    sections = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    parts, current = [], ""
+    for section in sections:
+        pieces = _pieces(section, max_chars) if len(section) > max_chars else [section]
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                parts.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+def usage_attrs(response):
+    # prompt/cached token counts for tracing, when the provider reports them
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "cached_tokens": getattr(details, "cached_tokens", None) if details is not None else None,
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+
+def build_messages(text, semester_start, semester_end, part=None, head=None):
+    # part=(i, n) marks one part of a long outline; head is the document start
+    label = "SYLLABUS TEXT:\n"
+    if part is not None:
+        label = (
+            f"SYLLABUS TEXT (part {part[0]} of {part[1]}; extract only what appears in this part):\n"
+        )
+        if head:
+            label = f"DOCUMENT START (context only):\n{head}\n\n{label}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                "SEMESTER DATES:\n"
+                f"- Semester starts: {semester_start}\n"
+                f"- Semester ends: {semester_end}\n\n"
+                f"{label}"
+                f"{text}"
+            ),
+        },
+    ]
 
 
 class SyllabusScraper:
 
-    def __init__(self, api_key):
+    # openai and PyPDF2 are imported on first use to keep page start-up light
+
+    def __init__(self, api_key, max_attempts=2):
+        import openai
+
         self.client = openai.OpenAI(api_key=api_key)
+        self.max_attempts = max_attempts
 
-    def extract_text_from_pdf(self, pdf_path):
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-        return text
-
-    def parse_syllabus(self, text, semester_start, semester_end):
-        prompt = f"""
-        You are a syllabus parser. Extract information from the syllabus and return STRICT JSON.
-
-        SEMESTER DATES:
-        - Semester starts: {semester_start}
-        - Semester ends: {semester_end}
-
-        GENERAL EXTRACTION RULES:
-        ---------------------------------------
-
-        1. DATE & TIME FORMATTING
-           - Convert all dates to ISO format.
-           - If due TIME is given (e.g., “11:59 PM”), include it:
-               YYYY-MM-DDTHH:MM:SS
-           - Use 24-hour time.
-           - If no time is given → use date only (YYYY-MM-DD).
-           - Examples:
-               “Due Nov 25 at 11:59 PM” → “2025-11-25T23:59:00”
-               “Due Nov 25” → “2025-11-25”
-           - If the syllabus refers to “Week X”:
-               week_start = semester_start + (X - 1) * 7 days
-               week_end   = week_start + 6 days
-               Use week_start unless a specific day is clearly stated.
-           - If a date cannot be determined → due_date = null.
-
-        2. WEIGHT PARSING
-           - Convert all weights to numeric values:
-               “20%” → 20
-               “twenty percent” → 20
-
-        3. CATEGORY WEIGHT DISTRIBUTION (ENHANCED)
-           When a syllabus gives a category weight (e.g., “Participation 15%”):
-           - SEARCH THE ENTIRE SYLLABUS for occurrences of events belonging to that
-             category, including:
-               * quizzes
-               * assignments
-               * labs
-               * exercises
-               * activities
-               * reports
-               * tutorials
-           - If multiple matching events exist (even if not numbered):
-               Create a separate item for EACH event.
-               Divide the category weight evenly among them.
-           - Use any explicitly stated dates found anywhere in the syllabus
-             (grading section, schedule section, weekly breakdown, etc.).
-
-           EXAMPLE:
-           If the syllabus lists “Class Participation 15%”
-           and elsewhere states that participation is based on 4 quizzes,
-           and the course schedule lists quiz dates:
-              - Sept 16
-              - Sept 30
-              - Oct 21
-              - Nov 25
-           Then:
-              - Output 4 quiz items (Quiz 1, Quiz 2, Quiz 3, Quiz 4)
-              - Each with weight = 15 / 4 = 3.75
-              - Use the actual quiz dates as due_date
-              - notes may be “Counts toward class participation” or null
-
-        4. PLURAL-ASSESSMENT RULE (IMPORTANT)
-           If the syllabus refers to an assessment using a **plural noun**
-           (e.g., “quizzes”, “labs”, “assignments”, “activities”):
-             - ASSUME multiple items exist.
-             - Search the entire syllabus for ALL occurrences of that assessment type.
-             - If dates appear anywhere, use them.
-             - Create one assessment entry per occurrence:
-                 Quiz 1, Quiz 2, Quiz 3, ...
-             - If a single category weight applies, divide it evenly across all items.
-
-        5. REQUIRED ASSESSMENT IDENTIFICATION
-           Identify ALL assessments, explicit or implied:
-             - assignments
-             - quizzes
-             - labs
-             - projects
-             - midterms
-             - finals
-             - presentations
-             - participation components
-             - scheduled in-class quizzes or tests
-           Each individual item must be listed separately (Quiz 1, Quiz 2, etc.).
-
-        6. GENERATING ASSESSMENT ITEMS (ENHANCED)
-           For each assessment you identify:
-              * type → string
-              * weight → number
-              * due_date → ISO date or null
-              * notes → string or null
-
-           Additional rules:
-           - Auto-number items if multiple events belong to the same category.
-           - If the date for an event appears in the weekly/topic schedule, use that date.
-           - If no explicit name exists, infer a reasonable name based on the type.
-
-        7. OUTPUT FORMAT — MUST BE STRICT JSON
-        {{
-            "course_info": {{
-                "course_name": "string",
-                "course_code": "string",
-                "semester": "string",
-                "year": "string",
-                "instructor": {{
-                    "name": "string",
-                    "email": "string"
-                }}
-            }},
-            "assessments": {{
-                "breakdown": [
-                    {{
-                        "type": "string",
-                        "weight": number,
-                        "due_date": "YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS or null",
-                        "notes": "string or null"
-                    }}
-                ],
-                "total_weight": number
-            }}
-        }}
-
-        Return STRICT JSON. No commentary. No extra fields.
-
-        ---------------------------------------
-        SYLLABUS TEXT:
-        {text}
-        """
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Extract structured syllabus data and output STRICT JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
+    @staticmethod
+    def extract_text_from_pdf(pdf_path):
+        import PyPDF2
+
+        with span("scraper.extract_text") as attrs:
+            text = ""
+            with open(pdf_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for page in pdf_reader.pages:
+                    page_text = page.extract_text()
+                    if page_text:
+                        # page breaks are section boundaries for split_sections
+                        text += page_text + "\f"
+                attrs["pages"] = len(pdf_reader.pages)
+            attrs["chars"] = len(text)
+            return text
+
+    def parse_syllabus(self, text, semester_start, semester_end, chunked=None):
+        # chunked=None parses outlines over CHUNKED_ABOVE tokens in parts
+        if chunked is None:
+            chunked = estimate_tokens(text) > CHUNKED_ABOVE
+        if chunked:
+            return self.parse_syllabus_chunked(text, semester_start, semester_end)
+
+        course, report = self._parse(build_messages(text, semester_start, semester_end), text,
+                                     semester_start, semester_end)
+        if report.fatal:
+            raise SyllabusParseError(f"Could not parse syllabus: {report.fatal}")
+        return course
+
+    def parse_syllabus_chunked(self, text, semester_start, semester_end, target_parts=CHUNK_PARTS):
+        # parts grow past CHUNK_TOKENS rather than go far beyond target_parts
+        # (packing whole sections can leave up to about twice as many)
+        size = max(CHUNK_TOKENS, -(-estimate_tokens(text) // target_parts))
+        parts = split_sections(text, size)
+        head = (text or "")[:HEAD_CHARS]
+
+        def parse(i):
+            context = head if i else None
+            messages = build_messages(parts[i], semester_start, semester_end, (i + 1, len(parts)), context)
+            return self._parse(messages, parts[i] + (context or ""), semester_start, semester_end)
+
+        with span("scraper.parse_chunked", parts=len(parts), text_chars=len(text or "")) as attrs:
+            results = list(_PART_POOL.map(parse, range(len(parts))))
+
+            failed = [i + 1 for i, (_, report) in enumerate(results) if report.fatal]
+            attrs["failed_parts"] = len(failed)
+            if failed:
+                raise SyllabusParseError(
+                    f"Could not parse part{'s' if len(failed) > 1 else ''} "
+                    f"{', '.join(map(str, failed))} of {len(parts)}: {results[failed[0] - 1][1].fatal}"
+                )
+            course, report = merge_syllabi([course for course, _ in results])
+            attrs["merged"] = report.kinds().get("merged_duplicate", 0)
+            attrs["repairs"] = len(report.issues)
+        return course
+
+    def _parse(self, messages, text, semester_start, semester_end):
+        model, max_tokens = route_model(text)
+
+        # output is validated and repaired locally; the model is only asked
+        # again when there is nothing usable to repair
+        for attempt in range(self.max_attempts):
+            with span("scraper.parse_syllabus", model=model, text_chars=len(text or ""), attempt=attempt) as attrs:
+                response = self._complete(messages, model, max_tokens)
+                content = response.choices[0].message.content
+                course, report = repair_syllabus(content, semester_start, semester_end)
+                attrs["response_chars"] = len(content or "")
+                attrs["repairs"] = len(report.issues)
+                attrs.update(usage_attrs(response))
+
+            if not report.fatal:
+                break
+            if attempt + 1 < self.max_attempts:
+                record_recall()
+                # the same request would most likely fail the same way
+                # (truncated or empty output), so the retry gets more room
+                model, max_tokens = escalate_route(model, max_tokens)
+        return course, report
 
-        return json.loads(response.choices[0].message.content)
+    def _complete(self, messages, model, max_tokens):
+        with _CALL_SLOTS:
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.1,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
 
     def scrape_syllabus(self, pdf_path, semester_start, semester_end):
         text = self.extract_text_from_pdf(pdf_path)
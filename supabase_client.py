@@ -1,7 +1,14 @@
-from supabase import create_client
+from functools import lru_cache
 import streamlit as st
 
-supabase = create_client(
-    st.secrets["SUPABASE_URL"],
-    st.secrets["SUPABASE_ANON_KEY"]
-)
\ No newline at end of file
+
+# The client (and the supabase package itself) is only loaded the first time
+# it is needed, so pages that never touch the database start faster.
+@lru_cache(maxsize=1)
+def get_client():
+    from supabase import create_client
+
+    return create_client(
+        st.secrets["SUPABASE_URL"],
+        st.secrets["SUPABASE_ANON_KEY"]
+    )
@@ -0,0 +1,160 @@
+import uuid
+from typing import Any, Dict, List, Iterable
+
+from utils.normalize import normalize_type
+
+
+# Assessment store for the Optimize page
+#
+# Every assessment gets a stable id that is written back into the course's
+# breakdown, so it survives saves and reloads and can flow into schedule tasks
+# (assessment_id) and completions. The classified type is saved alongside it
+# (category), so a course keeps its base hours when the classifier changes.
+# Rows are indexed by id and grouped by
+# course, so editing or filtering one course never touches the others.
+
+EDITABLE_FIELDS = ["type", "title", "due_date", "hours_required"]
+
+
+def new_assessment_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _valid_id(value: Any) -> bool:
+    return isinstance(value, str) and bool(value)
+
+
+class AssessmentStore:
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_course: Dict[str, List[str]] = {}
+        # number of ids and categories from_courses had to assign (courses
+        # need saving if either is > 0)
+        self.assigned_ids = 0
+        self.assigned_categories = 0
+
+    @classmethod
+    def from_courses(
+        cls,
+        courses: Dict[str, Any],
+        base_hours: Dict[str, float] = None,
+        synonyms: Dict[str, str] = None,
+    ) -> "AssessmentStore":
+        store = cls()
+        base_hours = base_hours or {}
+
+        # convert parsed JSON structure into a flat table for user editing
+        for key, course_json in courses.items():
+            course_code = course_json.get("course_info", {}).get("course_code") or key
+            breakdown = course_json.get("assessments", {}).get("breakdown", [])
+
+            for a in breakdown:
+                if not _valid_id(a.get("id")):
+                    a["id"] = new_assessment_id()
+                    store.assigned_ids += 1
+
+                raw_type = a.get("type", "")
+                atype = a.get("category")
+                if not isinstance(atype, str) or not atype:
+                    atype = a["category"] = normalize_type(raw_type, synonyms)
+                    store.assigned_categories += 1
+
+                store.add({
+                    "id": a["id"],
+                    "course_code": course_code,
+                    "type": atype,
+                    "title": a.get("title") or raw_type.title(),
+                    "due_date": a.get("due_date"),
+                    "hours_required": a.get("hours_required", base_hours.get(atype, 0)),
+                })
+
+        return store
+
+    # Lookups
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, assessment_id: str) -> Dict[str, Any]:
+        return self._by_id[assessment_id]
+
+    def course_codes(self) -> List[str]:
+        return list(self._by_course)
+
+    def course_rows(self, course_code: str) -> List[Dict[str, Any]]:
+        return [self._by_id[i] for i in self._by_course.get(course_code, [])]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [self._by_id[i] for ids in self._by_course.values() for i in ids]
+
+    # Edits
+
+    def add(self, row: Dict[str, Any]) -> str:
+        row = dict(row)
+        if not _valid_id(row.get("id")) or row["id"] in self._by_id:
+            row["id"] = new_assessment_id()
+        self._by_id[row["id"]] = row
+        self._by_course.setdefault(row.get("course_code") or "", []).append(row["id"])
+        return row["id"]
+
+    def remove(self, assessment_id: str) -> None:
+        row = self._by_id.pop(assessment_id, None)
+        if row is None:
+            return
+        ids = self._by_course.get(row.get("course_code") or "", [])
+        if assessment_id in ids:
+            ids.remove(assessment_id)
+
+    def remove_course(self, course_code: str) -> None:
+        for assessment_id in self._by_course.pop(course_code, []):
+            self._by_id.pop(assessment_id, None)
+
+    def replace_rows(self, course_codes: Iterable[str], rows: List[Dict[str, Any]]) -> None:
+        # merge the edited rows of a filtered view back in: only the given
+        # courses (plus any course a row was moved to) are touched
+        course_codes = list(course_codes)
+        keep = {r.get("id") for r in rows if _valid_id(r.get("id"))}
+
+        for course_code in course_codes:
+            for assessment_id in list(self._by_course.get(course_code, [])):
+                if assessment_id not in keep:
+                    self.remove(assessment_id)
+
+        for row in rows:
+            assessment_id = row.get("id")
+            current = self._by_id.get(assessment_id) if _valid_id(assessment_id) else None
+
+            if current is None:
+                self.add(row)
+                continue
+
+            if row.get("course_code") != current.get("course_code"):
+                self.remove(assessment_id)
+                self.add(row)
+                continue
+
+            current.update({k: row.get(k) for k in EDITABLE_FIELDS})
+
+    # Output
+
+    def to_breakdowns(self, courses: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        # per-course breakdowns with edits applied by id, keeping fields the
+        # editor doesn't show (weight, notes)
+        out = {}
+        for course_code, ids in self._by_course.items():
+            existing = {
+                a.get("id"): a
+                for a in courses.get(course_code, {}).get("assessments", {}).get("breakdown", [])
+            }
+            breakdown = []
+            for assessment_id in ids:
+                row = self._by_id[assessment_id]
+                entry = dict(existing.get(assessment_id, {}))
+                entry.update({"id": assessment_id}, **{k: row.get(k) for k in EDITABLE_FIELDS})
+                # an edited type is classified again on the next load
+                if entry.get("category") != row.get("type"):
+                    entry.pop("category", None)
+                breakdown.append(entry)
+            out[course_code] = breakdown
+        return out
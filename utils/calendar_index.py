@@ -0,0 +1,86 @@
+import hashlib
+import json
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+
+
+# Week index for the Calendar page
+#
+# Buckets scheduled tasks and assessment due markers by ISO week (Monday start)
+# once per schedule, so moving between weeks is a dict lookup instead of a
+# rescan of the whole semester.
+
+
+def parse_due_date(due_date_str: str) -> Optional[datetime]:
+    # Handle both date formats (with and without time)
+    if not due_date_str:
+        return None
+    try:
+        if "T" in due_date_str:
+            return datetime.strptime(due_date_str, "%Y-%m-%dT%H:%M:%S")
+        return datetime.strptime(due_date_str, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def schedule_hash(schedule: Dict[str, Any], courses: Dict[str, Any] = None) -> str:
+    payload = json.dumps([schedule or {}, courses or {}], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _empty_week() -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    return {"tasks": {}, "due": {}}
+
+
+def build_week_index(schedule: Dict[str, Any], courses: Dict[str, Any] = None) -> Dict[str, Any]:
+    by_week: Dict[date, Dict[str, Dict[str, List[Dict[str, Any]]]]] = {}
+
+    scheduled_dates = []
+    for day in schedule.get("days", []):
+        day_date = datetime.strptime(day["date"], "%Y-%m-%d").date()
+        scheduled_dates.append(day_date)
+        week = by_week.setdefault(week_start(day_date), _empty_week())
+        week["tasks"].setdefault(day["date"], []).extend(day.get("tasks", []))
+
+    for course_code, course_data in (courses or {}).items():
+        assessments = course_data.get("assessments", {}).get("breakdown", [])
+        for assessment in assessments:
+            due_date_str = assessment.get("due_date")
+            due_dt = parse_due_date(due_date_str)
+            if due_dt is None:
+                continue
+            due_date = due_dt.date()
+            week = by_week.setdefault(week_start(due_date), _empty_week())
+            week["due"].setdefault(due_date.strftime("%Y-%m-%d"), []).append({
+                "course_code": course_code,
+                "type": assessment.get("type", "Assessment"),
+                "title": assessment.get("title", assessment.get("type", "Assessment")),
+                "due_date_str": due_date_str,
+            })
+
+    # navigable weeks span the scheduled days, including empty weeks in between
+    weeks: List[date] = []
+    if scheduled_dates:
+        cursor = week_start(min(scheduled_dates))
+        last = week_start(max(scheduled_dates))
+        while cursor <= last:
+            weeks.append(cursor)
+            cursor += timedelta(days=7)
+
+    return {
+        "weeks": weeks,
+        "positions": {w: i for i, w in enumerate(weeks)},
+        "by_week": by_week,
+    }
+
+
+def get_week(index: Dict[str, Any], monday: date) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    return index["by_week"].get(monday) or _empty_week()
+
+
+def week_position(index: Dict[str, Any], d: date) -> Optional[int]:
+    return index["positions"].get(week_start(d))
@@ -0,0 +1,273 @@
+import html
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, Iterable, Tuple
+
+from utils.calendar_index import parse_due_date
+
+
+# Weekly card renderer for the Calendar page
+#
+# Card markup is kept in string.Templates compiled once at import time, due-date
+# parsing for tooltips is memoized, and RenderCache keeps finished week HTML so
+# unchanged weeks are served without rebuilding anything.
+
+CALENDAR_CSS = """
+<style>
+.calendar-container .card-container {
+    display: flex;
+    justify-content: space-between;
+    align-items: flex-start;
+    gap: 25px;
+    padding: 10px;
+    width: 100%;
+}
+
+.calendar-container .day-card {
+    background-color: #F4F9FF;
+    border: 2px solid #1A3A5F;
+    border-radius: 14px;
+    padding: 18px;
+    width: 230px;
+    min-height: 260px;
+    text-align: center;
+    box-shadow: 0px 4px 10px rgba(0,0,0,0.12);
+}
+
+.calendar-container .day-card.today {
+    border: 3px solid #27AE60;
+    box-shadow: 0px 4px 15px rgba(39, 174, 96, 0.3);
+}
+
+.calendar-container .day-title {
+    font-weight: 700;
+    color: #1A3A5F;
+    font-size: 20px;
+    margin-bottom: 8px;
+    white-space: nowrap;
+}
+
+.calendar-container .date-text {
+    font-size: 15px;
+    color: #41566B;
+    margin-bottom: 12px;
+}
+
+.calendar-container .task-text {
+    color: #25323B;
+    font-size: 15px;
+    line-height: 1.35;
+    margin-bottom: 6px;
+    text-align: left;
+    position: relative;
+    cursor: pointer;
+}
+
+.calendar-container .task-text:hover .tooltip {
+    visibility: visible;
+    opacity: 1;
+}
+
+.calendar-container .task-text.done {
+    color: #8A99A6;
+    text-decoration: line-through;
+}
+
+.calendar-container .due-marker {
+    color: #E74C3C;
+    font-size: 15px;
+    font-weight: 700;
+    line-height: 1.35;
+    margin-bottom: 6px;
+    text-align: left;
+    position: relative;
+    cursor: pointer;
+}
+
+.calendar-container .due-marker:hover .tooltip {
+    visibility: visible;
+    opacity: 1;
+}
+
+.calendar-container .tooltip {
+    visibility: hidden;
+    opacity: 0;
+    background-color: #2C3E50;
+    color: white;
+    text-align: center;
+    padding: 8px 12px;
+    border-radius: 6px;
+    position: absolute;
+    z-index: 1;
+    bottom: 125%;
+    left: 50%;
+    transform: translateX(-50%);
+    white-space: nowrap;
+    transition: opacity 0.3s;
+    font-size: 13px;
+}
+
+.calendar-container .tooltip::after {
+    content: "";
+    position: absolute;
+    top: 100%;
+    left: 50%;
+    margin-left: -5px;
+    border-width: 5px;
+    border-style: solid;
+    border-color: #2C3E50 transparent transparent transparent;
+}
+</style>
+"""
+
+DAY_CARD = Template(
+    '<div class="day-card $today_class">'
+    '<div class="day-title">$weekday</div>'
+    '<div class="date-text">$date_text</div>'
+    '$body'
+    '</div>'
+)
+
+TASK_ITEM = Template(
+    "<div class='task-text$done_class'>"
+    "• <b>$course_code</b><br>"
+    "$title ($hours)"
+    "<span class='tooltip'>$tooltip</span>"
+    "</div>"
+)
+
+DUE_ITEM = Template(
+    "<div class='due-marker'>"
+    "📌 <b>$course_code</b><br>"
+    "$title DUE"
+    "<span class='tooltip'>$tooltip</span>"
+    "</div>"
+)
+
+EMPTY_DAY = "<div class='task-text'>No tasks.</div>"
+
+WEEK_OPEN = '<div class="calendar-container"><div class="card-container">'
+WEEK_CLOSE = "</div></div>"
+
+
+def format_hours(hours: float) -> str:
+    if hours == 0:
+        return "0 min"
+    whole_hours = int(hours)
+    minutes = int((hours - whole_hours) * 60)
+    parts = []
+    if whole_hours == 1:
+        parts.append("1 hour")
+    elif whole_hours > 1:
+        parts.append(f"{whole_hours} hours")
+    if minutes == 30:
+        parts.append("30 min")
+    elif minutes > 0:
+        parts.append(f"{minutes} min")
+    return " and ".join(parts) if parts else "0 min"
+
+
+def task_id(task: Dict[str, Any]) -> str:
+    # completions are keyed by the stable assessment id; schedules generated
+    # before ids existed fall back to "course-title"
+    assessment_id = task.get("assessment_id")
+    if isinstance(assessment_id, str) and assessment_id:
+        return assessment_id
+    return legacy_task_id(task)
+
+
+def legacy_task_id(task: Dict[str, Any]) -> str:
+    return f"{task['course_code']}-{task['title']}"
+
+
+def is_completed(task: Dict[str, Any], done_ids: Iterable[str]) -> bool:
+    return task_id(task) in done_ids or legacy_task_id(task) in done_ids
+
+
+@lru_cache(maxsize=4096)
+def _task_tooltip(due_date: str, day_date: date) -> str:
+    if not due_date:
+        return "No due date"
+    due = parse_due_date(due_date)
+    if due is None:
+        return f"Due: {due_date}"
+    days_until = (due.date() - day_date).days
+    if "T" in due_date:
+        return f"Due: {due.strftime('%B %d, %Y at %I:%M %p')} ({days_until} days)"
+    return f"Due: {due.strftime('%B %d, %Y')} ({days_until} days)"
+
+
+@lru_cache(maxsize=4096)
+def _due_tooltip(due_date_str: str) -> str:
+    if "T" in due_date_str:
+        due_dt = parse_due_date(due_date_str)
+        if due_dt is not None:
+            return f"Due at {due_dt.strftime('%I:%M %p')}"
+    return "Due today"
+
+
+def render_week(
+    week: Dict[str, Dict[str, Any]],
+    week_start: date,
+    today: date,
+    completions: Dict[str, Iterable[str]] = None,
+) -> str:
+    completions = completions or {}
+    cards = [WEEK_OPEN]
+
+    for offset in range(7):
+        day_date = week_start + timedelta(days=offset)
+        day_str = day_date.strftime("%Y-%m-%d")
+        done_ids = completions.get(day_str, ())
+
+        body = []
+        for task in week["tasks"].get(day_str, []):
+            body.append(TASK_ITEM.substitute(
+                done_class=" done" if is_completed(task, done_ids) else "",
+                course_code=html.escape(str(task["course_code"])),
+                title=html.escape(str(task["title"])),
+                hours=format_hours(task["hours"]),
+                tooltip=html.escape(_task_tooltip(task.get("due_date") or "", day_date)),
+            ))
+
+        for due_item in week["due"].get(day_str, []):
+            body.append(DUE_ITEM.substitute(
+                course_code=html.escape(str(due_item["course_code"])),
+                title=html.escape(str(due_item.get("title", due_item["type"]))),
+                tooltip=html.escape(_due_tooltip(due_item["due_date_str"])),
+            ))
+
+        cards.append(DAY_CARD.substitute(
+            today_class="today" if day_date == today else "",
+            weekday=day_date.strftime("%A"),
+            date_text=day_date.strftime("%b %d"),
+            body="".join(body) or EMPTY_DAY,
+        ))
+
+    cards.append(WEEK_CLOSE)
+    return "".join(cards)
+
+
+class RenderCache:
+
+    # small LRU of rendered week HTML keyed by
+    # (schedule version, week start, completions version, today)
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+
+    def get(self, key: Tuple[Any, ...]):
+        html_text = self._entries.get(key)
+        if html_text is not None:
+            self._entries.move_to_end(key)
+        return html_text
+
+    def put(self, key: Tuple[Any, ...], html_text: str) -> str:
+        self._entries[key] = html_text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return html_text
@@ -0,0 +1,186 @@
+import heapq
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Capacity exceptions
+#
+# settings["capacity_exceptions"] overrides the weekly daily_hours on
+# particular dates. Each entry is a dict:
+#
+#   {"label": "Reading week", "start": "2025-10-13", "end": "2025-10-17", "hours": 0}
+#   {"label": "Shifts", "weekday": "friday", "start": "2025-09-05", "hours": 1, "every": 2}
+#
+# Without "weekday" the entry covers every date from start to end (end
+# defaults to start). With "weekday" it is a recurring rule: that weekday in
+# the range, every `every` weeks counted from the first occurrence; a missing
+# start/end leaves the rule open on that side. An open start counts the weeks
+# from a fixed anchor (the semester start), not from the horizon, so a plan
+# and a later roll-forward agree on which weeks an "every 2" rule falls on.
+# "hours" replaces the day's capacity. When entries overlap, the later one in
+# the list wins.
+#
+# compile_exceptions() turns the list into sorted, disjoint
+# (first_ordinal, last_ordinal, hours) intervals, so building a calendar is a
+# single merge walk over the days and looking up one date is a bisect.
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+Interval = Tuple[int, int, float]
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    try:
+        # fromisoformat is C, strptime dominates compile time otherwise
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def validate_exception(entry: Dict[str, Any]) -> Optional[str]:
+    # the problem with an entry, or None if it can be compiled
+    if not isinstance(entry, dict):
+        return "not a mapping"
+    weekday = str(entry.get("weekday") or "").strip().lower()
+    if weekday and weekday not in DAY_NAMES:
+        return f"unknown weekday {entry['weekday']!r}"
+    for key in ("start", "end"):
+        if entry.get(key) and _parse_date(entry[key]) is None:
+            return f"{key} is not a YYYY-MM-DD date"
+    if not weekday and _parse_date(entry.get("start")) is None:
+        return "a date range needs a start"
+    start, end = _parse_date(entry.get("start")), _parse_date(entry.get("end"))
+    if start and end and end < start:
+        return "end is before start"
+    try:
+        hours = float(entry.get("hours", 0) or 0)
+        every = int(entry.get("every", 1) or 1)
+    except (TypeError, ValueError):
+        return "hours and every must be numbers"
+    if not 0 <= hours <= 24:
+        return "hours must be between 0 and 24"
+    if every < 1:
+        return "every must be at least 1"
+    return None
+
+
+def _expand(entry: Dict[str, Any], horizon: Tuple[int, int], anchor: int) -> Iterator[Interval]:
+    hours = float(entry.get("hours", 0) or 0)
+    start = _parse_date(entry.get("start"))
+    end = _parse_date(entry.get("end"))
+    weekday = str(entry.get("weekday") or "").strip().lower()
+
+    if not weekday:
+        first, last = start.toordinal(), (end or start).toordinal()
+        first, last = max(first, horizon[0]), min(last, horizon[1])
+        if first <= last:
+            yield first, last, hours
+        return
+
+    # recurring rules only materialize inside the horizon
+    target = DAY_NAMES.index(weekday)
+    first = start.toordinal() if start else anchor
+    last = min(end.toordinal() if end else horizon[1], horizon[1])
+    first += (target - date.fromordinal(first).weekday()) % 7
+    step = 7 * int(entry.get("every", 1) or 1)
+    if not start and first > horizon[0]:
+        # open start: the rule also ran before the anchor
+        first -= (first - horizon[0]) // step * step
+    if first < horizon[0]:
+        first += -(-(horizon[0] - first) // step) * step
+    for day in range(first, last + 1, step):
+        yield day, day, hours
+
+
+def compile_exceptions(
+    exceptions: List[Dict[str, Any]],
+    horizon_start: date,
+    horizon_end: date,
+    anchor: Optional[date] = None,
+) -> List[Interval]:
+    # sweep over interval boundaries with a max-heap of active entries by
+    # list position, so the latest entry wins on overlap; invalid entries
+    # are skipped (the Settings page reports them)
+    horizon = (horizon_start.toordinal(), horizon_end.toordinal())
+    anchor_ordinal = (anchor or horizon_start).toordinal()
+    events = []
+    for priority, entry in enumerate(exceptions or []):
+        if validate_exception(entry) is not None:
+            continue
+        for first, last, hours in _expand(entry, horizon, anchor_ordinal):
+            events.append((first, last, priority, hours))
+    if not events:
+        return []
+
+    events.sort()
+    boundaries = sorted({e[0] for e in events} | {e[1] + 1 for e in events})
+
+    intervals: List[Interval] = []
+    active: List[Tuple[int, int, float]] = []   # (-priority, last, hours)
+    i = 0
+    for left, right in zip(boundaries, boundaries[1:]):
+        while i < len(events) and events[i][0] == left:
+            first, last, priority, hours = events[i]
+            heapq.heappush(active, (-priority, last, hours))
+            i += 1
+        while active and active[0][1] < left:
+            heapq.heappop(active)
+        if not active:
+            continue
+        hours = active[0][2]
+        if intervals and intervals[-1][1] == left - 1 and intervals[-1][2] == hours:
+            intervals[-1] = (intervals[-1][0], right - 1, hours)
+        else:
+            intervals.append((left, right - 1, hours))
+    return intervals
+
+
+class CapacityCalendar:
+
+    # weekly daily_hours plus compiled exception intervals over a horizon
+
+    def __init__(
+        self,
+        daily_hours: Dict[str, float],
+        exceptions: List[Dict[str, Any]] = None,
+        horizon_start: date = None,
+        horizon_end: date = None,
+        anchor: date = None,
+    ):
+        self.weekly = [float((daily_hours or {}).get(name, 0.0)) for name in DAY_NAMES]
+        self.intervals = (
+            compile_exceptions(exceptions, horizon_start, horizon_end, anchor)
+            if exceptions and horizon_start and horizon_end else []
+        )
+        self._starts = [first for first, _, _ in self.intervals]
+
+    def capacity(self, day: date) -> float:
+        ordinal = day.toordinal()
+        i = bisect_right(self._starts, ordinal) - 1
+        if i >= 0 and self.intervals[i][1] >= ordinal:
+            return self.intervals[i][2]
+        return self.weekly[day.weekday()]
+
+    def capacities(self, start: date, end: date) -> List[float]:
+        # capacity for every date from start to end, one merge walk
+        first, last = start.toordinal(), end.toordinal()
+        out = [self.weekly[(start.weekday() + n) % 7] for n in range(last - first + 1)]
+        i = max(bisect_right(self._starts, first) - 1, 0)
+        for lo, hi, hours in self.intervals[i:]:
+            if lo > last:
+                break
+            lo, hi = max(lo, first), min(hi, last)
+            if lo <= hi:
+                out[lo - first:hi - first + 1] = [hours] * (hi - lo + 1)
+        return out
+
+    def overrides(self) -> Iterator[Tuple[date, date, float]]:
+        for first, last, hours in self.intervals:
+            yield date.fromordinal(first), date.fromordinal(last), hours
@@ -0,0 +1,257 @@
+import copy
+import hashlib
+import re
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.assessment_store import new_assessment_id
+from utils.tracing import span
+
+
+# Shared course catalog
+#
+# Students in the same section upload the same syllabus, so each parsed course
+# is stored once in the course_catalog table and shared:
+#
+#   content_hash  sha256 of the normalized syllabus text plus semester dates
+#   course_code   normalized code ("CP317"), for lookups by course and term
+#   term          "2025-fall", derived from the semester start
+#   semester_start, semester_end
+#                 the dates the parse resolved relative dates against
+#   course_json   the canonical parse, with assessment ids already assigned
+#
+# A user's courses_json then only holds a reference plus their own edits:
+#
+#   {"CP317": {"catalog_ref": {"hash": ..., "course_code": "CP317", "term": ...},
+#              "overrides": {"course_info": {...}, "breakdown": {...}}}}
+#
+# encode_courses/decode_courses convert between that and the full course
+# dicts the pages work with (same idea as utils/schedule_codec.py). Courses
+# without a catalog_ref are stored in full, and old documents load as-is. If
+# the catalog entry can't be read, the stored entry is kept untouched (and
+# saved back as it was) with catalog_error set, instead of a course made of
+# the overrides alone.
+
+CODE_PATTERN = re.compile(r"\b([A-Z]{2,4})[\s-]?(\d{3,4}[A-Z]?)\b")
+CATALOG_ERROR = "catalog_error"
+
+OTHER_COURSE = re.compile(r"requisite|prereq|exclusion|cross[\s-]?list|formerly|replaces", re.I)
+
+
+def text_hash(text: str, semester_start: str = "", semester_end: str = "") -> str:
+    # the parse resolves relative dates against the semester, so it is part of the key
+    normalized = " ".join((text or "").lower().split())
+    return hashlib.sha256(f"{semester_start}|{semester_end}|{normalized}".encode("utf-8")).hexdigest()
+
+
+def term_for(semester_start: str) -> str:
+    try:
+        start = datetime.strptime(semester_start, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return str(semester_start or "")
+    season = "winter" if start.month <= 4 else "summer" if start.month <= 8 else "fall"
+    return f"{start.year}-{season}"
+
+
+def normalize_code(code: Any) -> str:
+    return re.sub(r"[\s-]+", "", str(code or "")).upper()
+
+
+def declared_course_code(text: str, title_lines: int = 2) -> Optional[str]:
+    # the code on the syllabus's title line; codes further down are usually
+    # prerequisites or cross-listings, so anything less certain gives None
+    lines = [line for line in (text or "").splitlines() if line.strip()][:title_lines]
+    for line in lines:
+        codes = {a + b for a, b in CODE_PATTERN.findall(line)}
+        if codes and OTHER_COURSE.search(line):
+            return None
+        if codes:
+            return codes.pop() if len(codes) == 1 else None
+    return None
+
+
+def assign_ids(course: Dict[str, Any]) -> Dict[str, Any]:
+    # catalog entries carry assessment ids, so every user shares them
+    for a in course.get("assessments", {}).get("breakdown", []):
+        if not (isinstance(a.get("id"), str) and a["id"]):
+            a["id"] = new_assessment_id()
+    return course
+
+
+def with_ref(base: Dict[str, Any], ref: Dict[str, Any]) -> Dict[str, Any]:
+    course = copy.deepcopy(base)
+    course["catalog_ref"] = dict(ref)
+    return course
+
+
+# Overrides
+
+def _breakdown_diff(base: List[Dict[str, Any]], items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    base_by_id = {a.get("id"): a for a in base}
+    ids = [a.get("id") for a in items]
+    present = set(ids)
+
+    changed, added = {}, []
+    for a in items:
+        b = base_by_id.get(a.get("id"))
+        if b is None:
+            added.append(a)
+            continue
+        delta = {k: v for k, v in a.items() if b.get(k) != v}
+        if delta:
+            changed[a["id"]] = delta
+
+    removed = [i for i in base_by_id if i not in present]
+    diff = {}
+    if changed:
+        diff["changed"] = changed
+    if added:
+        diff["added"] = added
+    if removed:
+        diff["removed"] = removed
+
+    # only store the order when it isn't base order followed by additions
+    default_order = [i for i in base_by_id if i in present] + [a.get("id") for a in added]
+    if ids != default_order:
+        diff["order"] = ids
+    return diff
+
+
+def _apply_breakdown(base: List[Dict[str, Any]], diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+    changed = diff.get("changed", {})
+    removed = set(diff.get("removed", []))
+
+    items = [dict(a, **changed.get(a.get("id"), {})) for a in base if a.get("id") not in removed]
+    items += [dict(a) for a in diff.get("added", [])]
+
+    if "order" in diff:
+        position = {i: n for n, i in enumerate(diff["order"])}
+        items.sort(key=lambda a: position.get(a.get("id"), len(position)))
+    return items
+
+
+def course_overrides(base: Dict[str, Any], course: Dict[str, Any]) -> Dict[str, Any]:
+    # two-level diff of course against its catalog entry; breakdown is diffed by id
+    overrides = {}
+    for key, value in course.items():
+        if key == "catalog_ref" or base.get(key) == value:
+            continue
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            section = {k: v for k, v in value.items() if base[key].get(k) != v and k != "breakdown"}
+            if section:
+                overrides[key] = section
+            if key == "assessments" and value.get("breakdown") != base[key].get("breakdown"):
+                overrides["breakdown"] = _breakdown_diff(base[key].get("breakdown", []), value.get("breakdown", []))
+        else:
+            overrides[key] = value
+    return overrides
+
+
+def apply_overrides(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    course = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if key == "breakdown":
+            assessments = course.setdefault("assessments", {})
+            assessments["breakdown"] = _apply_breakdown(assessments.get("breakdown", []), value)
+        elif isinstance(value, dict) and isinstance(course.get(key), dict):
+            course[key].update(copy.deepcopy(value))
+        else:
+            course[key] = copy.deepcopy(value)
+    return course
+
+
+# Stored documents
+
+def encode_courses(
+    courses: Dict[str, Any],
+    get_base: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    doc = {}
+    for code, course in (courses or {}).items():
+        if isinstance(course, dict) and CATALOG_ERROR in course:
+            doc[code] = course["stored"]
+            continue
+        ref = course.get("catalog_ref") if isinstance(course, dict) else None
+        base = get_base(ref) if ref else None
+        if base is None:
+            doc[code] = course
+            continue
+        doc[code] = {"catalog_ref": ref, "overrides": course_overrides(base, course)}
+    return doc
+
+
+def decode_courses(
+    doc: Dict[str, Any],
+    get_base: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    courses = {}
+    for code, entry in (doc or {}).items():
+        if not (isinstance(entry, dict) and "catalog_ref" in entry and "overrides" in entry):
+            courses[code] = entry
+            continue
+        base = get_base(entry["catalog_ref"])
+        if base is None:
+            courses[code] = {
+                CATALOG_ERROR: f"catalog entry {str(entry['catalog_ref'].get('hash'))[:12]} not found",
+                "catalog_ref": entry["catalog_ref"],
+                "stored": entry,
+            }
+            continue
+        course = apply_overrides(base, entry["overrides"])
+        course["catalog_ref"] = entry["catalog_ref"]
+        courses[code] = course
+    return courses
+
+
+# Upload
+
+# one lock per syllabus being resolved, so simultaneous uploads of the same
+# file in this process wait for a single parse instead of each calling the LLM
+_INFLIGHT: Dict[str, threading.Lock] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def resolve_syllabus(scraper, text: str, semester_start: str, semester_end: str) -> Dict[str, Any]:
+    # catalog first (by content hash, then by course code and term), the LLM only on a miss
+    content_hash = text_hash(text, semester_start, semester_end)
+
+    with _INFLIGHT_LOCK:
+        lock = _INFLIGHT.setdefault(content_hash, threading.Lock())
+    try:
+        with lock:
+            return _resolve(scraper, text, content_hash, semester_start, semester_end)
+    finally:
+        with _INFLIGHT_LOCK:
+            if not lock.locked():
+                _INFLIGHT.pop(content_hash, None)
+
+
+def _resolve(scraper, text, content_hash, semester_start, semester_end):
+    from sb_functions import get_catalog_course, find_catalog_courses, save_catalog_course
+
+    term = term_for(semester_start)
+
+    with span("catalog.resolve", term=term) as attrs:
+        base = get_catalog_course(content_hash)
+        if base is not None:
+            attrs["hit"] = "hash"
+            code = normalize_code(base.get("course_info", {}).get("course_code"))
+            return with_ref(base, {"hash": content_hash, "course_code": code, "term": term})
+
+        code = declared_course_code(text)
+        matches = find_catalog_courses(code, term, semester_start, semester_end) if code else []
+        if len(matches) == 1:
+            matched_hash, base = matches[0]
+            # only an entry parsed for the same semester dates and declaring
+            # the same code stands in for this syllabus; the reference points
+            # at that entry, nothing is stored under this hash
+            if normalize_code(base.get("course_info", {}).get("course_code")) == code:
+                attrs["hit"] = "course"
+                return with_ref(base, {"hash": matched_hash, "course_code": code, "term": term})
+
+        attrs["hit"] = None
+        course = assign_ids(scraper.parse_syllabus(text, semester_start, semester_end))
+        code = normalize_code(course.get("course_info", {}).get("course_code"))
+        save_catalog_course(content_hash, code, term, course, semester_start, semester_end)
+        return with_ref(course, {"hash": content_hash, "course_code": code, "term": term})
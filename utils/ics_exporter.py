@@ -1,21 +1,37 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, date, time, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator
 
+from utils.tracing import span
 
-def schedule_to_ics(schedule: Dict[str, Any],
-                    courses: Dict[str, Any] = None,
-                    calendar_name: str = "Study Schedule") -> str:
 
-    days: List[Dict[str, Any]] = schedule.get("days", [])
+def _parse_due(due_date_str: str) -> datetime:
+    # Parse due date (with or without time)
+    if "T" in due_date_str:
+        # Has time: "2025-11-25T23:59:00"
+        return datetime.strptime(due_date_str, "%Y-%m-%dT%H:%M:%S")
+    # Date only: "2025-11-25" - default to 11:59 PM
+    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
+    return datetime.combine(due_date.date(), time(23, 59, 0))
 
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//SyllabusPlanner//EN",
-        f"X-WR-CALNAME:{calendar_name}",
-    ]
 
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+def assessment_key(course_code: str, label: str, stable_id: Any = None, disambiguator: Any = None) -> str:
+    # stable per-assessment key used in event UIDs, so regenerating a plan
+    # updates events in place instead of creating new ones. Without a stable
+    # id, the disambiguator (due date and position) keeps two untitled items
+    # of one type apart
+    if isinstance(stable_id, str) and stable_id:
+        return stable_id
+    raw = f"{course_code or ''}|{(label or '').strip().lower()}|{'' if disambiguator is None else disambiguator}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_events(schedule: Dict[str, Any],
+                courses: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+
+    days: List[Dict[str, Any]] = schedule.get("days", [])
 
     # Process study session events
     for day in days:
@@ -40,21 +56,19 @@ def schedule_to_ics(schedule: Dict[str, Any],
             ]
             description = "\\n".join(description_parts)
 
-            uid = (
-                f"{day['date']}-{course_code}-"
-                f"{t.get('assessment_id', 0)}-{minutes}@syllabusplanner"
+            # non-string assessment ids are the item's position in the plan
+            key = assessment_key(
+                course_code, title, t.get("assessment_id"),
+                f"{t.get('due_date')}|{t.get('assessment_id')}",
             )
 
-            lines.extend([
-                "BEGIN:VEVENT",
-                f"UID:{uid}",
-                f"DTSTAMP:{now_utc}",
-                f"DTSTART:{dt_start.strftime('%Y%m%dT%H%M%S')}",
-                f"DTEND:{dt_end.strftime('%Y%m%dT%H%M%S')}",
-                f"SUMMARY:{summary}",
-                f"DESCRIPTION:{description}",
-                "END:VEVENT",
-            ])
+            yield {
+                "uid": f"study-{key}-{day['date']}@syllabusplanner",
+                "start": dt_start,
+                "end": dt_end,
+                "summary": summary,
+                "description": description,
+            }
 
             current_start = dt_end
 
@@ -62,53 +76,239 @@ def schedule_to_ics(schedule: Dict[str, Any],
     if courses:
         for course_code, course_data in courses.items():
             assessments = course_data.get("assessments", {}).get("breakdown", [])
-            
-            for assessment in assessments:
+
+            for position, assessment in enumerate(assessments):
                 due_date_str = assessment.get("due_date")
                 if not due_date_str:
                     continue
-                
-                # Parse due date (with or without time)
-                if "T" in due_date_str:
-                    # Has time: "2025-11-25T23:59:00"
-                    due_dt = datetime.strptime(due_date_str, "%Y-%m-%dT%H:%M:%S")
-                else:
-                    # Date only: "2025-11-25" - default to 11:59 PM
-                    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-                    due_dt = datetime.combine(due_date.date(), time(23, 59, 0))
-                
+
                 # Create due date event (1 minute duration)
-                dt_start = due_dt
-                dt_end = due_dt + timedelta(minutes=1)
-                
+                due_dt = _parse_due(due_date_str)
+
                 assessment_type = assessment.get("type", "Assessment")
                 summary = f"DUE: {course_code} – {assessment_type}"
-                
+
                 description_parts = [
                     f"Course: {course_data.get('course_info', {}).get('course_name', '')}",
                     f"Type: {assessment_type}",
                     f"Weight: {assessment.get('weight', 0)}%",
                 ]
-                
+
                 notes = assessment.get("notes")
                 if notes:
                     description_parts.append(f"Notes: {notes}")
-                
+
                 description = "\\n".join(description_parts)
-                
-                uid = f"due-{course_code}-{assessment_type}-{due_date_str}@syllabusplanner"
-                
-                lines.extend([
-                    "BEGIN:VEVENT",
-                    f"UID:{uid}",
-                    f"DTSTAMP:{now_utc}",
-                    f"DTSTART:{dt_start.strftime('%Y%m%dT%H%M%S')}",
-                    f"DTEND:{dt_end.strftime('%Y%m%dT%H%M%S')}",
-                    f"SUMMARY:{summary}",
-                    f"DESCRIPTION:{description}",
-                    "END:VEVENT",
-                ])
-
-    lines.append("END:VCALENDAR")
-
-    return "\r\n".join(lines)
\ No newline at end of file
+
+                key = assessment_key(
+                    course_code,
+                    assessment.get("title") or assessment_type,
+                    assessment.get("id"),
+                    f"{due_date_str}|{position}",
+                )
+
+                yield {
+                    "uid": f"due-{key}@syllabusplanner",
+                    "start": due_dt,
+                    "end": due_dt + timedelta(minutes=1),
+                    "summary": summary,
+                    "description": description,
+                }
+
+
+def _event_chunk(event: Dict[str, Any], now_utc: str, sequence: int = 0,
+                 cancelled: bool = False) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event['uid']}",
+        f"SEQUENCE:{sequence}",
+        f"DTSTAMP:{now_utc}",
+        f"DTSTART:{event['start'].strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND:{event['end'].strftime('%Y%m%dT%H%M%S')}",
+        f"SUMMARY:{event['summary']}",
+        f"DESCRIPTION:{event['description']}",
+    ]
+    if cancelled:
+        lines.append("STATUS:CANCELLED")
+    lines.append("END:VEVENT")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def _calendar_header(calendar_name: str) -> str:
+    return "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//SyllabusPlanner//EN",
+        f"X-WR-CALNAME:{calendar_name}",
+    ]) + "\r\n"
+
+
+def iter_ics(schedule: Dict[str, Any],
+             courses: Dict[str, Any] = None,
+             calendar_name: str = "Study Schedule") -> Iterator[str]:
+
+    # yields the calendar one event at a time so callers can stream it
+
+    yield _calendar_header(calendar_name)
+
+    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    sequences = schedule.get("ics_sequences") or {}
+
+    for event in iter_events(schedule, courses):
+        yield _event_chunk(event, now_utc, sequences.get(event["uid"], 0))
+
+    yield "END:VCALENDAR"
+
+
+def schedule_to_ics(schedule: Dict[str, Any],
+                    courses: Dict[str, Any] = None,
+                    calendar_name: str = "Study Schedule") -> str:
+    with span("ics.schedule_to_ics") as attrs:
+        text = "".join(iter_ics(schedule, courses, calendar_name))
+        attrs["bytes"] = len(text)
+        return text
+
+
+# Memoized export, keyed by a hash of the schedule and courses
+# (see utils.calendar_index.schedule_hash). Shared across sessions and safe to
+# call from the download button's worker thread.
+
+_ICS_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_ICS_CACHE_SIZE = 64
+_ICS_LOCK = threading.Lock()
+
+
+def cached_ics_bytes(key: str,
+                     schedule: Dict[str, Any],
+                     courses: Dict[str, Any] = None,
+                     calendar_name: str = "Study Schedule") -> bytes:
+    cache_key = f"{key}:{calendar_name}"
+    with _ICS_LOCK:
+        data = _ICS_CACHE.get(cache_key)
+        if data is not None:
+            _ICS_CACHE.move_to_end(cache_key)
+            return data
+
+    with span("ics.build", bytes=0) as attrs:
+        data = b"".join(chunk.encode("utf-8") for chunk in iter_ics(schedule, courses, calendar_name))
+        attrs["bytes"] = len(data)
+
+    with _ICS_LOCK:
+        _ICS_CACHE[cache_key] = data
+        while len(_ICS_CACHE) > _ICS_CACHE_SIZE:
+            _ICS_CACHE.popitem(last=False)
+    return data
+
+
+def filter_schedule(schedule: Dict[str, Any],
+                    courses: Dict[str, Any] = None,
+                    start: date = None,
+                    end: date = None,
+                    course: str = None) -> tuple:
+
+    # restrict a schedule (and its due-date events) to a date range and/or one course
+
+    start_str = start.strftime("%Y-%m-%d") if start else None
+    end_str = end.strftime("%Y-%m-%d") if end else None
+
+    def in_range(day_str):
+        day_str = day_str[:10]
+        if start_str and day_str < start_str:
+            return False
+        if end_str and day_str > end_str:
+            return False
+        return True
+
+    days = []
+    for day in schedule.get("days", []):
+        if not in_range(day["date"]):
+            continue
+        tasks = [t for t in day.get("tasks", []) if not course or t.get("course_code") == course]
+        if tasks:
+            days.append({**day, "tasks": tasks})
+
+    filtered_courses = {}
+    for course_code, course_data in (courses or {}).items():
+        if course and course_code != course:
+            continue
+        breakdown = [
+            a for a in course_data.get("assessments", {}).get("breakdown", [])
+            if a.get("due_date") and in_range(a["due_date"])
+        ]
+        filtered_courses[course_code] = {
+            **course_data,
+            "assessments": {**course_data.get("assessments", {}), "breakdown": breakdown},
+        }
+
+    return {**schedule, "days": days}, filtered_courses
+
+
+# Incremental export between two schedule versions
+#
+# Event UIDs are derived from the assessment, not from the block length, so a
+# regenerated plan keeps the same UIDs. ics_sequences (stored on the schedule)
+# records each UID's SEQUENCE, bumped whenever the event changes or is
+# cancelled, which is what lets clients apply an update in place.
+
+def _fingerprint(event: Dict[str, Any]) -> str:
+    raw = "|".join([
+        event["start"].isoformat(), event["end"].isoformat(),
+        event["summary"], event["description"],
+    ])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _events_by_uid(schedule: Dict[str, Any], courses: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+    return {e["uid"]: e for e in iter_events(schedule or {}, courses)}
+
+
+def next_sequences(old_schedule: Dict[str, Any], old_courses: Dict[str, Any],
+                   new_schedule: Dict[str, Any], new_courses: Dict[str, Any]) -> Dict[str, int]:
+    old_events = _events_by_uid(old_schedule, old_courses)
+    new_events = _events_by_uid(new_schedule, new_courses)
+    sequences = dict((old_schedule or {}).get("ics_sequences") or {})
+
+    for uid, event in new_events.items():
+        old = old_events.get(uid)
+        if old is None:
+            # keep the counter of a previously cancelled event so re-adding it wins
+            if uid in sequences:
+                sequences[uid] += 1
+        elif _fingerprint(old) != _fingerprint(event):
+            sequences[uid] = sequences.get(uid, 0) + 1
+
+    for uid in old_events.keys() - new_events.keys():
+        sequences[uid] = sequences.get(uid, 0) + 1
+
+    return {uid: seq for uid, seq in sequences.items() if seq}
+
+
+def iter_ics_diff(old_schedule: Dict[str, Any], old_courses: Dict[str, Any],
+                  new_schedule: Dict[str, Any], new_courses: Dict[str, Any],
+                  calendar_name: str = "Study Schedule") -> Iterator[str]:
+
+    # only the events added, changed or cancelled between the two versions;
+    # new_schedule must carry the sequences from next_sequences
+
+    old_events = _events_by_uid(old_schedule, old_courses)
+    new_events = _events_by_uid(new_schedule, new_courses)
+    sequences = new_schedule.get("ics_sequences") or {}
+    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+
+    yield _calendar_header(calendar_name)
+
+    for uid, event in new_events.items():
+        old = old_events.get(uid)
+        if old is None or _fingerprint(old) != _fingerprint(event):
+            yield _event_chunk(event, now_utc, sequences.get(uid, 0))
+
+    for uid in old_events.keys() - new_events.keys():
+        yield _event_chunk(old_events[uid], now_utc, sequences.get(uid, 0), cancelled=True)
+
+    yield "END:VCALENDAR"
+
+
+def ics_diff(old_schedule: Dict[str, Any], old_courses: Dict[str, Any],
+             new_schedule: Dict[str, Any], new_courses: Dict[str, Any],
+             calendar_name: str = "Study Schedule") -> str:
+    return "".join(iter_ics_diff(old_schedule, old_courses, new_schedule, new_courses, calendar_name))
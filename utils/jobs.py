@@ -0,0 +1,115 @@
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from schedule import ScheduleOptimizer, GenerationCancelled
+from utils.ics_exporter import next_sequences
+
+
+# Background schedule generation
+#
+# "Generate Study Plan" submits a ScheduleJob to a shared thread pool instead
+# of running the optimizer inside the click handler. The job reports progress,
+# can be cancelled, and persists its result itself, so the plan is saved even
+# if the user navigates away; whichever page runs next adopts it into the
+# session with adopt_schedule_job.
+#
+# The courses the current plan was built with are kept in the session
+# (schedule_courses), so the next job compares the new events against the old
+# ones as they were: an edited due date, type or weight gets a new SEQUENCE
+# and shows up in the changes download.
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="schedule-job")
+
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class ScheduleJob:
+
+    def __init__(
+        self,
+        optimizer_args: Dict[str, Any],
+        assessments: List[Dict[str, Any]],
+        courses: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+        previous_courses: Optional[Dict[str, Any]] = None,
+        persist: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.optimizer_args = optimizer_args
+        # snapshot inputs so later edits in the session don't race the worker
+        self.assessments = copy.deepcopy(assessments)
+        self.courses = copy.deepcopy(courses)
+        self.previous = previous or {}
+        self.previous_courses = (
+            copy.deepcopy(previous_courses) if previous_courses is not None else self.courses
+        )
+        self.persist = persist
+
+        self.status = RUNNING
+        self.done = 0
+        self.total = len(assessments)
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.adopted = False
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def running(self) -> bool:
+        return self.status == RUNNING
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def _on_progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+    def run(self) -> None:
+        try:
+            optimizer = ScheduleOptimizer(**self.optimizer_args)
+            schedule = optimizer.generate_raw_schedule(
+                self.assessments, progress=self._on_progress, cancel=self._cancel
+            )
+
+            if self.previous.get("days"):
+                schedule["ics_sequences"] = next_sequences(
+                    self.previous, self.previous_courses, schedule, self.courses
+                )
+
+            if self.persist is not None:
+                self.persist(schedule)
+
+            self.result = schedule
+            self.status = DONE
+        except GenerationCancelled:
+            self.status = CANCELLED
+        except Exception as e:
+            self.error = e
+            self.status = FAILED
+
+
+def submit_schedule_job(*args, **kwargs) -> ScheduleJob:
+    job = ScheduleJob(*args, **kwargs)
+    _EXECUTOR.submit(job.run)
+    return job
+
+
+def adopt_schedule_job(session_state) -> Optional[ScheduleJob]:
+    # move a finished job's schedule into the session (once) and return the job
+    job = session_state.get("schedule_job")
+    if job is None or job.status != DONE or job.adopted:
+        return job
+
+    if job.previous.get("days"):
+        session_state["previous_plan"] = (job.previous, job.previous_courses)
+    session_state["schedule"] = job.result
+    session_state["schedule_courses"] = job.courses
+    job.adopted = True
+    return job
@@ -1,35 +1,95 @@
 #helper to normalize assessment types for cleaner display
 
-def normalize_type(t: str) -> str:
-    t = (t or "").strip().lower()
-
-    if "assignment" in t:
-        return "assignment"
-    if "quiz" in t:
-        return "quiz"
-    if "mid" in t and "term" in t:
-        return "midterm"
-    if "final" in t:
-        return "final"
-    if "exam" in t:
-        return "exam"
-    if "project" in t:
-        return "project"
-    if "present" in t:
-        return "presentation"
-    if "lab" in t:
-        return "lab"
-    if "report" in t:
-        return "report"
-    if "case" in t:
-        return "case_study"
-    if "discussion" in t:
-        return "discussion"
-    if "read" in t:
-        return "reading"
-    if "homework" in t or "hw" in t:
-        return "homework"
-    if "essay" in t:
-        return "essay"
-
-    return t 
\ No newline at end of file
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+# keyword pattern -> canonical type
+#
+# Keywords must start a word, and the short ones must also end one, so
+# "collaboration" is not a lab and "showcase" is not a case study. All rules
+# are compiled into one alternation that is scanned once per string; when
+# several keywords occur, the rule listed first wins ("Reading Quiz" is a quiz,
+# "Reading Lab" a reading, "Lab Report" a lab).
+TYPE_SYNONYMS: Tuple[Tuple[str, str], ...] = (
+    (r"assignment", "assignment"),
+    (r"quiz", "quiz"),
+    (r"mid[\s-]*term", "midterm"),
+    (r"final", "final"),
+    (r"exam", "exam"),
+    (r"project", "project"),
+    (r"present", "presentation"),
+    (r"read(?:ing)?s?\b", "reading"),
+    (r"(?:pre-?)?labs?\b", "lab"),
+    (r"report", "report"),
+    (r"case(?:[\s-]*stud|s?\b)", "case_study"),
+    (r"discussion", "discussion"),
+    (r"homework|hw\d*\b", "homework"),
+    (r"essay", "essay"),
+)
+
+# first letter of every built-in keyword above
+_FIRST_LETTERS = "acdefhlmpqr"
+
+
+class TypeClassifier:
+
+    def __init__(self, synonyms: Dict[str, str] = None):
+        # user synonyms are plain phrases (matched at a word start) and take
+        # precedence over the built-ins
+        phrases = {k.strip().lower(): v for k, v in (synonyms or {}).items() if k.strip()}
+        user = tuple((re.escape(k), v) for k, v in phrases.items())
+        table = user + TYPE_SYNONYMS
+
+        self._types = [canonical for _, canonical in table]
+        alternation = "|".join(f"({pattern})" for pattern, _ in table)
+        # a keyword can only start with one of these letters, which lets the
+        # scan skip most word starts without trying every alternative
+        first = "".join(sorted(set(_FIRST_LETTERS).union(p[0] for p in phrases)))
+        self._pattern = re.compile(f"\\b(?=[{re.escape(first)}])(?:{alternation})")
+        self.classify = lru_cache(maxsize=4096)(self._classify)
+
+    def _classify(self, t: str) -> str:
+        t = (t if isinstance(t, str) else "").strip().lower()
+        # group n belongs to rule n - 1, so the lowest group seen wins
+        best = None
+        for match in self._pattern.finditer(t):
+            if best is None or match.lastindex < best:
+                best = match.lastindex
+        if best is None:
+            return t
+        return self._types[best - 1]
+
+    def __call__(self, t: str) -> str:
+        return self.classify(t)
+
+
+_DEFAULT = TypeClassifier()
+
+
+@lru_cache(maxsize=32)
+def _classifier_for(synonyms: Tuple[Tuple[str, str], ...]) -> TypeClassifier:
+    return TypeClassifier(dict(synonyms))
+
+
+def get_classifier(synonyms: Dict[str, str] = None) -> TypeClassifier:
+    if not synonyms:
+        return _DEFAULT
+    return _classifier_for(tuple(sorted(synonyms.items())))
+
+
+def normalize_type(t: str, synonyms: Dict[str, str] = None) -> str:
+    if not synonyms:
+        return _DEFAULT.classify(t)
+    return get_classifier(synonyms).classify(t)
+
+
+def normalize_types(values: Iterable[str], synonyms: Dict[str, str] = None):
+    # batch version: accepts a pandas Series (returns a Series) or any iterable (returns a list)
+    classify = get_classifier(synonyms).classify
+
+    if hasattr(values, "unique") and hasattr(values, "map"):
+        mapping = {v: classify(v) for v in values.unique()}
+        return values.map(mapping)
+
+    return [classify(v) for v in values]
@@ -0,0 +1,163 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.calendar_render import is_completed, task_id
+from utils.tracing import span
+
+
+# Roll-forward of unfinished study hours
+#
+# A task on a past day that was never ticked off in the Calendar page is
+# "missed". roll_forward() takes the missed hours per assessment off their
+# past days and allocates only those hours again, from today up to the due
+# date, around what is already planned. Hours that don't fit (due date passed,
+# no capacity left) become unscheduled hours in the assessment's allocation.
+#
+# schedule["rolled_through"] records the last day already processed, so a
+# second call on the same day only compares one date and returns. It only
+# moves when hours were actually rolled: with nothing missed the schedule is
+# returned as it is (and not saved), and the next call re-scans the same few
+# days, which is far cheaper than rewriting the whole document. The Calendar
+# page calls it on every load; nightly.py runs it over every user.
+
+ROLLED_THROUGH = "rolled_through"
+
+
+def missed_tasks(
+    schedule: Dict[str, Any],
+    completions: Dict[str, Any],
+    today: date,
+) -> Tuple[Dict[Any, Dict[str, Any]], List[Dict[str, Any]]]:
+    # missed hours per assessment since the last roll-forward, plus the past
+    # days with their missed tasks taken out
+    rolled_through = schedule.get(ROLLED_THROUGH) or ""
+    today_str = today.strftime("%Y-%m-%d")
+
+    missed: Dict[Any, Dict[str, Any]] = {}
+    days = []
+    for day in schedule.get("days", []):
+        day_str = day["date"]
+        if not (rolled_through < day_str < today_str):
+            days.append(day)
+            continue
+
+        done_ids = (completions or {}).get(day_str, ())
+        kept = []
+        for task in day.get("tasks", []):
+            if is_completed(task, done_ids):
+                kept.append(task)
+                continue
+            entry = missed.setdefault(task_id(task), dict(task, hours=0.0))
+            entry["hours"] += float(task.get("hours", 0.0))
+
+        if len(kept) == len(day.get("tasks", [])):
+            days.append(day)
+        elif kept:
+            days.append(dict(day, tasks=kept, scheduled_hours=sum(t["hours"] for t in kept)))
+    return missed, days
+
+
+def _merge_tasks(tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # one task per assessment per day (checkbox keys and ics UIDs rely on it)
+    merged: Dict[str, Dict[str, Any]] = {}
+    for task in tasks:
+        key = task_id(task)
+        if key in merged:
+            merged[key] = dict(merged[key], hours=merged[key]["hours"] + task["hours"])
+        else:
+            merged[key] = task
+    return list(merged.values())
+
+
+def roll_forward(
+    schedule: Dict[str, Any],
+    completions: Dict[str, Any],
+    settings: Dict[str, Any],
+    today: Optional[date] = None,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    # (schedule, report); the schedule is returned unchanged (same object)
+    # when no hours were missed since the last roll-forward
+    from schedule import ScheduleOptimizer
+    from utils.ics_exporter import next_sequences
+
+    today = today or date.today()
+    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    report = {"missed": 0.0, "placed": 0.0, "unplaced": 0.0, "assessments": 0}
+
+    if not schedule or not schedule.get("days") or (schedule.get(ROLLED_THROUGH) or "") >= yesterday:
+        return schedule, report
+
+    with span("rollforward", today=str(today)) as attrs:
+        missed, days = missed_tasks(schedule, completions, today)
+        if not missed:
+            return schedule, report
+
+        # future days are rebuilt from the optimizer's slots, which start as
+        # the existing plan; past days are kept as they are
+        today_str = today.strftime("%Y-%m-%d")
+        last_day = max(schedule["days"][-1]["date"], settings.get("semester_end") or "")
+        optimizer = ScheduleOptimizer(
+            max(today_str, settings.get("semester_start") or today_str),
+            last_day,
+            settings.get("daily_hours", {}),
+            {},
+            settings.get("capacity_exceptions"),
+            capacity_anchor=settings.get("semester_start"),
+        )
+        optimizer.preload([d for d in days if d["date"] >= today_str])
+
+        today_done = (completions or {}).get(today_str, ())
+        placed: Dict[Any, float] = {}
+        for key, task in missed.items():
+            # a chunk already ticked off today isn't reopened
+            start = today + timedelta(days=1) if is_completed(task, today_done) else today
+            summary = optimizer._allocate_assessment(
+                {"type": task.get("type"), "due_date": task.get("due_date"), "hours_required": task["hours"],
+                 "course_code": task.get("course_code"), "title": task.get("title")},
+                task.get("assessment_id", key),
+                window_start=start,
+            )
+            placed[key] = summary["scheduled_hours"]
+
+        new_days = [d for d in days if d["date"] < today_str]
+        for slot in optimizer.days:
+            if not slot.tasks:
+                continue
+            tasks = _merge_tasks(slot.tasks)
+            new_days.append({
+                "date": slot.date.strftime("%Y-%m-%d"),
+                "weekday": slot.weekday,
+                "available_hours": slot.capacity,
+                "scheduled_hours": optimizer._round_to_half_hour(sum(t["hours"] for t in tasks)),
+                "tasks": tasks,
+            })
+
+        # allocations now count the missed hours as unscheduled unless placed again
+        allocations = []
+        by_id = {task.get("assessment_id", key): key for key, task in missed.items()}
+        for summary in schedule.get("allocations", []):
+            key = by_id.get(summary.get("assessment_id"))
+            if key is None:
+                allocations.append(summary)
+                continue
+            lost = missed[key]["hours"] - placed[key]
+            unscheduled = summary.get("unscheduled_hours", 0.0) + lost
+            allocations.append(dict(
+                summary,
+                scheduled_hours=summary.get("scheduled_hours", 0.0) - lost,
+                unscheduled_hours=unscheduled,
+                status="ok" if unscheduled <= 1e-3 else "incomplete_capacity",
+            ))
+
+        new = dict(schedule, days=new_days, allocations=allocations, **{ROLLED_THROUGH: yesterday})
+        # moved blocks are changes for calendar subscribers
+        new["ics_sequences"] = next_sequences(schedule, None, new, None)
+
+        report = {
+            "missed": sum(t["hours"] for t in missed.values()),
+            "placed": sum(placed.values()),
+            "assessments": len(missed),
+        }
+        report["unplaced"] = report["missed"] - report["placed"]
+        attrs.update(report)
+        return new, report
@@ -0,0 +1,133 @@
+import base64
+import json
+import zlib
+from typing import Any, Dict, List
+
+
+# compact storage format for schedule_json
+#
+# generate_raw_schedule repeats course_code, type, title and due_date on every
+# per-day task. The compact format keeps one row per distinct assessment and
+# stores each day as (row, hours) pairs:
+#
+#   {
+#       "format": "compact", "version": 1,
+#       "fields": ["assessment_id", "course_code", "type", "title", "due_date"],
+#       "assessments": [[0, "CP317", "quiz", "Quiz 1", "2025-09-30"], ...],
+#       "days": [["2025-09-26", "friday", 3.0, [[0, 1.5], [4, 1.0]]], ...],
+#       "allocations": [...],
+#       "extra": {...}
+#   }
+#
+# With compress=True the compact document is zlib-compressed and base64'd into
+# {"format": "compact+zlib", "version": 1, "data": "..."}.
+# Documents without a "format" key are the old layout and are returned as-is.
+
+COMPACT_FORMAT = "compact"
+COMPRESSED_FORMAT = "compact+zlib"
+FORMAT_VERSION = 1
+
+TASK_FIELDS = ["assessment_id", "course_code", "type", "title", "due_date"]
+
+
+def _round_to_half_hour(hours: float) -> float:
+    return round(hours * 2) / 2
+
+
+def encode_schedule(schedule: Dict[str, Any], compress: bool = False) -> Dict[str, Any]:
+    if not schedule or "days" not in schedule:
+        return schedule
+
+    days = schedule.get("days", [])
+
+    # collect task fields in first-seen order so extra keys survive the round trip
+    fields = list(TASK_FIELDS)
+    for day in days:
+        for t in day.get("tasks", []):
+            for k in t:
+                if k != "hours" and k not in fields:
+                    fields.append(k)
+
+    rows: List[List[Any]] = []
+    row_index: Dict[str, int] = {}
+    encoded_days = []
+
+    for day in days:
+        pairs = []
+        for t in day.get("tasks", []):
+            row = [t.get(f) for f in fields]
+            key = json.dumps(row, default=str)
+            idx = row_index.get(key)
+            if idx is None:
+                idx = len(rows)
+                row_index[key] = idx
+                rows.append(row)
+            pairs.append([idx, t.get("hours", 0.0)])
+        encoded_days.append([day["date"], day.get("weekday"), day.get("available_hours"), pairs])
+
+    doc = {
+        "format": COMPACT_FORMAT,
+        "version": FORMAT_VERSION,
+        "fields": fields,
+        "assessments": rows,
+        "days": encoded_days,
+        "allocations": schedule.get("allocations", []),
+        "extra": {k: v for k, v in schedule.items() if k not in ("days", "allocations")},
+    }
+
+    if compress:
+        raw = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+        return {
+            "format": COMPRESSED_FORMAT,
+            "version": FORMAT_VERSION,
+            "data": base64.b64encode(zlib.compress(raw, 9)).decode("ascii"),
+        }
+
+    return doc
+
+
+def decode_schedule(doc: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(doc, dict):
+        return {}
+
+    fmt = doc.get("format")
+
+    # old documents are already in the expanded layout
+    if fmt is None:
+        return doc
+
+    if fmt == COMPRESSED_FORMAT:
+        raw = zlib.decompress(base64.b64decode(doc["data"]))
+        doc = json.loads(raw)
+        fmt = doc.get("format")
+
+    if fmt != COMPACT_FORMAT:
+        raise ValueError(f"Unknown schedule format: {fmt}")
+    if doc.get("version", 1) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported schedule format version: {doc.get('version')}")
+
+    fields = doc.get("fields", TASK_FIELDS)
+    rows = doc.get("assessments", [])
+
+    days = []
+    for date_str, weekday, available, pairs in doc.get("days", []):
+        tasks = []
+        for idx, hours in pairs:
+            task = {
+                f: v for f, v in zip(fields, rows[idx])
+                if v is not None or f in TASK_FIELDS
+            }
+            task["hours"] = hours
+            tasks.append(task)
+        days.append({
+            "date": date_str,
+            "weekday": weekday,
+            "available_hours": available,
+            "scheduled_hours": _round_to_half_hour(sum(t["hours"] for t in tasks)),
+            "tasks": tasks,
+        })
+
+    out = dict(doc.get("extra", {}))
+    out["days"] = days
+    out["allocations"] = doc.get("allocations", [])
+    return out
@@ -0,0 +1,375 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.schedule_codec import decode_schedule, encode_schedule
+from utils.tracing import span
+
+
+# Versioned schedule history
+#
+# Every generated plan is kept as a row in the schedule_versions table:
+#
+#   version_id  "<uid>:<version>"
+#   user_id, version, parent, created_at, label
+#   snapshot    true if data is a full schedule (compact codec format)
+#   data        otherwise a delta against the parent version
+#
+# A delta keys days by date and allocations by assessment id and only holds
+# what differs from the parent:
+#
+#   {"days": {"set": [day, ...], "del": ["2025-10-01", ...]},
+#    "allocations": {"set": [summary, ...], "del": [id, ...], "order": [...]},
+#    "extra": {"set": {key: value}, "del": [key, ...]}}
+#
+# so a regenerated plan that only moved a week of tasks stores that week.
+# Every SNAPSHOT_EVERY-th version in a chain is a full snapshot, which bounds
+# checkout to one snapshot plus at most SNAPSHOT_EVERY - 1 deltas. Applying a
+# delta shares the parent's untouched day dicts, and materialized versions
+# are cached per process (versions never change once written).
+#
+# The schedule carries its own version number in schedule["version"], which is
+# the parent of the next version recorded from it. Checked-out schedules share
+# structure with the cache, so treat their days and tasks as read-only.
+
+SNAPSHOT_EVERY = 10
+VERSION_KEY = "version"
+
+# keep the newest KEEP_LAST versions, the newest version of each of the last
+# KEEP_DAYS days, and every labeled version
+KEEP_LAST = 20
+KEEP_DAYS = 30
+
+_SKIP_KEYS = ("days", "allocations", VERSION_KEY)
+
+
+# Deltas
+
+def _by_key(items: Iterable[Dict[str, Any]], key: str) -> "OrderedDict[Any, Dict[str, Any]]":
+    return OrderedDict((item.get(key), item) for item in items)
+
+
+def _section_delta(parent: List[Dict[str, Any]], child: List[Dict[str, Any]], key: str, ordered: bool):
+    old = _by_key(parent, key)
+    new = _by_key(child, key)
+    delta = {}
+    changed = [item for k, item in new.items() if old.get(k) != item]
+    removed = [k for k in old if k not in new]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["del"] = removed
+    if ordered:
+        # order after applying set/del naively: parent order, then additions
+        default = [k for k in old if k in new] + [k for k in new if k not in old]
+        if default != list(new):
+            delta["order"] = list(new)
+    return delta
+
+
+def _apply_section(parent: List[Dict[str, Any]], delta: Dict[str, Any], key: str, ordered: bool):
+    items = _by_key(parent, key)
+    for k in delta.get("del", ()):
+        items.pop(k, None)
+    for item in delta.get("set", ()):
+        items[item.get(key)] = item
+    if not ordered:
+        return [items[k] for k in sorted(items)]
+    if "order" in delta:
+        return [items[k] for k in delta["order"] if k in items]
+    return list(items.values())
+
+
+def schedule_delta(parent: Dict[str, Any], child: Dict[str, Any]) -> Dict[str, Any]:
+    delta = {}
+    days = _section_delta(parent.get("days", []), child.get("days", []), "date", ordered=False)
+    allocations = _section_delta(
+        parent.get("allocations", []), child.get("allocations", []), "assessment_id", ordered=True
+    )
+    extra = {
+        "set": {k: v for k, v in child.items() if k not in _SKIP_KEYS and parent.get(k) != v},
+        "del": [k for k in parent if k not in _SKIP_KEYS and k not in child],
+    }
+    for name, section in (("days", days), ("allocations", allocations),
+                          ("extra", {k: v for k, v in extra.items() if v})):
+        if section:
+            delta[name] = section
+    return delta
+
+
+def apply_delta(parent: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    # new top-level dict and lists; day and allocation dicts are shared with
+    # the parent unless the delta replaces them
+    child = {k: v for k, v in parent.items() if k not in _SKIP_KEYS}
+    extra = delta.get("extra", {})
+    for k in extra.get("del", ()):
+        child.pop(k, None)
+    child.update(extra.get("set", {}))
+    child["days"] = _apply_section(parent.get("days", []), delta.get("days", {}), "date", ordered=False)
+    child["allocations"] = _apply_section(
+        parent.get("allocations", []), delta.get("allocations", {}), "assessment_id", ordered=True
+    )
+    return child
+
+
+# Comparison
+
+def _hours_by_assessment(schedule: Dict[str, Any]) -> Dict[Any, Dict[str, Any]]:
+    totals: Dict[Any, Dict[str, Any]] = {}
+    for day in schedule.get("days", []):
+        for t in day.get("tasks", []):
+            entry = totals.setdefault(t.get("assessment_id"), {
+                "course_code": t.get("course_code"), "title": t.get("title") or t.get("type"),
+                "hours": 0.0, "first_day": day["date"], "last_day": day["date"],
+            })
+            entry["hours"] += float(t.get("hours", 0.0))
+            entry["last_day"] = max(entry["last_day"], day["date"])
+            entry["first_day"] = min(entry["first_day"], day["date"])
+    return totals
+
+
+def compare_schedules(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    # what changed going from a to b: days touched and per-assessment hours
+    days = _section_delta(a.get("days", []), b.get("days", []), "date", ordered=False)
+    a_days = {d["date"] for d in a.get("days", [])}
+    hours_a, hours_b = _hours_by_assessment(a), _hours_by_assessment(b)
+
+    assessments = []
+    for aid in list(hours_a) + [k for k in hours_b if k not in hours_a]:
+        old, new = hours_a.get(aid), hours_b.get(aid)
+        base = new or old
+        row = {
+            "assessment_id": aid,
+            "course_code": base["course_code"],
+            "title": base["title"],
+            "hours_before": old["hours"] if old else 0.0,
+            "hours_after": new["hours"] if new else 0.0,
+            "span_before": f"{old['first_day']} – {old['last_day']}" if old else "",
+            "span_after": f"{new['first_day']} – {new['last_day']}" if new else "",
+        }
+        if row["hours_before"] != row["hours_after"] or row["span_before"] != row["span_after"]:
+            assessments.append(row)
+
+    return {
+        "days_added": sum(1 for d in days.get("set", []) if d["date"] not in a_days),
+        "days_changed": sum(1 for d in days.get("set", []) if d["date"] in a_days),
+        "days_removed": len(days.get("del", [])),
+        "hours_before": sum(h["hours"] for h in hours_a.values()),
+        "hours_after": sum(h["hours"] for h in hours_b.values()),
+        "assessments": assessments,
+    }
+
+
+# Pruning
+
+def versions_to_keep(
+    versions: List[Dict[str, Any]],
+    keep_last: int = KEEP_LAST,
+    keep_days: int = KEEP_DAYS,
+    now: Optional[datetime] = None,
+) -> Set[int]:
+    now = now or datetime.now(timezone.utc)
+    newest_first = sorted(versions, key=lambda v: v["version"], reverse=True)
+
+    keep = {v["version"] for v in newest_first[:keep_last]}
+    keep |= {v["version"] for v in versions if v.get("label")}
+
+    cutoff = (now - timedelta(days=keep_days)).isoformat()
+    seen_days = set()
+    for v in newest_first:
+        created = v.get("created_at") or ""
+        if created >= cutoff and created[:10] not in seen_days:
+            seen_days.add(created[:10])
+            keep.add(v["version"])
+    return keep
+
+
+# Storage (sb_functions is imported lazily, as in utils/course_catalog.py)
+
+_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_CACHE_SIZE = 256
+_CACHE_LOCK = threading.Lock()
+
+
+def _cached(version_id: str) -> Optional[Dict[str, Any]]:
+    with _CACHE_LOCK:
+        schedule = _CACHE.get(version_id)
+        if schedule is not None:
+            _CACHE.move_to_end(version_id)
+        return schedule
+
+
+def _cache(version_id: str, schedule: Dict[str, Any]) -> None:
+    with _CACHE_LOCK:
+        _CACHE[version_id] = schedule
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def version_id(uid: str, version: int) -> str:
+    return f"{uid}:{version}"
+
+
+def list_versions(uid: str) -> List[Dict[str, Any]]:
+    # metadata only, oldest first
+    from sb_functions import load_schedule_versions
+    return sorted(load_schedule_versions(uid), key=lambda v: v["version"])
+
+
+def checkout(uid: str, version: int, versions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    from sb_functions import load_schedule_version
+
+    cached = _cached(version_id(uid, version))
+    if cached is not None:
+        return dict(cached)
+
+    with span("history.checkout", version=version) as attrs:
+        meta = {v["version"]: v for v in (versions or list_versions(uid))}
+        if version not in meta:
+            raise KeyError(f"No schedule version {version}")
+
+        # walk back to the nearest snapshot or cached version, then forward
+        chain, base, current = [], None, version
+        while True:
+            base = _cached(version_id(uid, current))
+            if base is not None:
+                break
+            chain.append(current)
+            if meta[current].get("snapshot"):
+                break
+            current = meta[current]["parent"]
+        attrs["deltas"] = len(chain)
+
+        schedule = base
+        for v in reversed(chain):
+            row = load_schedule_version(uid, v)
+            if row.get("snapshot"):
+                schedule = decode_schedule(row["data"])
+            else:
+                schedule = apply_delta(schedule, row["data"])
+            schedule[VERSION_KEY] = v
+            _cache(version_id(uid, v), schedule)
+        return dict(schedule)
+
+
+def record_version(uid: str, schedule: Dict[str, Any], label: Optional[str] = None, prune: bool = True) -> int:
+    # store schedule as the next version (a delta against the version it was
+    # derived from) and set schedule["version"] in place
+    from sb_functions import save_schedule_version
+
+    versions = list_versions(uid)
+    meta = {v["version"]: v for v in versions}
+    parent = schedule.get(VERSION_KEY)
+    if parent not in meta:
+        parent = versions[-1]["version"] if versions else None
+    version = (versions[-1]["version"] + 1) if versions else 1
+
+    with span("history.record", version=version) as attrs:
+        # snapshot at the root and every SNAPSHOT_EVERY-th link of a chain
+        depth, current = 0, parent
+        while current is not None and not meta[current].get("snapshot"):
+            depth += 1
+            current = meta[current]["parent"]
+        snapshot = parent is None or depth + 1 >= SNAPSHOT_EVERY
+
+        if snapshot:
+            data = encode_schedule({k: v for k, v in schedule.items() if k != VERSION_KEY})
+        else:
+            data = schedule_delta(checkout(uid, parent, versions), schedule)
+        attrs["snapshot"] = snapshot
+
+        save_schedule_version(uid, {
+            "version_id": version_id(uid, version),
+            "user_id": uid,
+            "version": version,
+            "parent": parent,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "label": label,
+            "snapshot": snapshot,
+            "data": data,
+        })
+
+    schedule[VERSION_KEY] = version
+    _cache(version_id(uid, version), dict(schedule))
+    if prune:
+        prune_versions(uid, versions + [{"version": version, "parent": parent, "label": label,
+                                         "snapshot": snapshot,
+                                         "created_at": datetime.now(timezone.utc).isoformat()}])
+    return version
+
+
+def label_version(uid: str, version: int, label: Optional[str]) -> None:
+    # labeled versions are never pruned
+    from sb_functions import load_schedule_version, save_schedule_version
+
+    row = load_schedule_version(uid, version)
+    row["label"] = label or None
+    save_schedule_version(uid, row)
+
+
+def prune_versions(
+    uid: str,
+    versions: Optional[List[Dict[str, Any]]] = None,
+    keep_last: int = KEEP_LAST,
+    keep_days: int = KEEP_DAYS,
+    now: Optional[datetime] = None,
+) -> List[int]:
+    # drop versions outside the policy; a kept version whose parent goes is
+    # re-stored as a delta against its nearest kept ancestor (or a snapshot)
+    from sb_functions import delete_schedule_version, load_schedule_version, save_schedule_version
+
+    versions = versions if versions is not None else list_versions(uid)
+    keep = versions_to_keep(versions, keep_last, keep_days, now)
+    dropped = sorted(v["version"] for v in versions if v["version"] not in keep)
+    if not dropped:
+        return []
+
+    with span("history.prune", dropped=len(dropped)):
+        meta = {v["version"]: v for v in versions}
+        # rebase oldest first, while every ancestor can still be checked out
+        for v in sorted(keep):
+            parent = meta[v]["parent"]
+            if parent is None or parent in keep:
+                continue
+            ancestor = parent
+            while ancestor is not None and ancestor not in keep:
+                ancestor = meta[ancestor]["parent"]
+
+            current = list(meta.values())
+            schedule = checkout(uid, v, current)
+            row = load_schedule_version(uid, v)
+            row["parent"] = ancestor
+            row["snapshot"] = ancestor is None
+            body = {k: val for k, val in schedule.items() if k != VERSION_KEY}
+            row["data"] = (
+                encode_schedule(body) if ancestor is None
+                else schedule_delta(checkout(uid, ancestor, current), body)
+            )
+            save_schedule_version(uid, row)
+            meta[v] = dict(meta[v], parent=ancestor, snapshot=row["snapshot"])
+
+        for v in dropped:
+            delete_schedule_version(uid, v)
+            with _CACHE_LOCK:
+                _CACHE.pop(version_id(uid, v), None)
+    return dropped
+
+
+# pruning rewrites rows and isn't needed to save a new plan, so callers on the
+# generation path record with prune=False and queue it here instead
+_PRUNER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-prune")
+
+
+def prune_later(uid: str) -> Future:
+    def run():
+        with span("history.prune_later"):
+            try:
+                return prune_versions(uid)
+            except Exception:
+                # whatever is left over goes with the next prune
+                logging.getLogger(__name__).warning("pruning schedule history for %s failed", uid, exc_info=True)
+                return []
+    return _PRUNER.submit(run)
@@ -0,0 +1,91 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from sb_functions import load_user_doc, on_save, USER_DOCS
+
+
+# On-demand session data
+#
+# Login only stores the user; each document (courses, settings, schedule,
+# completions) is fetched the first time a page asks for it and kept in
+# st.session_state for the rest of the session. Saves through sb_functions
+# write the saved document into the session that made them (or drop the
+# cached copy when only the stored form is known), so it stays current; call
+# invalidate() to force a refetch.
+
+_LOADED = "_loaded_docs"
+_REVISIONS = "_doc_revisions"
+
+
+def _loaded():
+    if _LOADED not in st.session_state:
+        st.session_state[_LOADED] = set()
+    return st.session_state[_LOADED]
+
+
+def get_doc(name):
+    loaded = _loaded()
+    if name not in loaded:
+        uid = st.session_state.get("uid")
+        if uid:
+            st.session_state[name] = load_user_doc(uid, name)
+        elif st.session_state.get(name) is None:
+            st.session_state[name] = {}
+        loaded.add(name)
+        _bump(name)
+    return st.session_state[name]
+
+
+def ensure_docs(*names):
+    for name in names:
+        get_doc(name)
+
+
+def invalidate(name=None):
+    loaded = _loaded()
+    if name is None:
+        loaded.clear()
+    else:
+        loaded.discard(name)
+
+
+def _bump(name):
+    revisions = st.session_state.setdefault(_REVISIONS, {})
+    revisions[name] = revisions.get(name, 0) + 1
+
+
+def doc_stamp(*names):
+    # cheap change marker for data derived from documents: each document
+    # object with a counter bumped on load and save (which catches in-place
+    # edits). The stamp holds the objects, so their ids can't be reused
+    revisions = st.session_state.get(_REVISIONS, {})
+    return tuple((st.session_state.get(name), revisions.get(name, 0)) for name in names)
+
+
+def same_stamp(a, b):
+    return (
+        a is not None and b is not None and len(a) == len(b)
+        and all(x[0] is y[0] and x[1] == y[1] for x, y in zip(a, b))
+    )
+
+
+def _write_through(uid, name, doc):
+    # saves from worker threads (schedule jobs, nightly.py) have no session;
+    # their results are adopted by the page that picks them up
+    if get_script_run_ctx(suppress_warning=True) is None or st.session_state.get("uid") != uid:
+        return
+    if doc is None:
+        invalidate(name)
+    else:
+        st.session_state[name] = doc
+        _loaded().add(name)
+        _bump(name)
+
+
+on_save(_write_through)
+
+
+def reset_docs():
+    # drop every cached document, e.g. on login/logout
+    for name in USER_DOCS:
+        st.session_state.pop(name, None)
+    invalidate()
@@ -0,0 +1,633 @@
+import json
+import re
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Validation and local repair of parse_syllabus output
+#
+# The model is asked for
+#
+#   {"course_info": {"course_name", "course_code", "semester", "year",
+#                    "instructor": {"name", "email"}},
+#    "assessments": {"breakdown": [{"type", "weight", "due_date", "notes"}],
+#                    "total_weight"}}
+#
+# but routinely returns string weights ("20%"), prose dates ("Nov 25 at
+# 11:59 PM", "Week 5", "TBD"), totals that don't add up, or JSON wrapped in a
+# code fence. repair_syllabus() walks the output once with validators compiled
+# from SCHEMA at import time and fixes what can be fixed deterministically:
+#
+#   - JSON is cut out of fences / surrounding prose
+#   - strings and numbers are coerced to the declared types
+#   - dates become YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS, "Week N" is resolved
+#     against the semester start, TBD-style placeholders become null
+#   - weights given as fractions are scaled to percent, total_weight is
+#     recomputed from the items
+#   - repeated items of one type get numbered titles (Quiz 1, Quiz 2, ...)
+#
+# merge_syllabi() combines the repaired parses of the parts of a long outline
+# into one course (see "Merging chunked parses" below).
+#
+# Output is only "unrecoverable" (worth another LLM call) when there is no
+# JSON object at all or no assessment list to work with. Every repair is
+# counted in module-wide stats, see repair_stats().
+
+
+class SyllabusParseError(ValueError):
+    pass
+
+
+class RepairReport:
+
+    def __init__(self):
+        self.issues: List[Tuple[str, str]] = []
+        self.fatal: Optional[str] = None
+
+    def fix(self, path: str, kind: str) -> None:
+        self.issues.append((path, kind))
+
+    def fail(self, reason: str) -> None:
+        self.fatal = reason
+
+    @property
+    def repaired(self) -> bool:
+        return bool(self.issues)
+
+    def kinds(self) -> Counter:
+        return Counter(kind for _, kind in self.issues)
+
+
+# Scalar coercion
+
+NULL_MARKERS = {"", "tbd", "tba", "n/a", "na", "none", "null", "-", "--", "unknown", "ongoing", "weekly", "various"}
+
+NUMBER = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(%|percent|pct)?\s*$", re.I)
+FRACTION = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90, "hundred": 100,
+}
+WORD_NUMBER = re.compile(r"^\s*([a-z]+)(?:[\s-]+([a-z]+))?\s*(?:%|percent)?\s*$", re.I)
+
+
+def coerce_number(value: Any) -> Tuple[Optional[float], bool]:
+    # (number or None, whether it had to be coerced)
+    if isinstance(value, bool):
+        return None, True
+    if isinstance(value, (int, float)):
+        return value, False
+    if value is None:
+        return None, False
+    if not isinstance(value, str):
+        return None, True
+
+    match = NUMBER.match(value)
+    if match:
+        return float(match.group(1)), True
+    match = FRACTION.match(value)
+    if match and int(match.group(2)):
+        return int(match.group(1)) / int(match.group(2)) * 100, True
+    match = WORD_NUMBER.match(value.lower())
+    if match and match.group(1) in NUMBER_WORDS and (match.group(2) is None or match.group(2) in NUMBER_WORDS):
+        return float(NUMBER_WORDS[match.group(1)] + NUMBER_WORDS.get(match.group(2), 0)), True
+    return None, True
+
+
+# Dates
+
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+ISO_DATE = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})$")
+ISO_DATETIME = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})[T ](\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?$")
+WEEK = re.compile(r"\bweek\s*(\d{1,2})\b", re.I)
+MONTH_DAY = re.compile(
+    r"\b(jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s*(\d{4}))?", re.I
+)
+DAY_MONTH = re.compile(
+    r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?(?:,?\s*(\d{4}))?", re.I
+)
+NUMERIC_DATE = re.compile(r"^(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?$")
+TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)(?=\W|$)", re.I)
+TIME_24 = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+MIDNIGHT = re.compile(r"\bmidnight\b", re.I)
+
+
+class DateContext:
+
+    # semester bounds used to fill in missing years and resolve "Week N"
+
+    def __init__(self, semester_start: Optional[str], semester_end: Optional[str]):
+        self.start = _to_date(semester_start)
+        self.end = _to_date(semester_end)
+
+    def pick_year(self, month: int, day: int) -> Optional[date]:
+        years = [d.year for d in (self.start, self.end) if d] or [date.today().year]
+        candidates = []
+        for year in dict.fromkeys(years):
+            try:
+                candidates.append(date(year, month, day))
+            except ValueError:
+                continue
+        if not candidates:
+            return None
+        if self.start and self.end:
+            inside = [c for c in candidates if self.start - timedelta(days=31) <= c <= self.end + timedelta(days=31)]
+            if inside:
+                return inside[0]
+        return candidates[0]
+
+
+def _to_date(value: Optional[str]) -> Optional[date]:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _time_of(text: str) -> Optional[Tuple[int, int]]:
+    match = TIME.search(text)
+    if match:
+        hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+        if match.group(3).lower().startswith("p"):
+            hour += 12
+        return hour, minute
+    match = TIME_24.search(text)
+    if match and int(match.group(1)) < 24:
+        return int(match.group(1)), int(match.group(2))
+    if MIDNIGHT.search(text):
+        return 23, 59
+    return None
+
+
+def _format(day: date, time_of: Optional[Tuple[int, int]]) -> str:
+    if time_of is None:
+        return day.strftime("%Y-%m-%d")
+    return f"{day.strftime('%Y-%m-%d')}T{time_of[0]:02d}:{time_of[1]:02d}:00"
+
+
+def normalize_date(value: Any, ctx: DateContext) -> Tuple[Optional[str], Optional[str]]:
+    # (normalized date or None, repair kind or None when it was already valid)
+    if value is None:
+        return None, None
+    if not isinstance(value, str):
+        return None, "date_dropped"
+
+    text = value.strip()
+    if text.lower().rstrip(".") in NULL_MARKERS:
+        return None, "date_placeholder"
+
+    match = ISO_DATETIME.match(text)
+    if match:
+        y, m, d, hh, mm, ss = (int(g or 0) for g in match.groups())
+        try:
+            out = datetime(y, m, d, hh, mm, ss).strftime("%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return None, "date_dropped"
+        return out, None if out == text else "date_normalized"
+
+    match = ISO_DATE.match(text)
+    if match:
+        try:
+            out = date(*(int(g) for g in match.groups())).strftime("%Y-%m-%d")
+        except ValueError:
+            return None, "date_dropped"
+        return out, None if out == text else "date_normalized"
+
+    time_of = _time_of(text)
+
+    for pattern, month_group, day_group in ((MONTH_DAY, 1, 2), (DAY_MONTH, 2, 1)):
+        match = pattern.search(text)
+        if match:
+            month = MONTHS[match.group(month_group)[:3].lower()]
+            day = int(match.group(day_group))
+            try:
+                found = date(int(match.group(3)), month, day) if match.group(3) else ctx.pick_year(month, day)
+            except ValueError:
+                found = None
+            if found:
+                return _format(found, time_of), "date_normalized"
+
+    match = NUMERIC_DATE.match(text)
+    if match:
+        first, second = int(match.group(1)), int(match.group(2))
+        month, day = (second, first) if first > 12 else (first, second)
+        year = match.group(3)
+        try:
+            if year:
+                found = date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+            else:
+                found = ctx.pick_year(month, day)
+        except ValueError:
+            found = None
+        if found:
+            return _format(found, time_of), "date_normalized"
+
+    match = WEEK.search(text)
+    if match and ctx.start:
+        # same rule the prompt gives the model: week N starts start + (N-1)*7 days
+        return _format(ctx.start + timedelta(days=(int(match.group(1)) - 1) * 7), time_of), "date_week"
+
+    return None, "date_dropped"
+
+
+# Schema
+#
+# Each node compiles to a function (value, path, report, ctx) -> repaired value.
+
+Validator = Callable[[Any, str, RepairReport, DateContext], Any]
+
+
+def string() -> Validator:
+    def check(value, path, report, ctx):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            report.fix(path, "coerced_string")
+            return str(value).removesuffix(".0")
+        report.fix(path, "dropped_field")
+        return None
+    return check
+
+
+def number() -> Validator:
+    def check(value, path, report, ctx):
+        out, coerced = coerce_number(value)
+        if coerced:
+            report.fix(path, "coerced_number" if out is not None else "dropped_field")
+        return out
+    return check
+
+
+def iso_date() -> Validator:
+    def check(value, path, report, ctx):
+        out, kind = normalize_date(value, ctx)
+        if kind:
+            report.fix(path, kind)
+        return out
+    return check
+
+
+def obj(fields: Dict[str, Validator], required: bool = False) -> Validator:
+    fields = dict(fields)
+
+    def check(value, path, report, ctx):
+        if not isinstance(value, dict):
+            if required:
+                report.fail(f"{path or 'output'} is not an object")
+                return value
+            if value is not None:
+                report.fix(path, "replaced_section")
+            value = {}
+        out = dict(value)
+        for name, validate in fields.items():
+            result = validate(value.get(name), f"{path}.{name}" if path else name, report, ctx)
+            # optional fields the model left out stay out
+            if name in value or result is not None:
+                out[name] = result
+        return out
+    return check
+
+
+def array(item: Validator, required: bool = False) -> Validator:
+    def check(value, path, report, ctx):
+        if isinstance(value, dict):
+            # {"1": {...}, "2": {...}} instead of a list
+            report.fix(path, "coerced_list")
+            value = list(value.values())
+        if not isinstance(value, list):
+            if required:
+                report.fail(f"{path} is missing")
+            return []
+        out = []
+        for i, element in enumerate(value):
+            if not isinstance(element, dict):
+                report.fix(f"{path}[{i}]", "dropped_item")
+                continue
+            out.append(item(element, f"{path}[{i}]", report, ctx))
+        return out
+    return check
+
+
+ASSESSMENT = obj({
+    "type": string(),
+    "title": string(),
+    "weight": number(),
+    "due_date": iso_date(),
+    "notes": string(),
+})
+
+SCHEMA = obj({
+    "course_info": obj({
+        "course_name": string(),
+        "course_code": string(),
+        "semester": string(),
+        "year": string(),
+        "instructor": obj({"name": string(), "email": string()}),
+    }),
+    "assessments": obj({
+        "breakdown": array(ASSESSMENT, required=True),
+        "total_weight": number(),
+    }, required=True),
+}, required=True)
+
+
+# Cross-field repairs
+
+TRAILING_NUMBER = re.compile(r"\s*#?\s*(\d+)\s*$")
+
+
+def _label(a: Dict[str, Any]) -> str:
+    return (a.get("title") or a.get("type") or "").strip()
+
+
+def _fix_items(breakdown: List[Dict[str, Any]], report: RepairReport) -> None:
+    for i, a in enumerate(breakdown):
+        if not (a.get("type") or "").strip():
+            a["type"] = TRAILING_NUMBER.sub("", a.get("title") or "") or "assessment"
+            report.fix(f"assessments.breakdown[{i}].type", "inferred_type")
+
+    # repeated or colliding labels within one base name get sequential numbers
+    groups: Dict[str, List[int]] = {}
+    for i, a in enumerate(breakdown):
+        groups.setdefault(TRAILING_NUMBER.sub("", _label(a)).lower(), []).append(i)
+
+    for base, indexes in groups.items():
+        if len(indexes) < 2:
+            continue
+        labels = [_label(breakdown[i]) for i in indexes]
+        if len(set(l.lower() for l in labels)) == len(labels):
+            continue
+        name = TRAILING_NUMBER.sub("", labels[0]) or breakdown[indexes[0]]["type"]
+        ordered = sorted(indexes, key=lambda i: (breakdown[i].get("due_date") is None, breakdown[i].get("due_date") or "", i))
+        for n, i in enumerate(ordered, start=1):
+            breakdown[i]["title"] = f"{name} {n}"
+        report.fix(f"assessments.breakdown[{base}]", "renumbered")
+
+
+def _fix_weights(assessments: Dict[str, Any], report: RepairReport) -> None:
+    weights = [a["weight"] for a in assessments["breakdown"] if a.get("weight") is not None]
+    if not weights:
+        return
+
+    total = sum(weights)
+    # 0.2 + 0.3 + 0.5 style fractions
+    if 0.9 <= total <= 1.1 and all(0 <= w <= 1 for w in weights) and len(weights) > 1:
+        for a in assessments["breakdown"]:
+            if a.get("weight") is not None:
+                a["weight"] = round(a["weight"] * 100, 4)
+        total = round(total * 100, 4)
+        report.fix("assessments.weight", "scaled_weights")
+
+    total = round(total, 4)
+    if assessments.get("total_weight") is None or abs(assessments["total_weight"] - total) > 0.01:
+        assessments["total_weight"] = total
+        report.fix("assessments.total_weight", "recomputed_total")
+
+
+# Merging chunked parses
+#
+# A long outline is parsed in parts (scraper.split_sections), so the same
+# assessment can come back from several parts: the grading table lists
+# "Quizzes 10%", the weekly schedule lists "Quiz 2" on its date. Items are the
+# same assessment when they share a base type and either a number or a due
+# date (unnumbered items from different parts may be up to NEAR_DAYS apart,
+# when one part gives the date of the class and another the deadline); a
+# category row ("Quizzes", no number or date) is folded into its numbered
+# items. Weights are only rebalanced inside a folded category; a total that
+# still exceeds 100 is reported, not rescaled.
+
+NEAR_DAYS = 3
+
+def _base(a: Dict[str, Any]) -> str:
+    # "Quizzes" -> "quiz", "Lab 3" -> "lab"
+    base = TRAILING_NUMBER.sub("", (a.get("type") or _label(a)).strip()).lower()
+    if base.endswith("zzes"):
+        return base[:-3]
+    if base.endswith("ies"):
+        return base[:-3] + "y"
+    if base.endswith("s") and not base.endswith("ss"):
+        return base[:-1]
+    return base
+
+
+def _number(a: Dict[str, Any]) -> Optional[int]:
+    for text in (a.get("title"), a.get("type")):
+        match = TRAILING_NUMBER.search(text or "")
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _same_date(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return not (a.get("due_date") and b.get("due_date") and a["due_date"][:10] != b["due_date"][:10])
+
+
+def _near(base: str, due: str, part: int, unnumbered: Dict[str, List[Tuple[int, int, date]]]) -> Optional[int]:
+    # an unnumbered item from an earlier part, dated at most NEAR_DAYS away
+    day = _to_date(due)
+    if day is None:
+        return None
+    for hit, seen_in, other in unnumbered.get(base, []):
+        if seen_in != part and abs((day - other).days) <= NEAR_DAYS:
+            return hit
+    return None
+
+
+def _merge_items(parts: List[List[Dict[str, Any]]], report: RepairReport) -> List[Dict[str, Any]]:
+    merged: List[Dict[str, Any]] = []
+    by_number: Dict[Tuple[str, int], int] = {}
+    by_date: Dict[Tuple[str, str], int] = {}
+    categories: Dict[str, int] = {}
+    unnumbered: Dict[str, List[Tuple[int, int, date]]] = {}
+
+    for p, part in enumerate(parts):
+        for a in part:
+            base, n, due = _base(a), _number(a), (a.get("due_date") or "")[:10]
+            hit = None
+            if n is not None and (base, n) in by_number and _same_date(merged[by_number[base, n]], a):
+                hit = by_number[base, n]
+            elif due and (base, due) in by_date and (n is None or _number(merged[by_date[base, due]]) is None):
+                hit = by_date[base, due]
+            elif n is None and not due and base in categories:
+                hit = categories[base]
+            elif n is None and due:
+                hit = _near(base, due, p, unnumbered)
+
+            added = hit is None
+            if added:
+                merged.append(dict(a))
+                hit = len(merged) - 1
+            else:
+                target = merged[hit]
+                for name, value in a.items():
+                    if target.get(name) is None and value is not None:
+                        target[name] = value
+                report.fix(f"assessments.breakdown[{_label(a)}]", "merged_duplicate")
+
+            a = merged[hit]
+            n, due = _number(a), (a.get("due_date") or "")[:10]
+            if n is not None:
+                by_number.setdefault((base, n), hit)
+            if due:
+                by_date.setdefault((base, due), hit)
+            if n is None and not due:
+                categories.setdefault(base, hit)
+            if added and n is None and _to_date(due) is not None:
+                unnumbered.setdefault(base, []).append((hit, p, _to_date(due)))
+    return merged
+
+
+def _rebalance_weights(breakdown: List[Dict[str, Any]], report: RepairReport) -> List[Dict[str, Any]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for a in breakdown:
+        groups.setdefault(_base(a), []).append(a)
+
+    folded = set()
+    for base, items in groups.items():
+        category = next((a for a in items if _number(a) is None and not a.get("due_date")), None)
+        members = [a for a in items if a is not category]
+        if category is None or not members:
+            continue
+        # the category weight is spread over the items that came without one,
+        # or shared out among them when they claim more than it
+        if category.get("weight") is not None:
+            unweighted = [a for a in members if a.get("weight") is None]
+            claimed = sum(a["weight"] for a in members if a.get("weight") is not None)
+            left = category["weight"] - claimed
+            if unweighted and left > 0:
+                for a in unweighted:
+                    a["weight"] = round(left / len(unweighted), 4)
+            elif left < -0.5:
+                for a in members:
+                    if a.get("weight") is not None:
+                        a["weight"] = round(a["weight"] * category["weight"] / claimed, 4)
+                report.fix(f"assessments.breakdown[{base}]", "rebalanced_weights")
+        folded.add(id(category))
+        report.fix(f"assessments.breakdown[{base}]", "folded_category")
+    breakdown = [a for a in breakdown if id(a) not in folded]
+
+    total = sum(a["weight"] for a in breakdown if a.get("weight") is not None)
+    if total > 100.5:
+        # left as parsed: scaling every weight would shift items the
+        # overlap never touched
+        report.fix("assessments.weight", "total_over_100")
+    return breakdown
+
+
+# Entry points
+
+def extract_json(content: Any, report: RepairReport) -> Any:
+    if isinstance(content, (dict, list)):
+        return content
+    if not isinstance(content, str):
+        report.fail("empty response")
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+
+    # fenced or wrapped in prose: take the outermost object
+    start, end = content.find("{"), content.rfind("}")
+    if start >= 0 and end > start:
+        try:
+            doc = json.loads(content[start:end + 1])
+            report.fix("", "extracted_json")
+            return doc
+        except ValueError:
+            pass
+    report.fail("response is not JSON")
+    return None
+
+
+def repair_syllabus(content: Any, semester_start: str = None, semester_end: str = None) -> Tuple[Dict[str, Any], RepairReport]:
+    report = RepairReport()
+    doc = extract_json(content, report)
+    if report.fatal:
+        _record(report)
+        return {}, report
+
+    course = SCHEMA(doc, "", report, DateContext(semester_start, semester_end))
+    if not report.fatal:
+        _fix_items(course["assessments"]["breakdown"], report)
+        _fix_weights(course["assessments"], report)
+    _record(report)
+    return course, report
+
+
+def merge_syllabi(courses: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], RepairReport]:
+    # one course from the repaired parses of each part, in document order
+    report = RepairReport()
+    info: Dict[str, Any] = {}
+    for course in courses:
+        for name, value in (course.get("course_info") or {}).items():
+            if isinstance(value, dict):
+                nested = info.setdefault(name, {})
+                for key, v in value.items():
+                    if nested.get(key) in (None, "") and v not in (None, ""):
+                        nested[key] = v
+            elif info.get(name) in (None, "") and value not in (None, ""):
+                info[name] = value
+
+    parts = [course.get("assessments", {}).get("breakdown", []) for course in courses]
+    breakdown = _rebalance_weights(_merge_items(parts, report), report)
+    total = round(sum(a["weight"] for a in breakdown if a.get("weight") is not None), 4)
+    assessments = {"breakdown": breakdown, "total_weight": total}
+    _fix_items(breakdown, report)
+    _fix_weights(assessments, report)
+    return {"course_info": info, "assessments": assessments}, report
+
+
+# Stats (process-wide, read by the Diagnostics page and batch.py)
+
+_STATS = Counter()
+_STATS_LOCK = threading.Lock()
+
+
+def _record(report: RepairReport) -> None:
+    with _STATS_LOCK:
+        _STATS["responses"] += 1
+        if report.fatal:
+            _STATS["unrecoverable"] += 1
+        elif report.repaired:
+            _STATS["repaired"] += 1
+        else:
+            _STATS["valid"] += 1
+        for kind, count in report.kinds().items():
+            _STATS[f"fix:{kind}"] += count
+
+
+def record_recall() -> None:
+    with _STATS_LOCK:
+        _STATS["recalls"] += 1
+
+
+def repair_stats() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    responses = stats.get("responses", 0)
+    summary = {
+        "responses": responses,
+        "valid": stats.get("valid", 0),
+        "repaired": stats.get("repaired", 0),
+        "unrecoverable": stats.get("unrecoverable", 0),
+        "recalls": stats.get("recalls", 0),
+        "fixes": {k[4:]: v for k, v in sorted(stats.items()) if k.startswith("fix:")},
+    }
+    for key in ("valid", "repaired", "unrecoverable"):
+        summary[f"{key}_rate"] = summary[key] / responses if responses else 0.0
+    return summary
+
+
+def reset_repair_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+
+# Lightweight span/timer API
+#
+#   with span("optimizer.generate", assessments=len(a)) as attrs:
+#       ...
+#       attrs["days"] = len(days)
+#
+# Finished spans go into an in-process ring buffer that the Diagnostics page
+# reads and can export as Chrome trace JSON (chrome://tracing, Perfetto).
+# Recording is off unless APP_TRACING=1; spans then also serialize documents
+# to measure payload sizes, which is too costly to leave on in production.
+
+ENABLED = os.environ.get("APP_TRACING", "0") == "1"
+
+_SPANS: deque = deque(maxlen=5000)
+_LOCK = threading.Lock()
+_PID = os.getpid()
+_local = threading.local()
+
+
+def _stack() -> List[str]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def record(name: str, start_ns: int, end_ns: int, **attrs) -> None:
+    if not ENABLED:
+        return
+    stack = _stack()
+    entry = {
+        "name": name,
+        "start_us": start_ns // 1000,
+        "dur_us": max(end_ns - start_ns, 0) // 1000,
+        "tid": threading.get_ident(),
+        "thread": threading.current_thread().name,
+        "parent": stack[-1] if stack else None,
+        "attrs": attrs,
+    }
+    with _LOCK:
+        _SPANS.append(entry)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    if not ENABLED:
+        yield attrs
+        return
+
+    stack = _stack()
+    start = time.perf_counter_ns()
+    stack.append(name)
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        record(name, start, time.perf_counter_ns(), **attrs)
+
+
+def traced(name: Optional[str] = None):
+    # decorator form of span()
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def payload_size(obj: Any) -> Optional[int]:
+    # serialized size in bytes, only computed while tracing is on
+    if not ENABLED:
+        return None
+    return len(json.dumps(obj, default=str).encode("utf-8"))
+
+
+# Page reruns: begin_page() at the top of a page script, end_page() at the
+# bottom. A rerun cut short by st.stop() is simply not recorded.
+
+def begin_page(page: str) -> None:
+    _local.page = (page, time.perf_counter_ns())
+
+
+def end_page() -> None:
+    current = getattr(_local, "page", None)
+    if current is None:
+        return
+    _local.page = None
+    page, start = current
+    record(f"page:{page}", start, time.perf_counter_ns(), page=page)
+
+
+# Readers
+
+def recent_spans(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    with _LOCK:
+        spans = list(_SPANS)
+    return spans[-limit:] if limit else spans
+
+
+def clear() -> None:
+    with _LOCK:
+        _SPANS.clear()
+
+
+def summarize(spans: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    spans = recent_spans() if spans is None else spans
+    by_name: Dict[str, List[int]] = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s["dur_us"])
+
+    rows = []
+    for name, durations in by_name.items():
+        durations.sort()
+        rows.append({
+            "name": name,
+            "count": len(durations),
+            "total_ms": sum(durations) / 1000,
+            "mean_ms": sum(durations) / len(durations) / 1000,
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] / 1000,
+            "max_ms": durations[-1] / 1000,
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def chrome_trace(spans: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    spans = recent_spans() if spans is None else spans
+    events = [
+        {
+            "name": s["name"],
+            "cat": s["name"].split(".")[0].split(":")[0],
+            "ph": "X",
+            "ts": s["start_us"],
+            "dur": s["dur_us"],
+            "pid": _PID,
+            "tid": s["tid"],
+            "args": s["attrs"],
+        }
+        for s in spans
+    ]
+    threads = {s["tid"]: s["thread"] for s in spans}
+    events.extend(
+        {"name": "thread_name", "ph": "M", "pid": _PID, "tid": tid, "args": {"name": name}}
+        for tid, name in threads.items()
+    )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f, default=str)
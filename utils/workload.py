@@ -0,0 +1,99 @@
+from itertools import chain
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+from utils.capacity import CapacityCalendar
+
+
+# Workload aggregation for the semester overview
+#
+# The schedule's days/tasks are flattened into one column-oriented frame with a
+# single np.repeat, after which every aggregate is a pandas groupby/pivot.
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def task_frame(schedule: Dict[str, Any]) -> pd.DataFrame:
+    days = schedule.get("days", [])
+    task_lists = [d.get("tasks", []) for d in days]
+    counts = np.fromiter((len(t) for t in task_lists), dtype=np.int64, count=len(task_lists))
+
+    frame = pd.DataFrame.from_records(
+        list(chain.from_iterable(task_lists)),
+        columns=["course_code", "type", "hours"],
+    )
+    frame["date"] = pd.to_datetime(np.repeat([d["date"] for d in days], counts))
+    frame["hours"] = frame["hours"].astype(float)
+    return frame
+
+
+def daily_load(
+    frame: pd.DataFrame,
+    daily_hours: Dict[str, float] = None,
+    start=None,
+    end=None,
+    exceptions=None,
+) -> pd.DataFrame:
+    start = pd.Timestamp(start) if start is not None else frame["date"].min()
+    end = pd.Timestamp(end) if end is not None else frame["date"].max()
+    index = pd.date_range(start, end, freq="D", name="date")
+
+    hours = frame.groupby("date")["hours"].sum().reindex(index, fill_value=0.0)
+
+    # capacity per weekday from the settings, looked up for every date at once
+    weekday_capacity = np.array(
+        [float((daily_hours or {}).get(name, 0.0)) for name in DAY_NAMES]
+    )
+    capacity = weekday_capacity[index.weekday.to_numpy()]
+
+    # holidays, reading weeks etc. overwrite whole slices of the array
+    if exceptions and len(index):
+        calendar = CapacityCalendar(daily_hours, exceptions, index[0].date(), index[-1].date())
+        for first, last, override in calendar.overrides():
+            capacity[(first - index[0].date()).days:(last - index[0].date()).days + 1] = override
+
+    out = pd.DataFrame({"hours": hours.to_numpy(), "capacity": capacity}, index=index)
+    out["utilization"] = np.divide(
+        out["hours"], out["capacity"],
+        out=np.zeros(len(out)), where=out["capacity"].to_numpy() > 0,
+    )
+    return out
+
+
+def hours_by(frame: pd.DataFrame, column: str, freq: str = "W-MON") -> pd.DataFrame:
+    # hours per period (rows) and course/type (columns)
+    return frame.pivot_table(
+        index=pd.Grouper(key="date", freq=freq, label="left", closed="left"),
+        columns=column,
+        values="hours",
+        aggfunc="sum",
+        fill_value=0.0,
+    )
+
+
+def heatmap_grid(daily: pd.DataFrame, value: str = "hours") -> pd.DataFrame:
+    # one row per week (Monday start), one column per weekday
+    index = daily.index
+    week_starts = (index - pd.to_timedelta(index.weekday, unit="D")).normalize()
+    grid = pd.DataFrame({
+        "week": week_starts,
+        "weekday": np.asarray(WEEKDAY_LABELS)[index.weekday.to_numpy()],
+        value: daily[value].to_numpy(),
+    }).pivot(index="week", columns="weekday", values=value)
+    return grid.reindex(columns=WEEKDAY_LABELS)
+
+
+def heatmap_styles(grid: pd.DataFrame, overload: pd.DataFrame) -> pd.DataFrame:
+    # background colour scaled by hours, overloaded days in red
+    values = grid.to_numpy(dtype=float)
+    peak = np.nanmax(values) if np.isfinite(values).any() else 0.0
+    scale = np.nan_to_num(values / peak) if peak > 0 else np.zeros_like(values)
+
+    alpha = np.round(0.1 + 0.8 * scale, 2)
+    css = np.char.add(np.char.add("background-color: rgba(93, 167, 209, ", alpha.astype(str)), ")")
+    css = np.where(np.isnan(values) | (values == 0), "", css)
+    css = np.where(overload.to_numpy(dtype=bool), "background-color: #E74C3C; color: white", css)
+    return pd.DataFrame(css, index=grid.index, columns=grid.columns)